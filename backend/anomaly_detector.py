@@ -0,0 +1,256 @@
+"""
+Streaming anomaly detection over the whole fleet.
+
+AnomalyDetector keeps O(1) state per machine in flat NumPy arrays: an
+exponentially weighted mean and variance, plus a reading count. Each batch
+is scored against the state from *before* the batch:
+
+    z        = (energy - ewma_mean) / sqrt(ewma_var)
+    residual = (energy - predicted) / predicted     (when a model prediction is given)
+
+and then folded into the state. A batch can hold several readings for the
+same machine; they are applied in order, one vectorized round per repeat.
+
+With a state path, the detector is shared by every worker process: the EWMA
+arrays live in a small JSON file and alerts are appended to a JSON-lines log
+next to it. score() re-reads the state before scoring and writes it back
+after, so it must run under a cross-process lock (app_original's ingest
+lock); readers pick up the other workers' alerts from the log by offset.
+"""
+import json
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+
+def detector_path(data_path):
+    """Sidecar location for a data file: energy_data.csv -> energy_data.anomaly.json"""
+    return f"{os.path.splitext(data_path)[0]}.anomaly.json"
+
+
+class AnomalyDetector:
+    """EWMA z-score and model-residual scoring with per-machine array state"""
+
+    def __init__(self, alpha=0.1, z_threshold=4.0, residual_threshold=0.5, warmup=20, max_alerts=1000, path=None):
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.residual_threshold = residual_threshold
+        # Readings a machine needs before its z-score can raise an alert
+        self.warmup = warmup
+        self.index = {}
+        self.machines = []
+        self.mean = np.zeros(0)
+        self.var = np.zeros(0)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.alerts = deque(maxlen=max_alerts)
+        self._lock = threading.Lock()
+        self.next_alert_id = 1
+        self.readings_scored = 0
+        # Shared state file (None keeps everything in this process)
+        self.path = path
+        self.alerts_path = f"{os.path.splitext(path)[0]}.alerts.jsonl" if path else None
+        self._state_key = None
+        self._log_key = None
+        self._log_offset = 0
+        self._log_first_id = 1
+
+    def _indices(self, machines):
+        """Map machine names to array slots, adding slots for new machines"""
+        names, inverse = np.unique(np.asarray(machines, dtype=str), return_inverse=True)
+        new = [name for name in names.tolist() if name not in self.index]
+        if new:
+            for name in new:
+                self.index[name] = len(self.machines)
+                self.machines.append(name)
+            grow = len(new)
+            self.mean = np.concatenate([self.mean, np.zeros(grow)])
+            self.var = np.concatenate([self.var, np.zeros(grow)])
+            self.count = np.concatenate([self.count, np.zeros(grow, dtype=np.int64)])
+        return np.array([self.index[name] for name in names.tolist()], dtype=np.int64)[inverse]
+
+    def score(self, machines, energies, timestamps, predictions=None):
+        """Score a batch, update the state and return the new alerts (list of dicts)"""
+        if len(machines) == 0:
+            return []
+        with self._lock:
+            self._sync(force=True)
+            alerts = self._score(machines, energies, timestamps, predictions)
+            if self.path is not None:
+                self._save(alerts)
+            return alerts
+
+    # -- shared state ---------------------------------------------------------
+
+    @staticmethod
+    def _file_key(path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _sync(self, force=False):
+        """Pick up state and alerts written by other processes (cheap when nothing changed)"""
+        if self.path is None:
+            return
+        key = self._file_key(self.path)
+        if key is not None and (force or key != self._state_key):
+            with open(self.path) as f:
+                state = json.load(f)
+            self.machines = state["machines"]
+            self.index = {name: i for i, name in enumerate(self.machines)}
+            self.mean = np.array(state["mean"], dtype=np.float64)
+            self.var = np.array(state["var"], dtype=np.float64)
+            self.count = np.array(state["count"], dtype=np.int64)
+            self.next_alert_id = state["next_alert_id"]
+            self.readings_scored = state["readings_scored"]
+            self._log_first_id = state.get("log_first_id", 1)
+            self._state_key = key
+        self._read_log()
+
+    def _read_log(self):
+        key = self._file_key(self.alerts_path)
+        if key is None:
+            return
+        if key[0] != (self._log_key or key)[0] or key[1] < self._log_offset:
+            # The writer compacted the log into a new file: start over
+            self.alerts.clear()
+            self._log_offset = 0
+        self._log_key = key
+        if key[1] == self._log_offset:
+            return
+        with open(self.alerts_path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read(key[1] - self._log_offset)
+        # Only whole lines; a line still being written is picked up next time
+        end = data.rfind(b"\n") + 1
+        self._log_offset += end
+        self.alerts.extend(json.loads(line) for line in data[:end].splitlines())
+
+    def _save(self, alerts):
+        """Append the new alerts to the log and write the state file (caller holds the cross-process lock)"""
+        if alerts:
+            with open(self.alerts_path, "ab") as f:
+                f.write(b"".join(json.dumps(alert).encode() + b"\n" for alert in alerts))
+            # Rewrite the log with only the alerts kept in memory once it holds twice that many
+            if self.next_alert_id - self._log_first_id > 2 * self.alerts.maxlen:
+                tmp_path = f"{self.alerts_path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(b"".join(json.dumps(alert).encode() + b"\n" for alert in self.alerts))
+                os.replace(tmp_path, self.alerts_path)
+                self._log_first_id = self.alerts[0]["id"]
+            self._log_key = self._file_key(self.alerts_path)
+            self._log_offset = self._log_key[1]
+
+        state = {
+            "machines": self.machines,
+            "mean": self.mean.tolist(),
+            "var": self.var.tolist(),
+            "count": self.count.tolist(),
+            "next_alert_id": self.next_alert_id,
+            "readings_scored": self.readings_scored,
+            "log_first_id": self._log_first_id,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+        self._state_key = self._file_key(self.path)
+
+    def _score(self, machines, energies, timestamps, predictions):
+        slots = self._indices(machines)
+        energies = np.asarray(energies, dtype=np.float64)
+        n = len(slots)
+
+        # Occurrence rank of each reading within its machine (0 for the first, 1 for the next, ...)
+        order = np.argsort(slots, kind="stable")
+        sorted_slots = slots[order]
+        group_start = np.r_[0, np.flatnonzero(np.diff(sorted_slots)) + 1]
+        starts = np.repeat(group_start, np.diff(np.r_[group_start, n]))
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = np.arange(n) - starts
+
+        z = np.zeros(n)
+        expected = np.zeros(n)
+        warmed = np.zeros(n, dtype=bool)
+        for r in range(int(rank.max()) + 1):
+            rows = np.flatnonzero(rank == r)
+            s = slots[rows]
+            x = energies[rows]
+            first = self.count[s] == 0
+            mean = np.where(first, x, self.mean[s])
+            var = self.var[s]
+            expected[rows] = mean
+            std = np.sqrt(var)
+            z[rows] = np.where(std > 0, (x - mean) / np.where(std > 0, std, 1.0), 0.0)
+            warmed[rows] = self.count[s] >= self.warmup
+            # West's incremental EWMA mean / variance
+            diff = x - mean
+            increment = self.alpha * diff
+            self.mean[s] = mean + increment
+            self.var[s] = (1 - self.alpha) * (var + diff * increment)
+            self.count[s] += 1
+        self.readings_scored += n
+
+        flagged_z = warmed & (np.abs(z) >= self.z_threshold)
+        residual = np.full(n, np.nan)
+        flagged_residual = np.zeros(n, dtype=bool)
+        if predictions is not None:
+            predictions = np.asarray(predictions, dtype=np.float64)
+            known = np.isfinite(predictions) & (predictions > 0)
+            residual[known] = (energies[known] - predictions[known]) / predictions[known]
+            flagged_residual = known & (np.abs(np.nan_to_num(residual)) >= self.residual_threshold)
+
+        flagged = np.flatnonzero(flagged_z | flagged_residual)
+        if flagged.size == 0:
+            return []
+        stamps = np.datetime_as_string(np.asarray(timestamps, dtype="datetime64[ns]")[flagged], unit="s")
+        names = np.asarray(self.machines, dtype=object)[slots[flagged]]
+        alerts = []
+        for i, row in enumerate(flagged.tolist()):
+            reasons = [reason for reason, hit in (("z_score", flagged_z[row]), ("residual", flagged_residual[row])) if hit]
+            alerts.append({
+                "id": self.next_alert_id,
+                "machine": names[i],
+                "timestamp": str(stamps[i]),
+                "energy": round(float(energies[row]), 2),
+                "expected": round(float(expected[row]), 2),
+                "z_score": round(float(z[row]), 2),
+                "predicted": None if predictions is None or not np.isfinite(predictions[row]) else round(float(predictions[row]), 2),
+                "residual": None if np.isnan(residual[row]) else round(float(residual[row]), 3),
+                "reasons": reasons,
+            })
+            self.next_alert_id += 1
+        self.alerts.extend(alerts)
+        return alerts
+
+    def recent(self, machine=None, since_id=0, limit=100):
+        """Alerts newer than since_id, oldest first, at most `limit` (the newest ones)"""
+        with self._lock:
+            self._sync()
+            alerts = [a for a in self.alerts if a["id"] > since_id and (machine is None or a["machine"] == machine)]
+        return alerts[-limit:] if limit else alerts
+
+    def machine_state(self, machine):
+        """EWMA state of one machine, or None if it has not been scored yet"""
+        with self._lock:
+            self._sync()
+            i = self.index.get(machine)
+            if i is None:
+                return None
+            return {"ewma_mean": float(self.mean[i]), "ewma_std": float(np.sqrt(self.var[i])), "count": int(self.count[i])}
+
+    def stats(self):
+        with self._lock:
+            self._sync()
+        return {
+            "machines": len(self.machines),
+            "readings_scored": self.readings_scored,
+            "alerts_total": self.next_alert_id - 1,
+            "alpha": self.alpha,
+            "z_threshold": self.z_threshold,
+            "residual_threshold": self.residual_threshold,
+            "warmup": self.warmup,
+        }
@@ -1,7 +1,14 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from datetime import datetime
+
+try:
+    from metrics import instrument
+    from startup import StartupProfile, add_probes
+except ImportError:  # imported as backend.<app> from the repo root (Procfile, render.yaml)
+    from .metrics import instrument
+    from .startup import StartupProfile, add_probes
 import os
 
 app = FastAPI(title="Smart Factory Energy Optimizer")
@@ -18,6 +25,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency and in-flight requests at GET /metrics (needs prometheus_client)
+instrument(app)
+
+# GET /live and GET /ready; nothing to load, so ready as soon as the app starts
+startup = StartupProfile()
+add_probes(app, startup)
+
+@app.on_event("startup")
+def mark_ready():
+    startup.mark_ready()
+
 # Pre-computed predictions for demo purposes
 # These replace ML model predictions for deployment simplicity
 
@@ -67,7 +85,8 @@ def predict_energy(data: EnergyRequest):
 def root():
     return {
         "message": "Smart Factory Energy Optimizer Backend Running",
-        "model_loaded": True,
+        # Predictions come from PREDICTION_DATA; no ML model is ever loaded
+        "model_loaded": False,
         "status": "ready"
     }
 
@@ -75,7 +94,7 @@ def root():
 def health_check():
     return {
         "status": "healthy",
-        "model_loaded": True
+        "model_loaded": False
     }
 
 @app.get("/machines")
@@ -93,35 +112,15 @@ def get_machines():
 @app.get("/predict/batch")
 def get_batch_predictions():
     """Get sample predictions for all machines at current time"""
-    if not MODEL_LOADED:
-        raise HTTPException(status_code=503, detail="ML model not available.")
-    
-    from datetime import datetime
     now = datetime.now()
     hour = now.hour
     day = now.day
     
     results = []
     for machine in ["Machine_A", "Machine_B", "Machine_C"]:
-        # Create the prediction request
-        machine_features = {"machine_Machine_B": 0, "machine_Machine_C": 0}
-        if machine == "Machine_B":
-            machine_features["machine_Machine_B"] = 1
-        elif machine == "Machine_C":
-            machine_features["machine_Machine_C"] = 1
-
-        features_data = {
-            'hour': [hour],
-            'day': [day],
-            'machine_Machine_B': [machine_features["machine_Machine_B"]],
-            'machine_Machine_C': [machine_features["machine_Machine_C"]]
-        }
-        X = pd.DataFrame(features_data)
-        prediction = model.predict(X)[0]
-        
         results.append({
             "machine": machine,
-            "predicted_energy": round(prediction, 2),
+            "predicted_energy": calculate_prediction(machine, hour, day),
             "hour": hour,
             "day": day
         })
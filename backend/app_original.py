@@ -1,12 +1,41 @@
-from fastapi import FastAPI, HTTPException
+import time
+# Start of the "imports" startup phase (see GET /ready)
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
-import joblib
+from fastapi.responses import StreamingResponse
+import numpy as np
 from pydantic import BaseModel
-from datetime import datetime
+from typing import List, Optional, Tuple, Union
+from datetime import datetime, timedelta, timezone
+import asyncio
 import os
+import threading
+
+from anomaly_detector import AnomalyDetector, detector_path
+from broadcaster import Broadcaster
+from columnar import FastJSONResponse, decode_document, encode_response, float_column, negotiate, openapi_body, \
+    read_rows, string_column
+from energy_io import MACHINE_NAME_BYTES, ReadingWriter, storable_machine_name, utc_now
+from feature_encoder import accept_arrays, hours_and_days, load_encoder
+from forecast import MAX_HORIZON, ForecastCache, seconds_to_next_hour
+from history_store import RESOLUTIONS, HistoryStore
+from machine_stats import FleetStats, stats_path
+from metrics import instrument, rows_predicted, set_model, stage
+from micro_batcher import MicroBatcher
+from model_manager import ModelManager
+from prediction_cache import PredictionCache
+from prediction_grid import GRID_HOURS, GRID_DAYS, grid_lookup, load_or_build_grid
+from scheduler import OBJECTIVES, Scheduler
+from startup import StartupProfile, add_probes
 
-app = FastAPI(title="Smart Factory Energy Optimizer")
+# Cold-start breakdown served by GET /live and GET /ready
+startup = StartupProfile(started=_import_started)
+startup.record("imports", time.perf_counter() - _import_started)
+
+app = FastAPI(title="Smart Factory Energy Optimizer", default_response_class=FastJSONResponse)
 
 # Get CORS origins from environment variable, default to localhost for development
 cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000").split(",")
@@ -20,60 +49,307 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Try to load the model, create a placeholder if it doesn't exist
-try:
-    model = joblib.load("energy_predictor.pkl")
-    MODEL_LOADED = True
-except FileNotFoundError:
-    model = None
-    MODEL_LOADED = False
-    print("Warning: energy_predictor.pkl not found. Please run create_model.py first.")
+# Per-route latency, in-flight requests and prediction stage timings at GET /metrics
+instrument(app)
+# GET /live answers at once; GET /ready returns 503 until the model is loaded and warm
+add_probes(app, startup)
+
+MODEL_PATH = os.getenv("MODEL_PATH", "energy_predictor.pkl")
+
+# "sklearn" serves the pickled RandomForest; "compiled" serves the array-backed
+# artifact written by compiled_forest.py and never imports sklearn or pandas
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "sklearn")
+COMPILED_MODEL_PATH = os.getenv("COMPILED_MODEL_PATH", "energy_predictor_forest")
+# Memory-map the compiled arrays read-only so every worker shares the same pages
+MODEL_MMAP = os.getenv("MODEL_MMAP", "true").lower() == "true"
+
+def load_model(path):
+    """Load the predictor at path in the configured MODEL_FORMAT"""
+    if MODEL_FORMAT == "compiled":
+        from compiled_forest import CompiledForest
+        return CompiledForest.load(path, mmap_mode="r" if MODEL_MMAP else None)
+    import joblib
+    return joblib.load(path)
+
+def import_model_libraries():
+    """Import what loading the model needs up front, so it is timed as its own startup phase"""
+    if MODEL_FORMAT == "compiled":
+        import compiled_forest  # noqa: F401
+    else:
+        # Unpickling the forest imports sklearn (and with it scipy); most of a cold start
+        import joblib  # noqa: F401
+        import sklearn.ensemble  # noqa: F401
+
+MACHINES = ["Machine_A", "Machine_B", "Machine_C"]
+
+# Upper bound on rows accepted by /predict/bulk in a single request
+MAX_BULK_ROWS = int(os.getenv("MAX_BULK_ROWS", "100000"))
 
 class EnergyRequest(BaseModel):
     machine: str
     hour: int
     day: int
+    # Optional uncertainty band, e.g. [0.05, 0.5, 0.95], taken across the forest's trees
+    quantiles: Optional[List[float]] = None
 
-@app.post("/predict")
-def predict_energy(data: EnergyRequest):
-    if not MODEL_LOADED:
+class BulkEnergyRequest(BaseModel):
+    # Documents the JSON/MessagePack body of /predict/bulk, which columnar.read_rows decodes
+    # Either parallel columns...
+    machine: Optional[List[str]] = None
+    hour: Optional[List[int]] = None
+    day: Optional[List[int]] = None
+    # ...or an array of [machine, hour, day] rows
+    rows: Optional[List[Tuple[str, int, int]]] = None
+    quantiles: Optional[List[float]] = None
+
+def encode_features(machines, hours, days, active):
+    """Encode (machine, hour, day) columns with the encoder saved alongside the model version"""
+    with stage("encoding"):
+        return active.encoder.encode(machines, hour=hours, day=days)
+
+def predict_matrix(X, active):
+    """Run a single predict over an encoded feature matrix with the given model version"""
+    with stage("inference"):
+        predictions = active.predictor.predict(X)
+    rows_predicted(len(predictions), "model")
+    return predictions
+
+def predict_rows(machines, hours, days, active, predict_encoded=predict_matrix):
+    """Predict raw rows, answering from the precomputed grid where possible.
+
+    Rows the grid cannot answer are encoded once and passed to predict_encoded(X, active).
+    """
+    if active.grid is None:
+        return predict_encoded(encode_features(machines, hours, days, active), active)
+
+    with stage("grid_lookup"):
+        predictions, in_grid = grid_lookup(active.grid, machines, hours, days)
+    rows_predicted(int(in_grid.sum()), "grid")
+    if not in_grid.all():
+        outside = ~in_grid
+        predictions[outside] = predict_encoded(
+            encode_features(np.asarray(machines)[outside], np.asarray(hours)[outside], np.asarray(days)[outside], active),
+            active,
+        )
+    return predictions
+
+# Precompute every (machine, hour, day) prediction once and memory-map it, so
+# serving is array indexing. The tensor is rebuilt when the model artifact changes.
+USE_PREDICTION_GRID = os.getenv("USE_PREDICTION_GRID", "true").lower() == "true"
+PREDICTION_GRID_PATH = os.getenv("PREDICTION_GRID_PATH", "energy_grid.npy")
+
+def build_prediction_grid(candidate):
+    """Load or build the prediction tensor for a model version before it goes live"""
+    if not USE_PREDICTION_GRID:
+        return None
+    return load_or_build_grid(
+        PREDICTION_GRID_PATH,
+        candidate.version,
+        lambda machines, hours, days: predict_matrix(encode_features(machines, hours, days, candidate), candidate),
+        candidate.encoder.machines,
+    )
+
+def warm_model(candidate):
+    """Smoke-test a freshly loaded model so a broken artifact never goes live"""
+    accept_arrays(candidate.predictor, candidate.encoder)
+    n_features = getattr(candidate.predictor, "n_features_in_", getattr(candidate.predictor, "n_features", None))
+    if n_features != candidate.encoder.n_features:
+        raise ValueError(f"Model {candidate.version} expects {n_features} features, encoder produces {candidate.encoder.n_features}")
+    hours = [8] * len(MACHINES)
+    days = [15] * len(MACHINES)
+    predictions = np.asarray(predict_matrix(encode_features(MACHINES, hours, days, candidate), candidate))
+    if predictions.shape != (len(MACHINES),) or not np.isfinite(predictions).all():
+        raise ValueError(f"Model {candidate.version} returned invalid smoke predictions: {predictions}")
+
+# Seconds between checks of the model artifact for a retrained version; 0 disables hot reload
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "30"))
+# Shared secret for the /admin endpoints; POST /admin/model/reload is refused while it is unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+model_manager = ModelManager(
+    COMPILED_MODEL_PATH if MODEL_FORMAT == "compiled" else MODEL_PATH,
+    load=load_model,
+    load_encoder=load_encoder,
+    prepare=build_prediction_grid,
+    warm=warm_model,
+    poll_interval=MODEL_RELOAD_INTERVAL,
+)
+
+# LRU cache for /predict and /predict/batch rows the grid cannot answer; 0 disables it
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE)
+model_manager.on_swap(lambda new, previous: prediction_cache.set_model_version(new.version))
+model_manager.on_swap(lambda new, previous: set_model(new.version, new.load_seconds + new.warm_seconds))
+
+# Most quantiles one request may ask for
+MAX_QUANTILES = 20
+_forest_lock = threading.Lock()
+
+def parse_quantiles(quantiles):
+    """Validate requested quantiles (a list, or a comma-separated query string); None when absent"""
+    if quantiles is None:
+        return None
+    if isinstance(quantiles, str):
+        try:
+            quantiles = [float(q) for q in quantiles.split(",") if q.strip()]
+        except ValueError:
+            raise HTTPException(status_code=422, detail="quantiles must be comma-separated numbers in [0, 1].")
+    try:
+        values = np.asarray(quantiles, dtype=np.float64)
+    except (TypeError, ValueError):
+        values = np.empty(0)
+    if values.ndim != 1 or values.size == 0 or values.size > MAX_QUANTILES or not np.all((values >= 0) & (values <= 1)):
+        raise HTTPException(status_code=422, detail=f"quantiles must be 1 to {MAX_QUANTILES} numbers in [0, 1].")
+    return values
+
+def tree_predictor(active):
+    """The active model as a CompiledForest; sklearn forests are compiled once per version"""
+    from compiled_forest import CompiledForest, compile_forest
+    if isinstance(active.predictor, CompiledForest):
+        return active.predictor
+    with _forest_lock:
+        if active.forest is None:
+            active.forest = compile_forest(active.predictor)
+    return active.forest
+
+def predict_quantiles(machines, hours, days, active, quantiles):
+    """Point predictions plus a (quantiles, rows) band from one per-tree pass over the batch"""
+    from compiled_forest import ESTIMATOR_ROWS, estimator_quantiles
+    X = encode_features(machines, hours, days, active)
+    # Large batches: a sklearn forest's own trees fill the per-tree matrix faster than the compiled traversal
+    if len(X) >= ESTIMATOR_ROWS and hasattr(active.predictor, "estimators_"):
+        with stage("inference"):
+            mean, bands = estimator_quantiles(active.predictor, X, quantiles)
+    else:
+        forest = tree_predictor(active)
+        with stage("inference"):
+            mean, bands = forest.predict_quantiles(X, quantiles)
+    rows_predicted(len(mean), "model")
+    return mean, bands
+
+def quantile_columns(quantiles, bands):
+    """{"0.05": [...], ...} with values rounded like predicted_energy"""
+    return {f"{q:g}": values.tolist() for q, values in zip(quantiles.tolist(), np.round(bands, 2))}
+
+def active_model():
+    """The model version a request uses for its whole lifetime"""
+    active = model_manager.current
+    if active is None and startup.error is None:
+        raise HTTPException(status_code=503, detail="ML model is still loading.")
+    if active is None:
         raise HTTPException(status_code=503, detail="ML model not available. Please run create_model.py first.")
-    
-    # Create DataFrame with proper feature names to avoid warnings
-    import pandas as pd
-    
-    # Encode machine
-    machine_features = {"machine_Machine_B": 0, "machine_Machine_C": 0}
-    if data.machine == "Machine_B":
-        machine_features["machine_Machine_B"] = 1
-    elif data.machine == "Machine_C":
-        machine_features["machine_Machine_C"] = 1
-
-    # Create DataFrame with the correct feature names
-    features_data = {
-        'hour': [data.hour],
-        'day': [data.day],
-        'machine_Machine_B': [machine_features["machine_Machine_B"]],
-        'machine_Machine_C': [machine_features["machine_Machine_C"]]
-    }
-    X = pd.DataFrame(features_data)
-    
-    prediction = model.predict(X)[0]
+    return active
+
+def cached_predict_matrix(X, active):
+    """predict_matrix with an LRU cache keyed on the encoded feature rows"""
+    keys = [tuple(row) for row in X.tolist()]
+    predictions = prediction_cache.get_many(keys)
+    missing = [i for i, value in enumerate(predictions) if value is None]
+    if missing:
+        computed = predict_matrix(X[missing], active).tolist()
+        prediction_cache.put_many([keys[i] for i in missing], computed, active.version)
+        for i, value in zip(missing, computed):
+            predictions[i] = value
+    return np.array(predictions, dtype=np.float64)
+
+def cached_predict_rows(machines, hours, days, active):
+    """predict_rows with the LRU cache in front of the model; grid hits never touch the cache"""
+    if not prediction_cache.enabled:
+        return predict_rows(machines, hours, days, active)
+    return predict_rows(machines, hours, days, active, cached_predict_matrix)
+
+# Opt-in coalescing of concurrent /predict calls into one batched inference
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "false").lower() == "true"
+MICROBATCH_WINDOW_MS = float(os.getenv("MICROBATCH_WINDOW_MS", "2"))
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+
+micro_batcher = None
+if MICROBATCH_ENABLED:
+    micro_batcher = MicroBatcher(
+        # Grouped by the model version each request resolved, so a hot reload never switches it mid-flight
+        lambda active, rows: cached_predict_rows(*zip(*rows), active).tolist(),
+        max_batch_size=MICROBATCH_MAX_SIZE,
+        window_ms=MICROBATCH_WINDOW_MS,
+    )
+
+@app.on_event("startup")
+def start_model_loading():
+    """Load the model off the event loop: /live answers meanwhile, /ready once it is warm"""
+    def load_then_watch():
+        load_startup_model()
+        model_manager.start()
+    threading.Thread(target=load_then_watch, name="model-startup", daemon=True).start()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    model_manager.stop()
+    if micro_batcher is not None:
+        await micro_batcher.stop()
+
+@app.post("/predict")
+async def predict_energy(data: EnergyRequest):
+    active = active_model()
+    quantiles = parse_quantiles(data.quantiles)
+
+    if quantiles is not None:
+        mean, bands = await run_in_threadpool(predict_quantiles, [data.machine], [data.hour], [data.day], active, quantiles)
+        return {
+            "predicted_energy": round(float(mean[0]), 2),
+            "quantiles": {name: values[0] for name, values in quantile_columns(quantiles, bands).items()},
+        }
+    if micro_batcher is not None:
+        prediction = await micro_batcher.submit((data.machine, data.hour, data.day), active)
+    else:
+        prediction = (await run_in_threadpool(cached_predict_rows, [data.machine], [data.hour], [data.day], active))[0]
     return {"predicted_energy": round(prediction, 2)}
 
+def predict_bulk_body(body, content_type, kind, quantiles, active):
+    """Decode, predict and encode one /predict/bulk request"""
+    with stage("validation"):
+        machines, hours, days, document = read_rows(body, content_type, MACHINES, MAX_BULK_ROWS)
+        if document is not None and document.get("quantiles") is not None:
+            quantiles = document["quantiles"]
+        quantiles = parse_quantiles(quantiles)
+
+    if quantiles is not None:
+        mean, bands = predict_quantiles(machines, hours, days, active, quantiles) if len(machines) else \
+            (np.empty(0), np.empty((len(quantiles), 0)))
+        predictions = np.round(mean, 2)
+        bands = {f"{q:g}": values for q, values in zip(quantiles.tolist(), np.round(bands, 2))}
+        return encode_response(
+            kind,
+            {"predicted_energy": predictions, "quantiles": bands, "count": len(predictions)},
+            {"predicted_energy": predictions, **bands},
+        )
+    predictions = np.round(predict_rows(machines, hours, days, active), 2) if len(machines) else np.empty(0)
+    return encode_response(kind, {"predicted_energy": predictions, "count": len(predictions)}, {"predicted_energy": predictions})
+
+@app.post("/predict/bulk", openapi_extra=openapi_body(BulkEnergyRequest, raw=True))
+async def predict_energy_bulk(request: Request, quantiles: Optional[str] = None):
+    """Predict many (machine, hour, day) rows with a single model call.
+
+    Takes and returns parallel columns as JSON, MessagePack or raw little-endian arrays,
+    chosen by Content-Type and Accept (see columnar.py)."""
+    active = active_model()
+    kind = negotiate(request.headers.get("accept"))
+    body = await request.body()
+    return await run_in_threadpool(predict_bulk_body, body, request.headers.get("content-type"), kind, quantiles, active)
+
 @app.get("/")
 def root():
+    model_loaded = model_manager.current is not None
     return {
         "message": "Smart Factory Energy Optimizer Backend Running",
-        "model_loaded": MODEL_LOADED,
-        "status": "ready" if MODEL_LOADED else "model missing"
+        "model_loaded": model_loaded,
+        "status": "ready" if startup.ready else "loading" if startup.error is None else "model missing"
     }
 
 @app.get("/health")
 def health_check():
     return {
         "status": "healthy",
-        "model_loaded": MODEL_LOADED
+        "model_loaded": model_manager.current is not None,
+        "ready": startup.ready
     }
 
 @app.get("/machines")
@@ -89,39 +365,607 @@ def get_machines():
     }
 
 @app.get("/predict/batch")
-def get_batch_predictions():
+def get_batch_predictions(quantiles: Optional[str] = None):
     """Get sample predictions for all machines at current time"""
-    if not MODEL_LOADED:
-        raise HTTPException(status_code=503, detail="ML model not available.")
+    active = active_model()
+    quantiles = parse_quantiles(quantiles)
     
-    from datetime import datetime
-    now = datetime.now()
+    now = utc_now()
     hour = now.hour
     day = now.day
     
+    if quantiles is not None:
+        predictions, bands = predict_quantiles(MACHINES, [hour] * len(MACHINES), [day] * len(MACHINES), active, quantiles)
+        bands = quantile_columns(quantiles, bands)
+    else:
+        predictions = cached_predict_rows(MACHINES, [hour] * len(MACHINES), [day] * len(MACHINES), active)
+
     results = []
-    for machine in ["Machine_A", "Machine_B", "Machine_C"]:
-        # Create the prediction request
-        machine_features = {"machine_Machine_B": 0, "machine_Machine_C": 0}
-        if machine == "Machine_B":
-            machine_features["machine_Machine_B"] = 1
-        elif machine == "Machine_C":
-            machine_features["machine_Machine_C"] = 1
-
-        features_data = {
-            'hour': [hour],
-            'day': [day],
-            'machine_Machine_B': [machine_features["machine_Machine_B"]],
-            'machine_Machine_C': [machine_features["machine_Machine_C"]]
-        }
-        X = pd.DataFrame(features_data)
-        prediction = model.predict(X)[0]
-        
+    for i, (machine, prediction) in enumerate(zip(MACHINES, predictions)):
         results.append({
             "machine": machine,
-            "predicted_energy": round(prediction, 2),
+            "predicted_energy": round(float(prediction), 2),
             "hour": hour,
             "day": day
         })
+        if quantiles is not None:
+            results[-1]["quantiles"] = {name: values[i] for name, values in bands.items()}
     
     return {"predictions": results, "timestamp": now.isoformat()}
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    """Prediction cache counters, for sizing PREDICTION_CACHE_SIZE"""
+    return prediction_cache.stats()
+
+@app.get("/microbatch/stats")
+def get_micro_batch_stats():
+    """Achieved batch sizes for the /predict coalescer"""
+    if micro_batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **micro_batcher.stats()}
+
+@app.get("/predict/grid")
+def get_prediction_grid(machine: Optional[str] = None, hour: Optional[int] = None, day: Optional[int] = None):
+    """Return a slice of the precomputed (machine, hour, day) prediction tensor"""
+    prediction_grid = active_model().grid
+    if prediction_grid is None:
+        raise HTTPException(status_code=503, detail="Prediction grid not available.")
+    if hour is not None and not 0 <= hour < GRID_HOURS:
+        raise HTTPException(status_code=422, detail=f"hour must be in [0, {GRID_HOURS - 1}]")
+    if day is not None and not 1 <= day <= GRID_DAYS:
+        raise HTTPException(status_code=422, detail=f"day must be in [1, {GRID_DAYS}]")
+
+    if machine is not None and machine not in prediction_grid.machines:
+        raise HTTPException(status_code=404, detail=f"Machine {machine!r} is not in the prediction grid.")
+
+    machines = prediction_grid.machines if machine is None else [machine]
+    hours = list(range(GRID_HOURS)) if hour is None else [hour]
+    days = list(range(1, GRID_DAYS + 1)) if day is None else [day]
+
+    grid_slice = prediction_grid.values[np.ix_(prediction_grid.machine_index(machines), hours, [d - 1 for d in days])]
+    return {
+        "machines": machines,
+        "hours": hours,
+        "days": days,
+        "predicted_energy": np.round(grid_slice, 2).tolist()
+    }
+
+def check_admin_token(token, required=False):
+    """Admin reads are open without ADMIN_TOKEN; admin actions (required=True) are not"""
+    if required and not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin actions are disabled; set ADMIN_TOKEN to enable them.")
+    if ADMIN_TOKEN and token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+
+@app.get("/admin/model")
+def get_model_status(x_admin_token: Optional[str] = Header(None)):
+    """Active model version, load/warm timings and reload history"""
+    check_admin_token(x_admin_token)
+    return {"format": MODEL_FORMAT, **model_manager.status()}
+
+@app.post("/admin/model/reload")
+def reload_model(force: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """Load, warm and swap in the model artifact now instead of waiting for the next poll"""
+    check_admin_token(x_admin_token, required=True)
+    try:
+        reloaded = model_manager.reload(force=force)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Model artifact {model_manager.path} not found.")
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {exc}")
+    return {"reloaded": reloaded, "format": MODEL_FORMAT, **model_manager.status()}
+
+# Reading log written by data_simulator.py or POST /readings (model.py trains on it)
+ENERGY_DATA_PATH = os.getenv("ENERGY_DATA_PATH", "energy_data.csv")
+# Running per-machine stats maintained next to the reading log
+STATS_PATH = os.getenv("STATS_PATH", stats_path(ENERGY_DATA_PATH))
+_fleet_stats = {"mtime": None, "stats": None}
+
+def load_fleet_stats():
+    """Load the stats sidecar, re-reading it only when it has changed"""
+    mtime = os.path.getmtime(STATS_PATH)
+    if mtime != _fleet_stats["mtime"]:
+        _fleet_stats["stats"] = FleetStats.load(STATS_PATH)
+        _fleet_stats["mtime"] = mtime
+    return _fleet_stats["stats"]
+
+@app.get("/stats")
+def get_stats(machine: Optional[str] = None):
+    """Per-machine count, mean/std, min/max and time range of recorded readings"""
+    try:
+        stats = load_fleet_stats()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="No statistics recorded yet. Run data_simulator.py first.")
+    if machine is not None:
+        if machine not in stats.index:
+            raise HTTPException(status_code=404, detail=f"No readings for machine: {machine}")
+        return {"machine": machine, **stats.machine_summary(machine)}
+    return {"total_records": stats.total_count, "machines": stats.summary()}
+
+# Day-partitioned reading history written by data_simulator.py --history
+HISTORY_PATH = os.getenv("HISTORY_PATH", "history")
+# Upper bound on points returned by one /history query
+MAX_HISTORY_POINTS = int(os.getenv("MAX_HISTORY_POINTS", "100000"))
+_history = {"store": None}
+
+def history_store():
+    if _history["store"] is None:
+        if not os.path.isdir(HISTORY_PATH):
+            raise HTTPException(status_code=404, detail="No history recorded yet. Run data_simulator.py --history first.")
+        _history["store"] = HistoryStore(HISTORY_PATH)
+    return _history["store"]
+
+def naive_utc(value):
+    """Stored timestamps are naive UTC; convert aware query values to match"""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+@app.get("/history")
+def get_history(
+    machine: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    resolution: str = "hour",
+):
+    """Readings for [from, to) (default: the last 24h) as raw rows or hourly/daily count/mean/min/max"""
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {list(RESOLUTIONS)}")
+    end = naive_utc(end) if end else utc_now()
+    start = naive_utc(start) if start else end - timedelta(days=1)
+    try:
+        result = history_store().query(start, end, machine, resolution)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No history for machine: {machine}")
+    count = len(result["timestamp"])
+    if count > MAX_HISTORY_POINTS:
+        raise HTTPException(status_code=400, detail=f"{count} points requested (limit {MAX_HISTORY_POINTS}); use a coarser resolution or a shorter range")
+
+    stamps = np.asarray(result["timestamp"], dtype="datetime64[ns]")
+    columns = {}
+    for name, values in result.items():
+        if name != "timestamp":
+            values = np.asarray(values)
+            # Energies are stored as float32; report them at the precision they were recorded with
+            columns[name] = values.round(2) if values.dtype.kind == "f" else values
+    # Returned directly so FastJSONResponse writes the numpy columns without a jsonable_encoder pass
+    return FastJSONResponse({
+        "machine": machine,
+        "resolution": resolution,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "points": count,
+        "timestamp": np.datetime_as_string(stamps, unit="us" if resolution == "raw" else "s").tolist(),
+        **columns,
+    })
+
+# Upper bound on readings accepted by POST /readings in a single request
+MAX_INGEST_ROWS = int(os.getenv("MAX_INGEST_ROWS", "100000"))
+
+class ReadingBatch(BaseModel):
+    # Parallel columns; timestamps are ISO 8601 strings, naive ones taken as UTC. Documents the JSON/MessagePack body of /readings
+    machine: List[str]
+    energy: List[float]
+    timestamp: List[str]
+
+class IngestLock:
+    """Serialise ingest across threads and uvicorn worker processes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            import fcntl
+        except ImportError:  # Windows: single-process only
+            return self
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "a")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            self._file.close()  # releases the flock
+            self._file = None
+        self._lock.release()
+
+ingest_lock = IngestLock(os.path.join(HISTORY_PATH, ".ingest.lock"))
+
+# Streaming anomaly detection: every reading is scored as POST /readings accepts it,
+# against EWMA state shared by all workers through a sidecar next to the reading log
+ANOMALY_DETECTION = os.getenv("ANOMALY_DETECTION", "true").lower() == "true"
+ANOMALY_STATE_PATH = os.getenv("ANOMALY_STATE_PATH", detector_path(ENERGY_DATA_PATH))
+anomaly_detector = AnomalyDetector(
+    alpha=float(os.getenv("ANOMALY_ALPHA", "0.1")),
+    z_threshold=float(os.getenv("ANOMALY_Z_THRESHOLD", "4")),
+    residual_threshold=float(os.getenv("ANOMALY_RESIDUAL_THRESHOLD", "0.5")),
+    warmup=int(os.getenv("ANOMALY_WARMUP", "20")),
+    max_alerts=int(os.getenv("MAX_ALERTS", "1000")),
+    path=ANOMALY_STATE_PATH,
+)
+
+def validate_readings(document):
+    """Check a decoded batch as whole columns; returns (machines, energies, timestamps) arrays"""
+    missing = [name for name in ("machine", "energy", "timestamp") if document.get(name) is None]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Missing columns: {missing}")
+    machine_names = string_column(document["machine"], "machine")
+    energies = float_column(document["energy"], "energy")
+    timestamp_strings = string_column(document["timestamp"], "timestamp")
+    if not len(machine_names) == len(energies) == len(timestamp_strings):
+        raise HTTPException(status_code=422, detail="Columns 'machine', 'energy' and 'timestamp' must have the same length.")
+    if len(machine_names) > MAX_INGEST_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_INGEST_ROWS} readings per request.")
+    bad = np.flatnonzero(~np.isfinite(energies) | (energies < 0))
+    if bad.size:
+        raise HTTPException(status_code=422, detail=f"Invalid energy at rows {bad[:10].tolist()}")
+    try:
+        # Strings with an offset are converted to UTC, the zone naive ones are taken to be in
+        timestamps = timestamp_strings.astype("datetime64[ns]")
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=f"Invalid timestamp: {exc}")
+    bad = np.flatnonzero(np.isnat(timestamps))
+    if bad.size:
+        raise HTTPException(status_code=422, detail=f"Missing timestamp at rows {bad[:10].tolist()}")
+    # Names are few and distinct; they must survive the CSV and fixed-width bin logs unchanged
+    bad = [name for name in np.unique(machine_names).tolist() if not storable_machine_name(name)]
+    if bad:
+        raise HTTPException(status_code=422, detail=f"Invalid machine names {bad[:10]}: use 1-{MACHINE_NAME_BYTES} "
+                                                    "ASCII characters without commas or line breaks.")
+    return machine_names.astype(object), energies, timestamps
+
+@app.post("/readings", openapi_extra=openapi_body(ReadingBatch))
+async def ingest_readings(request: Request):
+    """Append a batch of readings (JSON or MessagePack columns) to the reading log, running stats and history store"""
+    body = await request.body()
+    return await run_in_threadpool(ingest_body, body, request.headers.get("content-type"))
+
+def ingest_body(body, content_type):
+    with stage("validation"):
+        machines, energies, timestamps = validate_readings(decode_document(body, content_type))
+    if len(machines) == 0:
+        return {"accepted": 0}
+    if ANOMALY_DETECTION:
+        # Model residuals are computed before taking the lock other workers are waiting on
+        predictions = reading_predictions({"machine": machines, "timestamp": timestamps}, model_manager.current)
+
+    with ingest_lock:
+        with ReadingWriter(ENERGY_DATA_PATH) as writer:
+            writer.write_columns(machines, energies, timestamps)
+
+        try:
+            stats = load_fleet_stats()
+        except FileNotFoundError:
+            stats = FleetStats()
+        stats.update(machines, energies, timestamps)
+        stats.save(STATS_PATH)
+        _fleet_stats.update(mtime=os.path.getmtime(STATS_PATH), stats=stats)
+
+        if _history["store"] is None:
+            _history["store"] = HistoryStore(HISTORY_PATH)
+        # Other workers may have registered machines or days since our last look
+        _history["store"].refresh()
+        _history["store"].append(machines, energies, timestamps)
+
+        if ANOMALY_DETECTION:
+            # Under the ingest lock, so each reading is scored once, in arrival order, whichever worker took it
+            anomaly_detector.score(machines, energies, timestamps, predictions)
+    return {"accepted": len(machines)}
+
+# Seconds between live events pushed to GET /stream subscribers; 0 disables the stream
+LIVE_TICK_SECONDS = float(os.getenv("LIVE_TICK_SECONDS", "5"))
+# Events buffered per subscriber before its oldest ones are dropped
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "16"))
+broadcaster = Broadcaster(LIVE_QUEUE_SIZE)
+_live = {"task": None, "alert_id": 0}
+
+def read_window(since, until):
+    """Every reading recorded in [since, until) from the history store, or None"""
+    if _history["store"] is None and not os.path.isdir(HISTORY_PATH):
+        return None
+    raw = history_store().query(since, until, None, "raw")
+    return raw if len(raw["timestamp"]) else None
+
+def latest_readings(raw):
+    """Newest reading per machine in a window"""
+    if raw is None:
+        return {"machine": [], "energy": [], "timestamp": []}
+    # Last occurrence of each machine
+    machines = np.asarray(raw["machine"])[::-1]
+    names, first = np.unique(machines, return_index=True)
+    latest = len(machines) - 1 - first
+    return {
+        "machine": names.tolist(),
+        "energy": raw["energy"][latest].round(2).tolist(),
+        "timestamp": np.datetime_as_string(raw["timestamp"][latest], unit="s").tolist(),
+    }
+
+def reading_predictions(raw, active):
+    """Model prediction for each reading of a machine the model knows (NaN for the rest)"""
+    machines = np.asarray(raw["machine"], dtype=str)
+    predictions = np.full(len(machines), np.nan)
+    if active is None:
+        return predictions
+    known = np.isin(machines, active.encoder.machines)
+    if known.any():
+        hours, days = hours_and_days(raw["timestamp"][known])
+        predictions[known] = predict_rows(machines[known], hours, days, active)
+    return predictions
+
+def build_live_event(raw, until):
+    """One tick's payload, computed once and shared by every subscriber"""
+    event = {"timestamp": until.isoformat(), "readings": latest_readings(raw), "predictions": {}}
+    active = model_manager.current
+    if active is not None:
+        predictions = cached_predict_rows(MACHINES, [until.hour] * len(MACHINES), [until.day] * len(MACHINES), active)
+        event["predictions"] = {machine: round(float(value), 2) for machine, value in zip(MACHINES, predictions)}
+    return event
+
+def run_tick(since, until, build_event):
+    """Alerts raised (by any worker) since the last tick and, if anyone listens, the tick event"""
+    alerts = anomaly_detector.recent(since_id=_live["alert_id"], limit=0)
+    if alerts:
+        _live["alert_id"] = alerts[-1]["id"]
+    return alerts, build_live_event(read_window(since, until), until) if build_event else None
+
+async def live_tick_loop():
+    since = utc_now()
+    # Only alerts raised from now on are pushed to subscribers
+    _live["alert_id"] = (await run_in_threadpool(anomaly_detector.stats))["alerts_total"]
+    while True:
+        await asyncio.sleep(LIVE_TICK_SECONDS)
+        until = utc_now()
+        try:
+            # New alerts are pushed every tick; the tick event is only built while someone is subscribed
+            alerts, event = await run_in_threadpool(run_tick, since, until, broadcaster.subscribers > 0)
+            if alerts:
+                broadcaster.publish("alert", {"alerts": alerts})
+            if event is not None:
+                broadcaster.publish("tick", event)
+        except Exception as exc:
+            print(f"Warning: live tick failed: {exc!r}")
+        since = until
+
+@app.on_event("startup")
+async def start_live_stream():
+    if LIVE_TICK_SECONDS > 0:
+        _live["task"] = asyncio.get_running_loop().create_task(live_tick_loop())
+
+@app.on_event("shutdown")
+async def stop_live_stream():
+    if _live["task"] is not None:
+        _live["task"].cancel()
+        _live["task"] = None
+
+@app.get("/stream")
+async def stream_events(request: Request):
+    """Server-Sent Events: a 'tick' event every LIVE_TICK_SECONDS with new readings and predictions,
+    and an 'alert' event whenever anomalies are detected"""
+    if _live["task"] is None:
+        raise HTTPException(status_code=503, detail="Live stream disabled (LIVE_TICK_SECONDS=0).")
+    queue = broadcaster.subscribe()
+    return StreamingResponse(
+        broadcaster.stream(queue, request.is_disconnected),
+        media_type="text/event-stream",
+        # Keep proxies (nginx) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/stream/stats")
+def get_stream_stats():
+    """Subscriber count and events dropped for slow clients"""
+    return {"tick_seconds": LIVE_TICK_SECONDS, **broadcaster.stats()}
+
+@app.get("/alerts")
+def get_alerts(machine: Optional[str] = None, since_id: int = 0, limit: int = 100):
+    """Recent anomaly alerts (oldest first); poll with since_id = the last id seen"""
+    alerts = anomaly_detector.recent(machine, since_id, limit)
+    result = {"alerts": alerts, "detector": {"enabled": ANOMALY_DETECTION, **anomaly_detector.stats()}}
+    state = anomaly_detector.machine_state(machine) if machine is not None else None
+    if state is not None:
+        result["state"] = state
+    return result
+
+# Whole-horizon forecasts, shared by every caller within a UTC hour
+forecast_cache = ForecastCache(MAX_HORIZON)
+_forecast = {"task": None}
+
+def current_forecast(active):
+    return forecast_cache.get(MACHINES, active.version, lambda m, h, d: predict_rows(m, h, d, active))
+
+async def forecast_refresh_loop():
+    """Rebuild the forecast just after the top of each hour, before requests ask for it"""
+    while True:
+        await asyncio.sleep(seconds_to_next_hour() + 1)
+        active = model_manager.current
+        if active is not None:
+            try:
+                await run_in_threadpool(current_forecast, active)
+            except Exception as exc:
+                print(f"Warning: forecast refresh failed: {exc!r}")
+
+def prewarm(active):
+    """First requests should not pay for lazy work: open the history store, build this hour's forecast"""
+    if os.path.isdir(HISTORY_PATH):
+        history_store()
+    current_forecast(active)
+
+def load_startup_model():
+    """Cold start after the imports: ML libraries, model load and warm-up, then prewarm(); True once ready"""
+    if startup.ready:
+        return True
+    try:
+        with startup.phase("ml_imports"):
+            import_model_libraries()
+        model_manager.reload()
+    except FileNotFoundError:
+        if MODEL_FORMAT == "compiled":
+            startup.fail(f"{COMPILED_MODEL_PATH} not found. Please run compiled_forest.py first.")
+        else:
+            startup.fail(f"{MODEL_PATH} not found. Please run create_model.py first.")
+        return False
+    except Exception as exc:
+        startup.fail(f"Model load failed: {exc!r}")
+        return False
+
+    active = model_manager.current
+    for name, seconds in active.timings.items():
+        startup.record(name, seconds)
+    with startup.phase("prewarm"):
+        try:
+            prewarm(active)
+        except Exception as exc:
+            print(f"Warning: prewarm failed: {exc!r}")
+    startup.mark_ready()
+    return True
+
+def ready_after_late_load(new, previous):
+    """A model that shows up after a failed startup load (hot reload, /admin/model/reload) makes the app ready"""
+    if startup.error is not None:
+        for name, seconds in new.timings.items():
+            startup.record(name, seconds)
+        startup.mark_ready()
+
+model_manager.on_swap(ready_after_late_load)
+
+@app.on_event("startup")
+async def start_forecast_refresh():
+    _forecast["task"] = asyncio.get_running_loop().create_task(forecast_refresh_loop())
+
+@app.on_event("shutdown")
+async def stop_forecast_refresh():
+    if _forecast["task"] is not None:
+        _forecast["task"].cancel()
+        _forecast["task"] = None
+
+@app.get("/forecast")
+def get_forecast(horizon: int = 24, machine: Optional[str] = None):
+    """Hourly predictions for the next `horizon` hours (from the start of the current hour)"""
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise HTTPException(status_code=422, detail=f"horizon must be in [1, {MAX_HORIZON}]")
+    if machine is not None and machine not in MACHINES:
+        raise HTTPException(status_code=404, detail=f"Unknown machine: {machine}")
+    forecast = current_forecast(active_model())
+    predictions = forecast.predictions[:, :horizon]
+    machines = forecast.machines if machine is None else [machine]
+    rows = predictions if machine is None else predictions[[forecast.machines.index(machine)]]
+    return {
+        "start": forecast.start.isoformat(),
+        "horizon": horizon,
+        "model_version": forecast.version,
+        "timestamp": np.datetime_as_string(forecast.timestamps[:horizon], unit="s").tolist(),
+        "predicted_energy": {name: values.tolist() for name, values in zip(machines, np.round(rows, 2))},
+        "total": np.round(rows.sum(axis=0), 2).tolist(),
+    }
+
+@app.get("/forecast/stats")
+def get_forecast_stats():
+    return forecast_cache.stats()
+
+# Upper bound on jobs accepted by /optimize/schedule in a single request
+MAX_SCHEDULE_JOBS = int(os.getenv("MAX_SCHEDULE_JOBS", "20000"))
+
+class ScheduleJob(BaseModel):
+    id: Optional[str] = None
+    duration: int                          # hours
+    machines: Optional[List[str]] = None   # eligible machines, default any
+    release: int = 0                       # earliest start, hours after the current hour
+    deadline: Optional[int] = None         # latest finish, hours after the current hour
+    load: float = 1.0                      # share of the machine's predicted hourly energy
+
+class ScheduleRequest(BaseModel):
+    jobs: List[ScheduleJob]
+    objective: str = "cost"
+    horizon: int = MAX_HORIZON
+    # Price per kWh for each hour of the horizon (default 1, i.e. minimise energy)
+    tariff: Optional[List[float]] = None
+    # Fleet load limit, one value or one per hour
+    peak_cap: Optional[Union[float, List[float]]] = None
+    # Jobs one machine can run in the same hour
+    machine_capacity: Optional[int] = None
+
+def schedule_columns(request):
+    """Validate a schedule request; returns the job columns the solver takes"""
+    if request.objective not in OBJECTIVES:
+        raise HTTPException(status_code=422, detail=f"objective must be one of {list(OBJECTIVES)}")
+    if not 1 <= request.horizon <= MAX_HORIZON:
+        raise HTTPException(status_code=422, detail=f"horizon must be in [1, {MAX_HORIZON}]")
+    if len(request.jobs) > MAX_SCHEDULE_JOBS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_SCHEDULE_JOBS} jobs per request.")
+    for name, curve in (("tariff", request.tariff), ("peak_cap", request.peak_cap)):
+        if isinstance(curve, list) and len(curve) != request.horizon:
+            raise HTTPException(status_code=422, detail=f"{name} needs one value per hour of the horizon ({request.horizon}).")
+    if request.tariff is not None:
+        tariff = np.asarray(request.tariff, dtype=np.float64)
+        if not (np.isfinite(tariff) & (tariff >= 0)).all():
+            raise HTTPException(status_code=422, detail="tariff values must be finite and non-negative.")
+    if request.peak_cap is not None:
+        peak_cap = np.asarray(request.peak_cap, dtype=np.float64)
+        if not (np.isfinite(peak_cap) & (peak_cap > 0)).all():
+            raise HTTPException(status_code=422, detail="peak_cap values must be finite and positive.")
+    if request.machine_capacity is not None and request.machine_capacity < 1:
+        raise HTTPException(status_code=422, detail="machine_capacity must be at least 1.")
+
+    jobs = request.jobs
+    duration = np.array([job.duration for job in jobs], dtype=np.int64)
+    release = np.array([job.release for job in jobs], dtype=np.int64)
+    deadline = np.array([request.horizon if job.deadline is None else job.deadline for job in jobs], dtype=np.int64)
+    load = np.array([job.load for job in jobs], dtype=np.float64)
+    invalid = (duration < 1) | (release < 0) | (deadline > request.horizon) | (release + duration > deadline) | \
+        ~np.isfinite(load) | (load <= 0)
+    if invalid.any():
+        raise HTTPException(status_code=422, detail=f"Jobs {np.flatnonzero(invalid)[:10].tolist()} need 1 <= duration, 0 <= release, "
+                                                    f"release + duration <= deadline <= horizon and a positive load.")
+    eligible = np.ones((len(jobs), len(MACHINES)), dtype=bool)
+    for i, job in enumerate(jobs):
+        if job.machines is not None:
+            unknown = set(job.machines) - set(MACHINES)
+            if unknown:
+                raise HTTPException(status_code=422, detail=f"Job {i}: unknown machines {sorted(unknown)}")
+            eligible[i] = np.isin(MACHINES, job.machines)
+    return duration, eligible, release, deadline, load
+
+@app.post("/optimize/schedule")
+def optimize_schedule(request: ScheduleRequest):
+    """Assign each job a machine and start hour that minimise energy cost or peak fleet load,
+    using the hourly forecast as the cost surface"""
+    with stage("validation"):
+        columns = schedule_columns(request)
+    forecast = current_forecast(active_model())
+    predictions = forecast.predictions[:, :request.horizon]
+    scheduler = Scheduler(predictions, request.tariff, request.peak_cap, request.machine_capacity)
+    schedule = scheduler.solve(*columns, objective=request.objective)
+
+    stamps = np.datetime_as_string(np.datetime64(forecast.start, "h") + np.arange(request.horizon + 1), unit="s")
+    jobs = []
+    for i, job in enumerate(request.jobs):
+        if not schedule.scheduled[i]:
+            continue
+        start = int(schedule.start[i])
+        jobs.append({
+            "id": job.id if job.id is not None else str(i),
+            "machine": forecast.machines[schedule.machine[i]],
+            "start_hour": start,
+            "start": str(stamps[start]),
+            "end": str(stamps[start + job.duration]),
+            "cost": round(float(schedule.cost[i]), 2),
+            "energy": round(float(schedule.energy[i]), 2),
+        })
+    return {
+        "start": forecast.start.isoformat(),
+        "objective": request.objective,
+        "model_version": forecast.version,
+        "feasible": schedule.feasible,
+        "jobs": jobs,
+        "unscheduled": [job.id if job.id is not None else str(i) for i, job in enumerate(request.jobs) if not schedule.scheduled[i]],
+        "total_cost": round(float(np.nansum(schedule.cost)), 2),
+        "baseline_cost": round(float(np.nansum(schedule.baseline_cost[schedule.scheduled])), 2),
+        "total_energy": round(float(np.nansum(schedule.energy)), 2),
+        "peak_load": round(float(schedule.load.max()), 2),
+        "load": np.round(schedule.load, 2).tolist(),
+        "repair_moves": schedule.moves,
+        "solve_seconds": round(schedule.seconds, 4),
+    }
@@ -2,9 +2,23 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import json
+import itertools
+from bisect import bisect_right
 from pydantic import BaseModel
 from datetime import datetime
 
+try:
+    from metrics import instrument
+    from startup import StartupProfile, add_probes
+except ImportError:  # imported as backend.<app> from the repo root (Procfile, render.yaml)
+    from .metrics import instrument
+    from .startup import StartupProfile, add_probes
+
+try:
+    import numpy as np
+except ImportError:  # ultra-simple deployments only ship fastapi/uvicorn
+    np = None
+
 app = FastAPI(title="Smart Factory Energy Optimizer")
 
 # Get CORS origins from environment variable, default to localhost for development
@@ -19,6 +33,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency and in-flight requests at GET /metrics (needs prometheus_client)
+instrument(app)
+
+# GET /live and GET /ready; ready once the lookup table is loaded
+startup = StartupProfile()
+add_probes(app, startup)
+
+@app.on_event("startup")
+def mark_ready():
+    startup.mark_ready()
+
 class EnergyRequest(BaseModel):
     machine: str
     hour: int
@@ -37,6 +62,67 @@ PREDICTION_TABLE = {
     ("Machine_C", 1): {"low_temp": 117.3, "normal_temp": 129.9, "high_temp": 147.7},
 }
 
+# Dense machine x hour x day x temperature x humidity table sampled from the
+# real 5-feature model by build_prediction_table.py. PREDICTION_TABLE above is
+# only used when the file (or numpy) is not available.
+PREDICTION_TABLE_PATH = os.getenv(
+    "PREDICTION_TABLE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "prediction_table.npz")
+)
+INTERPOLATED_AXES = ("hours", "days", "temperatures", "humidities")
+
+def load_model_table(path):
+    """Load the generated lookup table, or None to fall back to PREDICTION_TABLE"""
+    if np is None or not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+with startup.phase("table_load"):
+    MODEL_TABLE = load_model_table(PREDICTION_TABLE_PATH)
+MACHINE_INDEX = {str(m): i for i, m in enumerate(MODEL_TABLE["machines"])} if MODEL_TABLE else {}
+# Python copies of the axes for the per-request path, where numpy call overhead dominates
+AXIS_LISTS = [MODEL_TABLE[name].tolist() for name in INTERPOLATED_AXES] if MODEL_TABLE else []
+CORNERS = list(itertools.product((0, 1), repeat=len(INTERPOLATED_AXES)))
+
+def interpolate_predictions(machine_idx, hours, days, temperatures, humidities):
+    """Vectorized multilinear interpolation over MODEL_TABLE; points outside the grid are clamped"""
+    table = MODEL_TABLE["table"]
+    lower, weights = [], []
+    for name, values in zip(INTERPOLATED_AXES, (hours, days, temperatures, humidities)):
+        axis = MODEL_TABLE[name]
+        values = np.clip(np.asarray(values, dtype=np.float64), axis[0], axis[-1])
+        index = np.clip(np.searchsorted(axis, values, side="right") - 1, 0, len(axis) - 2)
+        lower.append(index)
+        weights.append((values - axis[index]) / (axis[index + 1] - axis[index]))
+
+    # Weighted sum over the 2^4 surrounding grid corners
+    result = np.zeros(len(lower[0]))
+    for corner in itertools.product((0, 1), repeat=len(INTERPOLATED_AXES)):
+        index = (np.asarray(machine_idx),) + tuple(i + c for i, c in zip(lower, corner))
+        weight = np.prod([w if c else 1 - w for w, c in zip(weights, corner)], axis=0)
+        result += weight * table[index]
+    return result
+
+def interpolate_one(machine_idx, hour, day, temperature, humidity):
+    """interpolate_predictions for a single point, in plain Python"""
+    lower, weights = [], []
+    for axis, value in zip(AXIS_LISTS, (hour, day, temperature, humidity)):
+        value = min(max(float(value), axis[0]), axis[-1])
+        index = min(max(bisect_right(axis, value) - 1, 0), len(axis) - 2)
+        lower.append(index)
+        weights.append((value - axis[index]) / (axis[index + 1] - axis[index]))
+
+    item = MODEL_TABLE["table"].item
+    result = 0.0
+    for corner in CORNERS:
+        weight = 1.0
+        for w, c in zip(weights, corner):
+            weight *= w if c else 1 - w
+        if weight:
+            result += weight * item(machine_idx, *(i + c for i, c in zip(lower, corner)))
+    return result
+
 @app.get("/")
 async def root():
     return {"message": "Smart Factory Energy Optimizer API", "status": "running"}
@@ -45,36 +131,50 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
-@app.post("/predict")
-async def predict_energy(data: EnergyRequest):
-    """
-    Predict energy consumption using pre-computed values from trained RandomForest model
+def estimate_energy(machine, hour, day, temperature, humidity):
+    """Prediction for one request as (predicted_energy, work_hours, temperature_category, model_info).
+
+    Raises KeyError for an unknown machine.
     """
     # Determine work hours (binary feature)
-    work_hours = 1 if 8 <= data.hour <= 18 else 0
-    
-    # Get base prediction from lookup table
-    key = (data.machine, work_hours)
-    if key not in PREDICTION_TABLE:
-        raise HTTPException(status_code=400, detail=f"Unknown machine: {data.machine}")
+    work_hours = 1 if 8 <= hour <= 18 else 0
     
     # Determine temperature category
-    if data.temperature < 20:
+    if temperature < 20:
         temp_category = "low_temp"
-    elif data.temperature > 30:
+    elif temperature > 30:
         temp_category = "high_temp"
     else:
         temp_category = "normal_temp"
     
-    base_prediction = PREDICTION_TABLE[key][temp_category]
-    
-    # Apply humidity adjustment (similar to original model)
-    humidity_factor = 1.0 + (abs(data.humidity - 60) * 0.005)
-    
-    # Apply day of week adjustment
-    day_factor = 1.1 if data.day in [1, 2, 3, 4, 5] else 0.9  # Weekday vs weekend
-    
-    predicted_energy = base_prediction * humidity_factor * day_factor
+    if MODEL_TABLE is not None:
+        predicted_energy = interpolate_one(MACHINE_INDEX[machine], hour, day, temperature, humidity)
+        model_info = "RandomForest model predictions (interpolated lookup table)"
+    else:
+        # Get base prediction from lookup table
+        base_prediction = PREDICTION_TABLE[(machine, work_hours)][temp_category]
+        
+        # Apply humidity adjustment (similar to original model)
+        humidity_factor = 1.0 + (abs(humidity - 60) * 0.005)
+        
+        # Apply day of week adjustment
+        day_factor = 1.1 if day in [1, 2, 3, 4, 5] else 0.9  # Weekday vs weekend
+        
+        predicted_energy = base_prediction * humidity_factor * day_factor
+        model_info = "RandomForest model predictions (pre-computed)"
+    return predicted_energy, work_hours, temp_category, model_info
+
+@app.post("/predict")
+async def predict_energy(data: EnergyRequest):
+    """
+    Predict energy consumption using pre-computed values from trained RandomForest model
+    """
+    try:
+        predicted_energy, work_hours, temp_category, model_info = estimate_energy(
+            data.machine, data.hour, data.day, data.temperature, data.humidity
+        )
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown machine: {data.machine}")
     
     return {
         "predicted_energy": round(predicted_energy, 2),
@@ -82,7 +182,7 @@ async def predict_energy(data: EnergyRequest):
         "work_hours": bool(work_hours),
         "temperature_category": temp_category,
         "timestamp": datetime.now().isoformat(),
-        "model_info": "RandomForest model predictions (pre-computed)"
+        "model_info": model_info
     }
 
 if __name__ == "__main__":
@@ -4,6 +4,13 @@ import os
 from pydantic import BaseModel
 from datetime import datetime
 
+try:
+    from metrics import instrument
+    from startup import StartupProfile, add_probes
+except ImportError:  # imported as backend.<app> from the repo root (Procfile, render.yaml)
+    from .metrics import instrument
+    from .startup import StartupProfile, add_probes
+
 app = FastAPI(title="Smart Factory Energy Optimizer")
 
 # Get CORS origins from environment variable, default to localhost for development
@@ -18,6 +25,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency and in-flight requests at GET /metrics (needs prometheus_client)
+instrument(app)
+
+# GET /live and GET /ready; nothing to load, so ready as soon as the app starts
+startup = StartupProfile()
+add_probes(app, startup)
+
+@app.on_event("startup")
+def mark_ready():
+    startup.mark_ready()
+
 class EnergyRequest(BaseModel):
     machine: str
     hour: int
@@ -33,27 +51,30 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
-@app.post("/predict")
-async def predict_energy(data: EnergyRequest):
-    """
-    Simple prediction endpoint without ML model for testing deployment
-    """
-    # Simple calculation based on inputs (temporary, for deployment testing)
+def calculate_energy(machine: str, hour: int, temperature: float, humidity: float) -> float:
+    """Simple calculation based on inputs (temporary, for deployment testing)"""
     base_energy = 100
     
     # Machine factors
-    machine_factor = {"Machine_A": 1.0, "Machine_B": 1.2, "Machine_C": 1.5}.get(data.machine, 1.0)
+    machine_factor = {"Machine_A": 1.0, "Machine_B": 1.2, "Machine_C": 1.5}.get(machine, 1.0)
     
     # Time factor (higher energy during work hours)
-    time_factor = 1.3 if 8 <= data.hour <= 18 else 0.8
+    time_factor = 1.3 if 8 <= hour <= 18 else 0.8
     
     # Temperature factor
-    temp_factor = 1.0 + (abs(data.temperature - 25) * 0.02)
+    temp_factor = 1.0 + (abs(temperature - 25) * 0.02)
     
     # Humidity factor  
-    humidity_factor = 1.0 + (abs(data.humidity - 60) * 0.01)
+    humidity_factor = 1.0 + (abs(humidity - 60) * 0.01)
     
-    predicted_energy = base_energy * machine_factor * time_factor * temp_factor * humidity_factor
+    return base_energy * machine_factor * time_factor * temp_factor * humidity_factor
+
+@app.post("/predict")
+async def predict_energy(data: EnergyRequest):
+    """
+    Simple prediction endpoint without ML model for testing deployment
+    """
+    predicted_energy = calculate_energy(data.machine, data.hour, data.temperature, data.humidity)
     
     return {
         "predicted_energy": round(predicted_energy, 2),
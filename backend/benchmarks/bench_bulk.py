@@ -0,0 +1,103 @@
+"""
+Decode/validate and encode cost of /predict/bulk payloads, per encoding.
+
+Compares the previous path (JSON parsed into a pydantic BulkEnergyRequest,
+response passed through FastAPI's jsonable_encoder and the stdlib JSON
+encoder) with the columnar one for JSON, MessagePack and raw little-endian
+bodies. Inference is left out: it is the same for every encoding. Reports
+microseconds per row on each side plus request and response sizes.
+
+Usage:
+    python benchmarks/bench_bulk.py [--rows 100 10000 100000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import columnar  # noqa: E402
+
+MACHINES = ["Machine_A", "Machine_B", "Machine_C"]
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - began)
+    return min(timings), result
+
+
+def payloads(rows, rng):
+    index = rng.integers(0, len(MACHINES), size=rows)
+    hours = rng.integers(0, 24, size=rows)
+    days = rng.integers(1, 32, size=rows)
+    document = {"machine": np.asarray(MACHINES)[index].tolist(), "hour": hours.tolist(), "day": days.tolist()}
+    raw = np.stack([index, hours, days]).astype(columnar.RAW_REQUEST_DTYPE).tobytes()
+    predictions = np.round(rng.uniform(80, 250, size=rows), 2)
+    return document, raw, predictions
+
+
+def pydantic_path(body, predictions):
+    """What /predict/bulk did before: per-element validation in, jsonable_encoder + json.dumps out"""
+    from fastapi.encoders import jsonable_encoder
+    from app_original import BulkEnergyRequest
+
+    def decode():
+        data = BulkEnergyRequest.model_validate(json.loads(body))
+        # The array conversion predict_rows/encode then did on the validated lists
+        return np.asarray(data.machine, dtype=str), np.asarray(data.hour), np.asarray(data.day)
+
+    def encode():
+        content = jsonable_encoder({"predicted_energy": predictions.tolist(), "count": len(predictions)})
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    return decode, encode
+
+
+def columnar_path(body, content_type, kind, predictions):
+    def decode():
+        return columnar.read_rows(body, content_type, MACHINES, len(predictions))
+
+    def encode():
+        response = columnar.encode_response(
+            kind, {"predicted_energy": predictions, "count": len(predictions)}, {"predicted_energy": predictions},
+        )
+        return response.body
+    return decode, encode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"orjson {'yes' if columnar.orjson else 'no'}, msgpack {'yes' if columnar.msgpack else 'no'}; best of {args.repeat}")
+    print(f"{'rows':>7} {'path':<22} {'decode us/row':>14} {'encode us/row':>14} {'request KiB':>12} {'response KiB':>13}")
+    for rows in args.rows:
+        document, raw, predictions = payloads(rows, np.random.default_rng(args.seed))
+        json_body = json.dumps(document).encode()
+        cases = [("pydantic + json", json_body, pydantic_path(json_body, predictions)),
+                 ("columnar json", json_body, columnar_path(json_body, columnar.JSON, columnar.JSON, predictions))]
+        if columnar.msgpack is not None:
+            body = columnar.msgpack.packb(document)
+            cases.append(("columnar msgpack", body,
+                          columnar_path(body, columnar.MSGPACK, columnar.MSGPACK, predictions)))
+        cases.append(("columnar raw", raw, columnar_path(raw, columnar.RAW, columnar.RAW, predictions)))
+
+        for name, body, (decode, encode) in cases:
+            decode_seconds, _ = best_of(decode, args.repeat)
+            encode_seconds, response = best_of(encode, args.repeat)
+            print(f"{rows:>7} {name:<22} {decode_seconds / rows * 1e6:>14.3f} {encode_seconds / rows * 1e6:>14.3f} "
+                  f"{len(body) / 1024:>12.1f} {len(response) / 1024:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
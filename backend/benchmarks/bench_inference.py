@@ -0,0 +1,240 @@
+"""
+Micro-benchmarks for the prediction hot paths of every backend variant.
+
+For each case and batch size this measures the time per call (one call
+predicts the whole batch) and per row, plus the allocations and peak
+traced memory of one call. Scalar functions are driven row by row, the way
+their endpoints call them; vectorized paths get the batch as arrays.
+
+Cases:
+    app.calculate_prediction              formula behind app.py's /predict
+    app_simple.calculate_energy           formula behind app_simple.py's /predict
+    app_precomputed.estimate_energy       interpolated lookup table, per request
+    app_precomputed.estimate_energy[dict] PREDICTION_TABLE fallback, per request
+    app_precomputed.interpolate_predictions  the lookup table over a whole batch
+    app_original.predict_rows[sklearn]    encoder + RandomForest (grid disabled)
+
+Results can be saved as a JSON baseline and later runs compared against it;
+any case whose best per-row time (or peak memory) grows by more than --threshold
+is reported as a regression and the exit status is 1.
+
+Usage:
+    python benchmarks/bench_inference.py --save benchmarks/baseline.json   # record a baseline
+    python benchmarks/bench_inference.py --compare benchmarks/baseline.json --threshold 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+MACHINES = ["Machine_A", "Machine_B", "Machine_C"]
+
+
+def sample_rows(size, rng):
+    return {
+        "machine": rng.choice(MACHINES, size=size).tolist(),
+        "hour": rng.integers(0, 24, size=size).tolist(),
+        "day": rng.integers(1, 32, size=size).tolist(),
+        "temperature": np.round(rng.uniform(15, 35, size=size), 1).tolist(),
+        "humidity": np.round(rng.uniform(30, 80, size=size), 1).tolist(),
+    }
+
+
+# -- cases: each returns a zero-argument callable that predicts one batch -----
+
+def case_app(rows):
+    from app import calculate_prediction
+    machines, hours, days = rows["machine"], rows["hour"], rows["day"]
+    return lambda: [calculate_prediction(m, h, d) for m, h, d in zip(machines, hours, days)]
+
+
+def case_app_simple(rows):
+    from app_simple import calculate_energy
+    columns = rows["machine"], rows["hour"], rows["temperature"], rows["humidity"]
+    return lambda: [calculate_energy(m, h, t, u) for m, h, t, u in zip(*columns)]
+
+
+def case_precomputed(rows, use_table=True):
+    import app_precomputed
+    if use_table and app_precomputed.MODEL_TABLE is None:
+        return None
+    columns = rows["machine"], rows["hour"], rows["day"], rows["temperature"], rows["humidity"]
+    estimate = app_precomputed.estimate_energy
+
+    def run():
+        saved = app_precomputed.MODEL_TABLE
+        app_precomputed.MODEL_TABLE = saved if use_table else None
+        try:
+            return [estimate(*row)[0] for row in zip(*columns)]
+        finally:
+            app_precomputed.MODEL_TABLE = saved
+    return run
+
+
+def case_precomputed_batch(rows):
+    import app_precomputed
+    if app_precomputed.MODEL_TABLE is None:
+        return None
+    index = np.array([app_precomputed.MACHINE_INDEX[m] for m in rows["machine"]])
+    hours, days = np.array(rows["hour"]), np.array(rows["day"])
+    temperatures, humidities = np.array(rows["temperature"]), np.array(rows["humidity"])
+    return lambda: app_precomputed.interpolate_predictions(index, hours, days, temperatures, humidities)
+
+
+def case_original(rows):
+    # Serve the pickled forest directly: no grid, no hot reload
+    os.environ["MODEL_FORMAT"] = "sklearn"
+    os.environ["USE_PREDICTION_GRID"] = "false"
+    os.environ["MODEL_RELOAD_INTERVAL"] = "0"
+    import app_original
+    if not app_original.load_startup_model():
+        return None
+    active = app_original.model_manager.current
+    machines, hours, days = rows["machine"], rows["hour"], rows["day"]
+    return lambda: app_original.predict_rows(machines, hours, days, active)
+
+
+CASES = {
+    "app.calculate_prediction": case_app,
+    "app_simple.calculate_energy": case_app_simple,
+    "app_precomputed.estimate_energy": case_precomputed,
+    "app_precomputed.estimate_energy[dict]": lambda rows: case_precomputed(rows, use_table=False),
+    "app_precomputed.interpolate_predictions": case_precomputed_batch,
+    "app_original.predict_rows[sklearn]": case_original,
+}
+
+
+# -- measurement --------------------------------------------------------------
+
+def time_per_call(fn, repeat, min_seconds):
+    """Median and best seconds per call; each sample loops until it lasts min_seconds"""
+    loops = 1
+    while True:
+        began = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - began
+        if elapsed >= min_seconds:
+            break
+        loops = max(loops * 2, int(loops * min_seconds / max(elapsed, 1e-9)))
+    samples = [elapsed / loops]
+    for _ in range(repeat - 1):
+        began = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - began) / loops)
+    return float(np.median(samples)), min(samples)
+
+
+def memory_per_call(fn):
+    """(allocated blocks still counted after the call, peak traced bytes) for one call"""
+    fn()  # prime lazy imports and caches outside the trace
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        del result
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return blocks, peak - baseline
+
+
+def run_suite(cases, sizes, repeat, min_seconds, seed):
+    results = {}
+    for name in cases:
+        for size in sizes:
+            rows = sample_rows(size, np.random.default_rng(seed))
+            fn = CASES[name](rows)
+            if fn is None:
+                print(f"{name:<42} {size:>6}  skipped (artifact not available)")
+                break
+            median, best = time_per_call(fn, repeat, min_seconds)
+            blocks, peak = memory_per_call(fn)
+            key = f"{name}@{size}"
+            results[key] = {
+                "case": name,
+                "rows": size,
+                "seconds_per_call": median,
+                "best_seconds_per_call": best,
+                "us_per_row": median / size * 1e6,
+                "best_us_per_row": best / size * 1e6,
+                "allocations": blocks,
+                "peak_bytes": int(peak),
+            }
+            print(f"{name:<42} {size:>6}  {median * 1e3:>10.3f} ms/call  {median / size * 1e6:>9.2f} us/row  "
+                  f"{blocks:>7} allocs  {peak / 1024:>9.1f} KiB peak")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Cases slower (best time per row) or hungrier (peak memory) than baseline by more than threshold"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        # Best-of-N time is the least noisy figure on a shared machine
+        for metric in ("best_us_per_row", "peak_bytes"):
+            # Ignore noise on tiny absolute values
+            floor = 0.05 if metric == "best_us_per_row" else 4096
+            if current[metric] > max(previous[metric], floor) * (1 + threshold):
+                regressions.append((key, metric, previous[metric], current[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000], help="batch sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="timing samples per measurement")
+    parser.add_argument("--min-seconds", type=float, default=0.2, help="minimum length of one timing sample")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the results to this JSON baseline")
+    parser.add_argument("--compare", help="JSON baseline to check the results against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown before failing")
+    args = parser.parse_args()
+
+    save_path = os.path.abspath(args.save) if args.save else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    # Relative artifact paths (energy_predictor.pkl, prediction_table.npz) resolve from backend/
+    os.chdir(BACKEND_DIR)
+    results = run_suite(args.cases, args.sizes, args.repeat, args.min_seconds, args.seed)
+
+    if save_path:
+        with open(save_path, "w") as f:
+            json.dump({
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+        print(f"Baseline written to {args.save}")
+
+    if compare_path:
+        with open(compare_path) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for key, metric, previous, current in regressions:
+            print(f"REGRESSION {key}: {metric} {previous:,.2f} -> {current:,.2f} ({current / previous - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
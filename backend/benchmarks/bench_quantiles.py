@@ -0,0 +1,80 @@
+"""
+Overhead of per-tree quantiles over point-only inference.
+
+Compares, per batch size: sklearn predict, compiled-forest predict, the
+compiled single-pass (trees x rows) quantiles, the same matrix filled from
+each sklearn estimator (what app_original serves from ESTIMATOR_ROWS rows
+up) and the naive np.quantile loop over estimators_.
+
+Usage:
+    python benchmarks/bench_quantiles.py [--model energy_predictor.pkl] [--rows 1 100 1000 10000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from compiled_forest import ESTIMATOR_ROWS, compile_forest, estimator_quantiles  # noqa: E402
+from feature_encoder import accept_arrays, hours_and_days, load_encoder  # noqa: E402
+
+QUANTILES = np.array([0.05, 0.5, 0.95])
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - began)
+    return min(timings)
+
+
+def feature_rows(encoder, rows, rng):
+    machines = rng.choice(encoder.machines, size=rows)
+    stamps = np.datetime64("2024-01-01T00") + rng.integers(0, 24 * 365, size=rows).astype("timedelta64[h]")
+    hours, days = hours_and_days(stamps)
+    return encoder.encode(machines, hour=hours, day=days)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="energy_predictor.pkl")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import joblib
+
+    encoder = load_encoder(args.model)
+    model = accept_arrays(joblib.load(args.model), encoder)
+    forest = compile_forest(model)
+    rng = np.random.default_rng(args.seed)
+    print(f"{forest.n_estimators} trees, quantiles {QUANTILES.tolist()}, best of {args.repeat}, "
+          f"served from estimators at >= {ESTIMATOR_ROWS} rows")
+    print(f"{'rows':>7} {'sklearn':>10} {'compiled':>10} {'quantiles':>10} {'estimators':>11} {'naive loop':>11} "
+          f"{'served':>10} {'vs sklearn':>11}")
+
+    for rows in args.rows:
+        X = feature_rows(encoder, rows, rng)
+        sklearn_point = best_of(lambda: model.predict(X), args.repeat)
+        compiled_point = best_of(lambda: forest.predict(X), args.repeat)
+        banded = best_of(lambda: forest.predict_quantiles(X, QUANTILES), args.repeat)
+        estimators = best_of(lambda: estimator_quantiles(model, X, QUANTILES), args.repeat)
+        naive = best_of(
+            lambda: np.quantile(np.stack([tree.predict(X) for tree in model.estimators_]), QUANTILES, axis=0),
+            max(1, args.repeat // 2),
+        )
+        served = estimators if rows >= ESTIMATOR_ROWS else banded
+        print(
+            f"{rows:>7} {sklearn_point * 1000:>8.2f}ms {compiled_point * 1000:>8.2f}ms {banded * 1000:>8.2f}ms "
+            f"{estimators * 1000:>9.2f}ms {naive * 1000:>9.2f}ms {served * 1000:>8.2f}ms {served / sklearn_point:>10.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
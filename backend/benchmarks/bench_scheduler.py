@@ -0,0 +1,79 @@
+"""
+Benchmark the energy-aware scheduler on synthetic job lists.
+
+Usage:
+    python benchmarks/bench_scheduler.py [--jobs 5000] [--machines 3] [--horizon 168] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from scheduler import Scheduler  # noqa: E402
+
+
+def synthetic_forecast(machines, horizon, rng):
+    """Daily-cycle hourly energy per machine, roughly what the model predicts"""
+    hours = np.arange(horizon) % 24
+    daily = 1.0 + 0.3 * np.sin((hours - 6) / 24 * 2 * np.pi)
+    base = rng.uniform(80, 250, size=machines)
+    return base[:, None] * daily[None, :] * rng.uniform(0.95, 1.05, size=(machines, horizon))
+
+
+def synthetic_jobs(n, machines, horizon, rng):
+    duration = rng.integers(1, 9, size=n)
+    eligible = rng.random((n, machines)) < 0.7
+    eligible[np.arange(n), rng.integers(0, machines, size=n)] = True
+    release = rng.integers(0, horizon // 2, size=n)
+    deadline = np.minimum(horizon, release + duration + rng.integers(12, horizon, size=n))
+    load = rng.uniform(0.005, 0.02, size=n)
+    return duration, eligible, release, deadline, load
+
+
+def run(label, scheduler, jobs, objective, repeat):
+    timings = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        schedule = scheduler.solve(*jobs, objective=objective)
+        timings.append(time.perf_counter() - began)
+    saved = np.nansum(schedule.baseline_cost) - np.nansum(schedule.cost)
+    print(
+        f"{label:<28} median {np.median(timings) * 1000:8.1f} ms  best {min(timings) * 1000:8.1f} ms  "
+        f"peak {schedule.load.max():8.1f}  cost {np.nansum(schedule.cost):10.1f} (saves {saved:8.1f} vs ASAP)  "
+        f"moves {schedule.moves:5d}  feasible {schedule.feasible}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--machines", type=int, default=3)
+    parser.add_argument("--horizon", type=int, default=168)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    predictions = synthetic_forecast(args.machines, args.horizon, rng)
+    jobs = synthetic_jobs(args.jobs, args.machines, args.horizon, rng)
+    hours = np.arange(args.horizon) % 24
+    tariff = np.where((hours >= 8) & (hours < 20), 0.30, 0.12)
+
+    print(f"{args.jobs} jobs, {args.machines} machines, {args.horizon}h horizon")
+    unconstrained = Scheduler(predictions, tariff)
+    run("cost", unconstrained, jobs, "cost", args.repeat)
+    run("peak", unconstrained, jobs, "peak", args.repeat)
+
+    # A cap well below the cheapest-slot schedule's peak, so repair has to spread the load out
+    cap = 1.5 * unconstrained.solve(*jobs, objective="peak").load.max()
+    capped = Scheduler(predictions, tariff, peak_cap=cap)
+    run(f"cost, peak cap {cap:.0f}", capped, jobs, "cost", args.repeat)
+    run(f"peak, peak cap {cap:.0f}", capped, jobs, "peak", args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Cold-start benchmark: how long a fresh server takes to answer /live and /ready.
+
+Each run starts `uvicorn <app>:app` from backend/ in a new process and polls
+until /live and then /ready return 200, timing both from the spawn. The phase
+breakdown reported by /ready (imports, ml_imports, model_load, encoder_load,
+warm, grid, prewarm, ...) is collected too. app_original is run once per
+--formats entry (MODEL_FORMAT), since serving the compiled forest skips the
+sklearn imports entirely.
+
+The first app_original run may build the prediction grid; the reported
+figures are medians over --runs.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --apps app_original --formats sklearn compiled --runs 5 --json startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+APPS = ["app", "app_simple", "app_precomputed", "app_original"]
+
+
+def probe(url):
+    """(status, JSON body) of a GET, or (None, None) while the server is not listening"""
+    try:
+        with urllib.request.urlopen(url, timeout=2) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read() or b"null")
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return None, None
+
+
+def cold_start(module, env, port, timeout):
+    """One spawn: {"live": s, "ready": s, "phases": {...}} or {"error": ...}"""
+    url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryFile(mode="w+") as log:
+        began = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", f"{module}:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        result = {}
+        try:
+            while time.perf_counter() - began < timeout and process.poll() is None:
+                if "live" not in result:
+                    status, _ = probe(f"{url}/live")
+                    if status == 200:
+                        result["live"] = time.perf_counter() - began
+                if "live" in result:
+                    status, body = probe(f"{url}/ready")
+                    if status == 200:
+                        result["ready"] = time.perf_counter() - began
+                        result["phases"] = body["phases"]
+                        return result
+                    if body and body.get("error"):
+                        return {"error": body["error"]}
+                time.sleep(0.01)
+            log.seek(0)
+            return {"error": f"not ready after {timeout:g}s:\n{log.read()[-2000:]}"}
+        finally:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", nargs="+", default=APPS)
+    parser.add_argument("--formats", nargs="+", default=["sklearn", "compiled"], help="MODEL_FORMATs for app_original")
+    parser.add_argument("--runs", type=int, default=3, help="cold starts per configuration")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds to wait for /ready")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    configs = []
+    for module in args.apps:
+        if module == "app_original":
+            configs += [(f"{module}[{fmt}]", module, {"MODEL_FORMAT": fmt}) for fmt in args.formats]
+        else:
+            configs.append((module, module, {}))
+
+    report = {}
+    print(f"{'configuration':<26} {'live':>8} {'ready':>8}  phases (median seconds)")
+    for name, module, overrides in configs:
+        env = {**os.environ, "MODEL_RELOAD_INTERVAL": "0", **overrides}
+        runs = [cold_start(module, env, args.port, args.timeout) for _ in range(args.runs)]
+        failed = [run["error"] for run in runs if "error" in run]
+        if failed:
+            report[name] = {"error": failed[0]}
+            print(f"{name:<26} failed: {failed[0].splitlines()[0]}")
+            continue
+        phases = {phase: float(np.median([run["phases"].get(phase, 0.0) for run in runs]))
+                  for phase in runs[-1]["phases"]}
+        report[name] = {
+            "live_seconds": float(np.median([run["live"] for run in runs])),
+            "ready_seconds": float(np.median([run["ready"] for run in runs])),
+            "phases": phases,
+            "runs": runs,
+        }
+        breakdown = "  ".join(f"{phase} {seconds:.3f}" for phase, seconds in phases.items())
+        print(f"{name:<26} {report[name]['live_seconds']:>7.2f}s {report[name]['ready_seconds']:>7.2f}s  {breakdown}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
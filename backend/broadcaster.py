@@ -0,0 +1,71 @@
+"""
+Fan-out of server-side events to live subscribers (SSE).
+
+Each tick the app builds one event, serialises it once and publishes the
+encoded message to every subscriber's bounded queue. A subscriber that does
+not keep up loses its oldest queued events rather than growing memory or
+holding up everyone else; new subscribers start from the latest event.
+"""
+import asyncio
+import json
+
+
+def sse_message(event, data):
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Broadcaster:
+    """Bounded per-subscriber queues fed from a single publish() per event"""
+
+    def __init__(self, queue_size=16):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self.latest = {}
+        self.published = 0
+        self.dropped = 0
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        # Bring late joiners up to date with the most recent event of each type
+        for message in self.latest.values():
+            queue.put_nowait(message)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, event, data):
+        """Encode once and enqueue for every subscriber; call from the event loop thread"""
+        message = sse_message(event, data)
+        self.latest[event] = message
+        self.published += 1
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(message)
+
+    async def stream(self, queue, is_disconnected, keepalive=15.0):
+        """Yield a subscriber's messages, with keep-alive comments while idle"""
+        try:
+            while not await is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(queue)
+
+    def stats(self):
+        return {
+            "subscribers": self.subscribers,
+            "queue_size": self.queue_size,
+            "published": self.published,
+            "dropped": self.dropped,
+        }
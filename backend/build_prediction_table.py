@@ -0,0 +1,59 @@
+"""
+Generate the lookup table served by app_precomputed.py from the real model.
+
+Samples the 5-feature RandomForest trained by create_model.py over a dense
+machine x hour x day x temperature x humidity grid and writes it, together
+with the grid axes, to a compact float32 .npz file. app_precomputed.py then
+interpolates over that table without needing sklearn.
+
+Usage:
+    python build_prediction_table.py [--model energy_predictor_full.pkl] [--output prediction_table.npz]
+"""
+import argparse
+
+import joblib
+import numpy as np
+
+from feature_encoder import FULL_MODEL_NUMERIC, FeatureEncoder, accept_arrays, load_encoder
+
+MACHINES = ["Machine_A", "Machine_B", "Machine_C"]
+HOURS = np.arange(0, 24)
+DAYS = np.arange(1, 32)
+
+
+def build_table(model, encoder, temperatures, humidities):
+    """Evaluate the model on every grid point; returns a float32 array"""
+    axes = [np.array(MACHINES), HOURS, DAYS, temperatures, humidities]
+    machines, hours, days, temps, hums = [a.ravel() for a in np.meshgrid(*axes, indexing="ij")]
+
+    X = encoder.encode(machines, hour=hours, day=days, temperature=temps, humidity=hums)
+    predictions = model.predict(X)
+    return predictions.astype(np.float32).reshape([len(a) for a in axes])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build app_precomputed.py's prediction table")
+    parser.add_argument("--model", default="energy_predictor_full.pkl")
+    parser.add_argument("--output", default="prediction_table.npz")
+    parser.add_argument("--temp-range", type=float, nargs=2, default=(10.0, 40.0), metavar=("MIN", "MAX"))
+    parser.add_argument("--temp-bins", type=int, default=8)
+    parser.add_argument("--humidity-range", type=float, nargs=2, default=(30.0, 90.0), metavar=("MIN", "MAX"))
+    parser.add_argument("--humidity-bins", type=int, default=8)
+    args = parser.parse_args()
+
+    encoder = load_encoder(args.model, default=FeatureEncoder(MACHINES, FULL_MODEL_NUMERIC, drop_first=False))
+    model = accept_arrays(joblib.load(args.model), encoder)
+    temperatures = np.linspace(*args.temp_range, args.temp_bins)
+    humidities = np.linspace(*args.humidity_range, args.humidity_bins)
+
+    table = build_table(model, encoder, temperatures, humidities)
+    np.savez(
+        args.output,
+        table=table,
+        machines=np.array(MACHINES),
+        hours=HOURS.astype(np.float64),
+        days=DAYS.astype(np.float64),
+        temperatures=temperatures,
+        humidities=humidities,
+    )
+    print(f"Prediction table {table.shape} ({table.nbytes / 1024:.0f} KiB) saved to {args.output}")
@@ -0,0 +1,233 @@
+"""
+Columnar request/response encoding for the bulk endpoints.
+
+Bulk bodies are decoded once into parallel numpy columns and validated as
+whole arrays instead of one pydantic object per row. The encoding is picked
+by Content-Type for requests and by Accept for responses:
+
+    application/json          {"machine": [...], "hour": [...], "day": [...]}   (default)
+    application/msgpack       the same document as MessagePack (needs msgpack)
+    application/octet-stream  raw little-endian columns; for /predict/bulk the body is three int32
+                              columns of n values each (machine index into GET /machines, hour,
+                              day) and the response is float64 columns back to back, named in
+                              order by the X-Columns header (row count in X-Row-Count)
+
+The first supported type listed in Accept wins (q-values are ignored).
+FastJSONResponse renders with orjson when it is installed, which writes
+numpy arrays without building Python lists first; handlers that return it
+directly also skip FastAPI's per-element jsonable_encoder pass.
+"""
+import json
+
+import numpy as np
+from fastapi import HTTPException, Response
+from fastapi.responses import JSONResponse
+
+from metrics import stage
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+RAW = "application/octet-stream"
+MSGPACK_TYPES = {MSGPACK, "application/x-msgpack"}
+
+RAW_REQUEST_DTYPE = np.dtype("<i4")
+RAW_RESPONSE_DTYPE = np.dtype("<f8")
+# Inclusive bounds of the time features a prediction row may carry
+HOUR_RANGE = (0, 23)
+DAY_RANGE = (1, 31)
+
+
+def plain(value):
+    """numpy values as Python ones, for encoders that do not know numpy"""
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON rendered by orjson (numpy arrays included), timed as the "serialization" stage"""
+
+    def render(self, content):
+        with stage("serialization"):
+            if orjson is not None:
+                # Arrays orjson cannot write natively (e.g. str dtype) fall through to plain()
+                return orjson.dumps(content, default=plain, option=orjson.OPT_SERIALIZE_NUMPY)
+            return json.dumps(
+                content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=plain,
+            ).encode("utf-8")
+
+
+def media_type(header, default=JSON):
+    """'application/json; charset=utf-8' -> 'application/json'"""
+    return (header or default).split(";")[0].strip().lower()
+
+
+def negotiate(accept):
+    """Response encoding (JSON, MSGPACK or RAW) for an Accept header"""
+    for part in (accept or "").split(","):
+        kind = media_type(part, "")
+        if kind in MSGPACK_TYPES:
+            if msgpack is None:
+                raise HTTPException(status_code=406, detail="MessagePack responses need the msgpack package on the server.")
+            return MSGPACK
+        if kind == RAW:
+            return RAW
+        if kind in (JSON, "application/*", "*/*"):
+            return JSON
+    return JSON
+
+
+def decode_document(body, content_type):
+    """A JSON or MessagePack request body as a dict"""
+    kind = media_type(content_type)
+    if kind in MSGPACK_TYPES and msgpack is None:
+        raise HTTPException(status_code=415, detail="MessagePack bodies need the msgpack package on the server.")
+    if kind not in MSGPACK_TYPES and kind != JSON:
+        raise HTTPException(status_code=415, detail=f"Unsupported Content-Type {kind!r}.")
+    try:
+        if kind in MSGPACK_TYPES:
+            document = msgpack.unpackb(body)
+        else:
+            document = orjson.loads(body) if orjson is not None else json.loads(body)
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"Malformed {kind} body: {exc}")
+    if not isinstance(document, dict):
+        raise HTTPException(status_code=422, detail="Request body must be an object.")
+    return document
+
+
+def string_column(values, name):
+    """A list of strings as a numpy str array"""
+    try:
+        distinct = list(set(values)) if isinstance(values, list) else None
+    except TypeError:  # unhashable items such as nested lists
+        distinct = None
+    if distinct is None or any(type(value) is not str for value in distinct):
+        raise HTTPException(status_code=422, detail=f"'{name}' must be a list of strings.")
+    if 4 * len(distinct) > len(values):
+        return np.array(values, dtype=str)
+    # Few distinct values (machine names): convert those once and gather by code
+    codes = {value: code for code, value in enumerate(distinct)}
+    return np.array(distinct, dtype=str)[np.fromiter(map(codes.__getitem__, values), dtype=np.intp, count=len(values))]
+
+
+def integer_column(values, name):
+    """A list of whole numbers as an int64 array"""
+    array = np.asarray(values) if isinstance(values, (list, tuple)) else None
+    # Strings, booleans, nulls and nested lists all leave a non-numeric dtype or ndim != 1
+    if array is None or array.ndim != 1 or array.dtype.kind not in "iuf":
+        raise HTTPException(status_code=422, detail=f"'{name}' must be a list of integers.")
+    if array.dtype.kind == "f":
+        # Finite floats past 2**63 are integral too, but would wrap in the int64 cast
+        bad = np.flatnonzero(~np.isfinite(array) | (array != np.floor(array)) | (np.abs(array) >= 2.0 ** 63))
+    elif array.dtype.kind == "u":
+        bad = np.flatnonzero(array > np.iinfo(np.int64).max)
+    else:
+        bad = np.empty(0, dtype=np.intp)
+    if bad.size:
+        raise HTTPException(status_code=422, detail=f"'{name}' must be integers (rows {bad[:10].tolist()}).")
+    return array.astype(np.int64)
+
+
+def float_column(values, name):
+    """A list of numbers as a float64 array"""
+    array = np.asarray(values) if isinstance(values, (list, tuple)) else None
+    if array is None or array.ndim != 1 or array.dtype.kind not in "iuf":
+        raise HTTPException(status_code=422, detail=f"'{name}' must be a list of numbers.")
+    return array.astype(np.float64)
+
+
+def row_columns(document):
+    """(machines, hours, days) from either the column layout or an array of [machine, hour, day] rows"""
+    columns = [document.get(name) for name in ("machine", "hour", "day")]
+    rows = document.get("rows")
+    if rows is not None:
+        if any(column is not None for column in columns):
+            raise HTTPException(status_code=422, detail="Send either 'rows' or the 'machine'/'hour'/'day' columns, not both.")
+        try:
+            if not isinstance(rows, list) or set(map(len, rows)) - {3}:
+                raise TypeError
+        except TypeError:
+            raise HTTPException(status_code=422, detail="'rows' must be a list of [machine, hour, day] rows.")
+        columns = [list(column) for column in zip(*rows)] if rows else [[], [], []]
+    elif any(column is None for column in columns):
+        raise HTTPException(status_code=422, detail="Columns 'machine', 'hour' and 'day' are all required.")
+
+    machines = string_column(columns[0], "machine")
+    hours = integer_column(columns[1], "hour")
+    days = integer_column(columns[2], "day")
+    if not len(machines) == len(hours) == len(days):
+        raise HTTPException(status_code=422, detail="Columns 'machine', 'hour' and 'day' must have the same length.")
+    return machines, hours, days
+
+
+def raw_row_columns(body, machines):
+    """(machines, hours, days) from three little-endian int32 columns; machine values index `machines`"""
+    if len(body) % (3 * RAW_REQUEST_DTYPE.itemsize):
+        raise HTTPException(status_code=422, detail="Raw body must hold three int32 columns of equal length.")
+    index, hours, days = np.frombuffer(body, dtype=RAW_REQUEST_DTYPE).reshape(3, -1)
+    bad = np.flatnonzero((index < 0) | (index >= len(machines)))
+    if bad.size:
+        raise HTTPException(status_code=422, detail=f"Machine index out of range at rows {bad[:10].tolist()}.")
+    return np.asarray(machines)[index], hours.astype(np.int64), days.astype(np.int64)
+
+
+def read_rows(body, content_type, machines, max_rows):
+    """Decode a bulk prediction body; returns (machines, hours, days, document or None for raw bodies)"""
+    if media_type(content_type) == RAW:
+        if len(body) > 3 * RAW_REQUEST_DTYPE.itemsize * max_rows:
+            raise HTTPException(status_code=413, detail=f"At most {max_rows} rows per request.")
+        return (*check_time_ranges(*raw_row_columns(body, machines)), None)
+    document = decode_document(body, content_type)
+    first = document.get("rows", document.get("machine"))
+    if isinstance(first, list) and len(first) > max_rows:
+        raise HTTPException(status_code=413, detail=f"At most {max_rows} rows per request.")
+    names, hours, days = row_columns(document)
+    # Raw bodies index `machines` directly; a name outside it would otherwise encode as the reference machine
+    known = np.isin(names, machines)
+    if not known.all():
+        unknown = sorted(set(names[~known].tolist()))
+        raise HTTPException(status_code=422, detail=f"Unknown machines: {unknown[:10]}")
+    return (*check_time_ranges(names, hours, days), document)
+
+
+def check_time_ranges(machines, hours, days):
+    """Reject hours and days outside HOUR_RANGE / DAY_RANGE"""
+    for values, name, (low, high) in ((hours, "hour", HOUR_RANGE), (days, "day", DAY_RANGE)):
+        bad = np.flatnonzero((values < low) | (values > high))
+        if bad.size:
+            raise HTTPException(status_code=422, detail=f"'{name}' must be in [{low}, {high}] (rows {bad[:10].tolist()}).")
+    return machines, hours, days
+
+
+def encode_response(kind, document, columns):
+    """`document` as JSON or MessagePack, or for RAW the `columns` (name -> 1-D array) as float64"""
+    if kind == RAW:
+        with stage("serialization"):
+            body = b"".join(np.ascontiguousarray(values, dtype=RAW_RESPONSE_DTYPE).tobytes() for values in columns.values())
+        rows = len(next(iter(columns.values()))) if columns else 0
+        return Response(body, media_type=RAW, headers={"X-Columns": ",".join(columns), "X-Row-Count": str(rows)})
+    if kind == MSGPACK:
+        with stage("serialization"):
+            body = msgpack.packb(document, default=plain)
+        return Response(body, media_type=MSGPACK)
+    return FastJSONResponse(document)
+
+
+def openapi_body(model, raw=False):
+    """openapi_extra that documents `model` as the body of a route which decodes its own body"""
+    schema = model.model_json_schema() if hasattr(model, "model_json_schema") else model.schema()
+    content = {JSON: {"schema": schema}, MSGPACK: {"schema": schema}}
+    if raw:
+        content[RAW] = {"schema": {"type": "string", "format": "binary"}}
+    return {"requestBody": {"required": True, "content": content}}
@@ -0,0 +1,257 @@
+"""
+Array-backed inference engine for the trained RandomForestRegressor.
+
+The forest is flattened into contiguous NumPy arrays (feature, threshold,
+left/right child and leaf value) so a whole batch can be pushed through all
+trees at once without importing sklearn or pandas at serving time.
+
+Usage:
+    python compiled_forest.py [energy_predictor.pkl] [energy_predictor_forest]
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+FORMAT_VERSION = 1
+ARRAY_NAMES = ("feature", "threshold", "left", "right", "value", "roots")
+# Derived arrays saved alongside so memory-mapped workers share them too
+DERIVED_ARRAY_NAMES = ("children", "is_leaf")
+
+# Rows evaluated per traversal pass; bounds the (trees x rows) working set
+CHUNK_ROWS = 1024
+# From this many rows a sklearn forest's own trees fill the (trees x rows) matrix faster
+# than the compiled traversal (benchmarks/bench_quantiles.py: 142 vs 254 ms at 10k rows)
+ESTIMATOR_ROWS = 512
+# Rows per estimator pass; bounds that path's (trees x rows) matrix
+ESTIMATOR_CHUNK_ROWS = 16384
+
+
+def tree_quantiles(per_tree, quantiles):
+    """Return (mean, bands) of a (trees, rows) array, bands being (len(quantiles), rows).
+
+    Matches np.quantile's default linear interpolation, but one sort along the
+    tree axis serves every quantile instead of a partition per quantile.
+    """
+    ordered = np.sort(per_tree, axis=0)
+    positions = np.asarray(quantiles, dtype=np.float64) * (len(ordered) - 1)
+    lower = np.floor(positions).astype(np.intp)
+    upper = np.minimum(lower + 1, len(ordered) - 1)
+    weight = (positions - lower)[:, None]
+    bands = ordered[lower] * (1 - weight) + ordered[upper] * weight
+    return per_tree.mean(axis=0), bands
+
+
+def estimator_quantiles(model, X, quantiles):
+    """predict_quantiles for a fitted sklearn forest, from each estimator's own predict"""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    mean = np.empty(X.shape[0])
+    bands = np.empty((len(quantiles), X.shape[0]))
+    for start in range(0, X.shape[0], ESTIMATOR_CHUNK_ROWS):
+        chunk = X[start:start + ESTIMATOR_CHUNK_ROWS]
+        per_tree = np.empty((len(model.estimators_), len(chunk)))
+        for i, estimator in enumerate(model.estimators_):
+            # Trees compare float32 features; X is already converted, so skip the per-tree check
+            per_tree[i] = estimator.predict(chunk, check_input=False)
+        mean[start:start + len(chunk)], bands[:, start:start + len(chunk)] = tree_quantiles(per_tree, quantiles)
+    return mean, bands
+
+
+class CompiledForest:
+    """RandomForest flattened into node arrays, evaluated batch-wise"""
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, n_features, feature_names=None,
+                 children=None, is_leaf=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        # Interleaved (right, left) children so one gather picks the next node
+        self.children = children if children is not None else np.stack([right, left], axis=1).ravel()
+        self.is_leaf = is_leaf if is_leaf is not None else left == np.arange(len(left))
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def _prepare(self, X):
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected an (n, {self.n_features}) feature matrix, got shape {X.shape}")
+        # sklearn compares float32 inputs against float64 thresholds; do the same for parity
+        return X.astype(np.float32).astype(np.float64)
+
+    def _traverse(self, X):
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        # One slot per (tree, row) pair, tree-major
+        nodes = np.repeat(self.roots, n_rows)
+        row_offsets = np.tile(np.arange(n_rows) * n_features, len(self.roots))
+        # Only step the pairs that have not reached a leaf yet
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        while active.size:
+            current = nodes[active]
+            go_left = flat_X.take(row_offsets[active] + self.feature.take(current)) <= self.threshold.take(current)
+            current = self.children.take(current * 2 + go_left)
+            nodes[active] = current
+            active = active[~self.is_leaf.take(current)]
+        return self.value.take(nodes).reshape(len(self.roots), n_rows)
+
+    def predict_per_tree(self, X):
+        """Return per-tree predictions as a (trees, rows) array"""
+        X = self._prepare(X)
+        if X.shape[0] <= CHUNK_ROWS:
+            return self._traverse(X)
+        return np.concatenate(
+            [self._traverse(X[start:start + CHUNK_ROWS]) for start in range(0, X.shape[0], CHUNK_ROWS)],
+            axis=1,
+        )
+
+    def predict(self, X):
+        """Average the per-tree predictions, like RandomForestRegressor.predict"""
+        return self.predict_per_tree(X).mean(axis=0)
+
+    def predict_quantiles(self, X, quantiles):
+        """Return (mean, quantiles) where quantiles is a (len(quantiles), rows) array over the trees.
+
+        Each chunk's (trees x rows) outputs come from one traversal and are reduced
+        before the next chunk, so memory stays bounded by CHUNK_ROWS.
+        """
+        X = self._prepare(X)
+        quantiles = np.asarray(quantiles, dtype=np.float64)
+        mean = np.empty(X.shape[0])
+        bands = np.empty((len(quantiles), X.shape[0]))
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            per_tree = self._traverse(X[start:start + CHUNK_ROWS])
+            mean[start:start + CHUNK_ROWS], bands[:, start:start + CHUNK_ROWS] = tree_quantiles(per_tree, quantiles)
+        return mean, bands
+
+    def save(self, path):
+        """Write the node arrays as raw .npy files plus a small metadata file"""
+        os.makedirs(path, exist_ok=True)
+        # Replace files atomically: running servers may have the old arrays memory-mapped
+        for name in ARRAY_NAMES + DERIVED_ARRAY_NAMES:
+            tmp_path = os.path.join(path, f".{name}.tmp.npy")
+            np.save(tmp_path, getattr(self, name))
+            os.replace(tmp_path, os.path.join(path, f"{name}.npy"))
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "n_estimators": self.n_estimators,
+            "n_features": self.n_features,
+            "max_depth": self.max_depth,
+            "node_count": int(len(self.feature)),
+            "feature_names": self.feature_names,
+        }
+        with open(os.path.join(path, ".meta.json.tmp"), "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(os.path.join(path, ".meta.json.tmp"), os.path.join(path, "meta.json"))
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """Load a compiled forest written by save(); mmap_mode="r" shares pages across processes"""
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled forest format: {meta.get('format_version')}")
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in ARRAY_NAMES}
+        for name in DERIVED_ARRAY_NAMES:
+            derived_path = os.path.join(path, f"{name}.npy")
+            if os.path.exists(derived_path):
+                arrays[name] = np.load(derived_path, mmap_mode=mmap_mode)
+        # Catch a directory caught half-way through being rewritten
+        if len(arrays["roots"]) != meta["n_estimators"] or any(
+            len(arrays[name]) != meta["node_count"] for name in ("feature", "threshold", "left", "right", "value")
+        ):
+            raise ValueError(f"Compiled forest at {path} is inconsistent with its meta.json")
+        return cls(
+            max_depth=meta["max_depth"],
+            n_features=meta["n_features"],
+            feature_names=meta.get("feature_names"),
+            **arrays,
+        )
+
+
+def compile_forest(model):
+    """Flatten a fitted RandomForestRegressor into a CompiledForest"""
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    counts = np.array([tree.node_count for tree in trees])
+    roots = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+    total = int(counts.sum())
+
+    feature = np.empty(total, dtype=np.int64)
+    threshold = np.empty(total, dtype=np.float64)
+    left = np.empty(total, dtype=np.int64)
+    right = np.empty(total, dtype=np.int64)
+    value = np.empty(total, dtype=np.float64)
+
+    for tree, offset in zip(trees, roots):
+        nodes = slice(offset, offset + tree.node_count)
+        index = np.arange(tree.node_count) + offset
+        is_leaf = tree.children_left == -1
+        # Leaves point at themselves, which is how the engine recognises them
+        feature[nodes] = np.where(is_leaf, 0, tree.feature)
+        threshold[nodes] = np.where(is_leaf, np.inf, tree.threshold)
+        left[nodes] = np.where(is_leaf, index, tree.children_left + offset)
+        right[nodes] = np.where(is_leaf, index, tree.children_right + offset)
+        value[nodes] = tree.value[:, 0, 0]
+
+    return CompiledForest(
+        feature=feature,
+        threshold=threshold,
+        left=left,
+        right=right,
+        value=value,
+        roots=roots,
+        max_depth=max(tree.max_depth for tree in trees),
+        n_features=model.n_features_in_,
+        feature_names=getattr(model, "feature_names_in_", None),
+    )
+
+
+def check_parity(model, forest, X):
+    """Return the max absolute difference between model.predict and the compiled forest"""
+    if forest.feature_names is not None:
+        import pandas as pd
+        expected = model.predict(pd.DataFrame(X, columns=forest.feature_names))
+    else:
+        expected = model.predict(X)
+    return float(np.max(np.abs(expected - forest.predict(X))))
+
+
+def parity_sample(n_features, rows=2000, seed=0):
+    """Random feature rows covering the deployed model's (hour, day, machine) space"""
+    rng = np.random.default_rng(seed)
+    X = rng.integers(0, 2, size=(rows, n_features)).astype(np.float64)
+    X[:, 0] = rng.integers(0, 24, rows)
+    X[:, 1] = rng.integers(1, 32, rows)
+    return X
+
+
+if __name__ == "__main__":
+    import joblib
+
+    from feature_encoder import encoder_path, load_encoder
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else "energy_predictor.pkl"
+    output_path = sys.argv[2] if len(sys.argv) > 2 else "energy_predictor_forest"
+
+    model = joblib.load(model_path)
+    forest = compile_forest(model)
+    # The encoder travels with the compiled arrays; write it before meta.json completes the artifact
+    os.makedirs(output_path, exist_ok=True)
+    load_encoder(model_path).save(encoder_path(output_path))
+    forest.save(output_path)
+    print(f"Compiled {forest.n_estimators} trees ({len(forest.feature)} nodes, depth {forest.max_depth}) to {output_path}/")
+
+    # Parity check against sklearn before anyone serves from the artifact
+    max_diff = check_parity(model, CompiledForest.load(output_path), parity_sample(forest.n_features))
+    print(f"Parity vs model.predict: max abs diff {max_diff:.3e}")
+    if max_diff > 1e-6:
+        print("Compiled forest does not match the sklearn model!")
+        sys.exit(1)
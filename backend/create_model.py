@@ -3,9 +3,10 @@ import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
 import joblib
 
+from feature_encoder import FULL_MODEL_NUMERIC, FeatureEncoder, encoder_path
+
 # Generate sample training data
 np.random.seed(42)
 n_samples = 1000
@@ -41,13 +42,9 @@ data['energy_consumption'] = energy_consumption
 # Create DataFrame
 df = pd.DataFrame(data)
 
-# Prepare features
-# One-hot encode machine
-machine_dummies = pd.get_dummies(df['machine'], prefix='machine')
-X = pd.concat([
-    df[['hour', 'day', 'temperature', 'humidity']],
-    machine_dummies
-], axis=1)
+# Prepare features: hour, day, temperature, humidity, then one column per machine
+encoder = FeatureEncoder(['Machine_A', 'Machine_B', 'Machine_C'], FULL_MODEL_NUMERIC, drop_first=False)
+X = encoder.encode(df['machine'], **{name: df[name] for name in FULL_MODEL_NUMERIC})
 
 y = df['energy_consumption']
 
@@ -58,20 +55,19 @@ X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_
 model = RandomForestRegressor(n_estimators=100, random_state=42)
 model.fit(X_train, y_train)
 
-# Save the model
-joblib.dump(model, 'energy_predictor.pkl')
+# Save the full 5-feature model (used by build_prediction_table.py)
+joblib.dump(model, 'energy_predictor_full.pkl')
+encoder.save(encoder_path('energy_predictor_full.pkl'))
 
-print("Model trained and saved as 'energy_predictor.pkl'")
+print("Model trained and saved as 'energy_predictor_full.pkl'")
 print(f"Training R² score: {model.score(X_train, y_train):.3f}")
 print(f"Test R² score: {model.score(X_test, y_test):.3f}")
-print(f"Feature names: {list(X.columns)}")
+print(f"Feature names: {encoder.columns}")
 
 # Also create a simplified model compatible with the current app.py format
 # The app.py expects: hour, day, machine_Machine_B, machine_Machine_C
-X_simple = pd.concat([
-    df[['hour', 'day']],
-    machine_dummies[['machine_Machine_B', 'machine_Machine_C']]  # Machine_A is reference
-], axis=1)
+encoder_simple = FeatureEncoder()  # Machine_A is the reference category
+X_simple = encoder_simple.encode(df['machine'], hour=df['hour'], day=df['day'])
 
 X_train_simple, X_test_simple, y_train_simple, y_test_simple = train_test_split(
     X_simple, y, test_size=0.2, random_state=42
@@ -81,8 +77,9 @@ model_simple = RandomForestRegressor(n_estimators=100, random_state=42)
 model_simple.fit(X_train_simple, y_train_simple)
 
 # Override with the simplified model for deployment compatibility
+encoder_simple.save(encoder_path('energy_predictor.pkl'))
 joblib.dump(model_simple, 'energy_predictor.pkl')
 print(f"\nDeployment-ready model saved!")
-print(f"Simplified model features: {list(X_simple.columns)}")
+print(f"Simplified model features: {encoder_simple.columns}")
 print(f"Simplified model score: {model_simple.score(X_test_simple, y_test_simple):.3f}")
 print("Model is ready for Render deployment!")
\ No newline at end of file
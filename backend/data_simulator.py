@@ -1,103 +1,280 @@
-import random
+import argparse
+import asyncio
+import json
+import os
 import time
-import pandas as pd
 from datetime import datetime
-import os
 
-MACHINES = ["Machine_A", "Machine_B", "Machine_C"]
+import numpy as np
+
+from energy_io import FSYNC_POLICIES, ReadingWriter, read_readings, utc_now
+from history_store import HistoryStore
+from ingest_client import IngestClient
+from machine_stats import FleetStats, stats_path
 
-# Base energy consumption for each machine (kWh)
-MACHINE_BASE_CONSUMPTION = {
-    "Machine_A": {"min": 50, "max": 200},
-    "Machine_B": {"min": 100, "max": 300}, 
-    "Machine_C": {"min": 150, "max": 450}
+# Machine profiles: base energy consumption range (kWh) and share of the fleet.
+# Override with --profiles <file.json> using the same shape.
+DEFAULT_PROFILES = {
+    "Machine_A": {"min": 50, "max": 200, "weight": 1},
+    "Machine_B": {"min": 100, "max": 300, "weight": 1},
+    "Machine_C": {"min": 150, "max": 450, "weight": 1}
 }
 
-def generate_energy_data():
+# Time-of-day multiplier ranges: (first hour, last hour, low, high); night is the rest
+HOUR_BANDS = [
+    (8, 18, 1.2, 1.5),   # Work hours
+    (6, 7, 0.8, 1.2),    # Transition hours
+    (19, 21, 0.8, 1.2),
+]
+NIGHT_BAND = (0.3, 0.8)
+
+
+class Fleet:
+    """Parallel arrays describing every simulated machine"""
+
+    def __init__(self, names, base_min, base_max):
+        self.names = np.asarray(names, dtype=object)
+        self.base_min = np.asarray(base_min, dtype=np.float64)
+        self.base_max = np.asarray(base_max, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.names)
+
+
+def load_profiles(path=None):
+    if path is None:
+        return DEFAULT_PROFILES
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_fleet(profiles=DEFAULT_PROFILES, size=None, rng=None):
+    """One machine per profile (named after it), or `size` machines split by profile weight"""
+    names = list(profiles)
+    if size is None:
+        machine_names, kinds = names, names
+    else:
+        rng = rng or np.random.default_rng()
+        weights = np.array([profiles[name].get("weight", 1) for name in names], dtype=np.float64)
+        picks = rng.choice(len(names), size=size, p=weights / weights.sum())
+        kinds = [names[k] for k in picks]
+        machine_names = [f"{kind}_{i:05d}" for i, kind in enumerate(kinds)]
+    return Fleet(
+        machine_names,
+        [profiles[kind]["min"] for kind in kinds],
+        [profiles[kind]["max"] for kind in kinds],
+    )
+
+
+def hour_multipliers(hours, rng):
+    """Random time-of-day multipliers for an array of hours"""
+    conditions = [(hours >= first) & (hours <= last) for first, last, _, _ in HOUR_BANDS]
+    low = np.select(conditions, [band[2] for band in HOUR_BANDS], NIGHT_BAND[0])
+    high = np.select(conditions, [band[3] for band in HOUR_BANDS], NIGHT_BAND[1])
+    return rng.uniform(low, high)
+
+
+def generate_fleet_readings(fleet, timestamps, rng=None):
+    """Readings for every machine at every timestamp, as (machines, energies, timestamps) arrays"""
+    rng = rng or np.random.default_rng()
+    timestamps = np.asarray(timestamps, dtype="datetime64[ns]")
+    n_machines, n_times = len(fleet), len(timestamps)
+
+    # Timestamp-major order: all machines at t0, then all at t1, ...
+    stamps = np.repeat(timestamps, n_machines)
+    hours = stamps.astype("datetime64[h]").astype(np.int64) % 24
+    base_min = np.tile(fleet.base_min, n_times)
+    base_max = np.tile(fleet.base_max, n_times)
+    energies = np.round(rng.uniform(base_min, base_max) * hour_multipliers(hours, rng), 2)
+    return np.tile(fleet.names, n_times), energies, stamps
+
+
+def backfill(fleet, start, end, step_seconds, rng=None, chunk_rows=1_000_000):
+    """Yield readings from start to end (every step_seconds) in chunks of about chunk_rows"""
+    rng = rng or np.random.default_rng()
+    step = np.timedelta64(int(step_seconds * 1e9), "ns")
+    timestamps = np.arange(np.datetime64(start, "ns"), np.datetime64(end, "ns"), step)
+    per_chunk = max(1, chunk_rows // max(1, len(fleet)))
+    for i in range(0, len(timestamps), per_chunk):
+        yield generate_fleet_readings(fleet, timestamps[i:i + per_chunk], rng)
+
+
+def generate_energy_data(fleet=None, rng=None):
     """Generate realistic energy consumption data for all machines"""
-    data = []
-    current_hour = datetime.now().hour
-    
-    for machine in MACHINES:
-        base_config = MACHINE_BASE_CONSUMPTION[machine]
-        
-        # Add time-based variation (higher consumption during work hours)
-        if 8 <= current_hour <= 18:  # Work hours
-            multiplier = random.uniform(1.2, 1.5)
-        elif 6 <= current_hour <= 7 or 19 <= current_hour <= 21:  # Transition hours
-            multiplier = random.uniform(0.8, 1.2)
-        else:  # Night hours
-            multiplier = random.uniform(0.3, 0.8)
-        
-        # Calculate energy with some randomness
-        base_energy = random.uniform(base_config["min"], base_config["max"])
-        energy = round(base_energy * multiplier, 2)
-        
-        timestamp = datetime.now()
-        data.append({
-            "machine": machine, 
-            "energy": energy, 
-            "timestamp": timestamp,
-            "hour": current_hour
-        })
-    return data
+    fleet = fleet or build_fleet()
+    now = utc_now()
+    machines, energies, _ = generate_fleet_readings(fleet, [np.datetime64(now, "ns")], rng)
+    return [
+        {"machine": machine, "energy": energy, "timestamp": now, "hour": now.hour}
+        for machine, energy in zip(machines, energies.tolist())
+    ]
 
 def save_to_csv(data, filename="energy_data.csv"):
     """Save data to CSV file"""
-    df = pd.DataFrame(data)
-    
-    # Create header if file doesn't exist
-    file_exists = os.path.exists(filename)
-    mode = 'a' if file_exists else 'w'
-    header = False if file_exists else True
-    
-    df.to_csv(filename, mode=mode, header=header, index=False)
-
-def print_summary_stats(filename="energy_data.csv"):
+    # One-shot write; the simulator loop keeps a ReadingWriter open instead
+    with ReadingWriter(filename, fmt="csv") as writer:
+        writer.write_many(data)
+
+def simulate(interval=5.0, fleet=None, rng=None):
+    """Yield one batch of readings per tick, forever"""
+    fleet = fleet or build_fleet()
+    while True:
+        yield generate_fleet_readings(fleet, [np.datetime64(utc_now(), "ns")], rng)
+        time.sleep(interval)
+
+async def stream_to_backend(client, fleet, rng, interval=5.0, batches=None):
+    """Feed the ingest client: the given (backfill) batches, or one live tick per interval forever"""
+    async with client:
+        if batches is not None:
+            for batch in batches:
+                await client.put(*batch)
+            return
+        iteration = 0
+        while True:
+            iteration += 1
+            await client.put(*generate_fleet_readings(fleet, [np.datetime64(utc_now(), "ns")], rng))
+            if iteration % 10 == 0:
+                print(f"Iteration {iteration} - {datetime.now().strftime('%H:%M:%S')} - {client.stats()}")
+            await asyncio.sleep(interval)
+
+def load_fleet_stats(filename="energy_data.csv"):
+    """Resume running stats from the sidecar; only rescan the data if there is none"""
+    sidecar = stats_path(filename)
+    if os.path.exists(sidecar):
+        return FleetStats.load(sidecar)
+    stats = FleetStats()
+    try:
+        df = read_readings(filename)
+        stats.update(df["machine"].tolist(), df["energy"].values, df["timestamp"].values)
+        stats.save(sidecar)
+    except FileNotFoundError:
+        pass
+    return stats
+
+def print_summary_stats(filename="energy_data.csv", stats=None):
     """Print summary statistics of generated data"""
     try:
-        df = pd.read_csv(filename)
+        if stats is None:
+            stats = load_fleet_stats(filename)
         print("\n" + "="*60)
         print("ENERGY CONSUMPTION SUMMARY")
         print("="*60)
         
-        for machine in MACHINES:
-            machine_data = df[df['machine'] == machine]
-            if len(machine_data) > 0:
-                avg_energy = machine_data['energy'].mean()
-                min_energy = machine_data['energy'].min()
-                max_energy = machine_data['energy'].max()
-                print(f"{machine:12} | Avg: {avg_energy:6.1f} kWh | Min: {min_energy:6.1f} | Max: {max_energy:6.1f}")
+        summary = stats.summary()
+        for machine, machine_stats in list(summary.items())[:20]:
+            print(f"{machine:12} | Avg: {machine_stats['mean']:6.1f} kWh | Min: {machine_stats['min']:6.1f} | Max: {machine_stats['max']:6.1f}")
+        if len(summary) > 20:
+            print(f"... and {len(summary) - 20} more machines")
         
-        print(f"\nTotal records: {len(df)}")
-        print(f"Time range: {df['timestamp'].min()} to {df['timestamp'].max()}")
+        print(f"\nTotal records: {stats.total_count}")
+        if summary:
+            first = min(s["first_timestamp"] for s in summary.values())
+            last = max(s["last_timestamp"] for s in summary.values())
+            print(f"Time range: {first} to {last}")
         
     except Exception as e:
         print(f"Error reading summary: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IoT energy data simulator")
+    parser.add_argument("--output", default="energy_data.csv", help="Output file; a .bin suffix selects the binary format")
+    parser.add_argument("--format", choices=["csv", "bin"], help="Override the format inferred from --output")
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between readings")
+    parser.add_argument("--flush-rows", type=int, default=1000, help="Flush after this many buffered readings")
+    parser.add_argument("--flush-interval", type=float, default=5.0, help="Flush at least this often (seconds)")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES, default="never", help="When to fsync the output file")
+    parser.add_argument("--rotate-mb", type=float, help="Rotate the output file once it reaches this size")
+    parser.add_argument("--rotate-minutes", type=float, help="Rotate the output file after this long")
+    parser.add_argument("--profiles", help="JSON file of machine profiles ({name: {min, max, weight}})")
+    parser.add_argument("--fleet-size", type=int, help="Simulate this many machines drawn from the profiles")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible output")
+    parser.add_argument("--backfill-days", type=float, help="Write this many days of history ending now, then exit")
+    parser.add_argument("--backfill-step", type=float, default=3600, help="Seconds between backfilled readings")
+    parser.add_argument("--history", help="Also append readings to this history store directory (served by /history)")
+    parser.add_argument("--post", metavar="URL", help="Send readings to the backend's POST /readings instead of writing files")
+    parser.add_argument("--post-concurrency", type=int, default=4, help="Parallel keep-alive connections")
+    parser.add_argument("--post-batch-rows", type=int, default=5000, help="Max readings per request")
+    parser.add_argument("--post-queue", type=int, default=16, help="Batches buffered before the simulator waits for the backend")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    fleet = build_fleet(load_profiles(args.profiles), args.fleet_size, rng)
+
+    if args.post:
+        client = IngestClient(args.post, concurrency=args.post_concurrency, queue_size=args.post_queue,
+                              batch_rows=args.post_batch_rows)
+        batches = None
+        if args.backfill_days:
+            end = np.datetime64(utc_now(), "ns")
+            start = end - np.timedelta64(int(args.backfill_days * 86400), "s")
+            batches = backfill(fleet, start, end, args.backfill_step, rng)
+        print(f"Sending readings for {len(fleet)} machines to {args.post}/readings (Ctrl+C to stop)")
+        began = time.perf_counter()
+        try:
+            asyncio.run(stream_to_backend(client, fleet, rng, args.interval, batches))
+        except KeyboardInterrupt:
+            print("\n\nSimulation stopped by user.")
+        print(f"{client.stats()} in {time.perf_counter() - began:.1f}s")
+        raise SystemExit(0)
+
+    # Running per-machine stats, persisted whenever a batch reaches the file
+    stats = load_fleet_stats(args.output)
+    sidecar = stats_path(args.output)
+    history = HistoryStore(args.history) if args.history else None
+
+    def record_flush(machines, energies, timestamps):
+        stats.update(machines, energies, timestamps)
+        if history is not None:
+            history.append(machines, energies, timestamps)
+        if not args.backfill_days:
+            stats.save(sidecar)
+
+    writer = ReadingWriter(
+        args.output,
+        fmt=args.format,
+        # Backfill writes whole chunks; the flush policy only applies to live mode
+        flush_rows=1 if args.backfill_days else args.flush_rows,
+        flush_interval=args.flush_interval,
+        fsync=args.fsync,
+        rotate_bytes=int(args.rotate_mb * 1024 * 1024) if args.rotate_mb else None,
+        rotate_interval=args.rotate_minutes * 60 if args.rotate_minutes else None,
+        on_flush=record_flush,
+    )
+
+    if args.backfill_days:
+        end = np.datetime64(utc_now(), "ns")
+        start = end - np.timedelta64(int(args.backfill_days * 86400), "s")
+        print(f"Backfilling {args.backfill_days:g} days for {len(fleet)} machines into {args.output}...")
+        began = time.perf_counter()
+        writer.consume(backfill(fleet, start, end, args.backfill_step, rng))
+        writer.close()
+        stats.save(sidecar)
+        print(f"Wrote {writer.rows_written} readings in {time.perf_counter() - began:.1f}s")
+        print_summary_stats(args.output, stats)
+        raise SystemExit(0)
+
     print("IoT Energy Data Simulator Starting...")
     print("Press Ctrl+C to stop the simulation")
     print("-" * 50)
-    
+
     try:
-        iteration = 0
-        while True:
-            iteration += 1
-            data = generate_energy_data()
-            save_to_csv(data)
+        for iteration, (machines, energies, timestamps) in enumerate(simulate(args.interval, fleet, rng), start=1):
+            writer.write_columns(machines, energies, timestamps)
             
             print(f"\nIteration {iteration} - {datetime.now().strftime('%H:%M:%S')}")
-            for entry in data:
-                print(f"  {entry['machine']}: {entry['energy']:6.1f} kWh")
+            if len(fleet) <= 20:
+                for machine, energy in zip(machines, energies):
+                    print(f"  {machine}: {energy:6.1f} kWh")
+            else:
+                print(f"  {len(fleet)} machines, mean {energies.mean():6.1f} kWh")
             
             # Print summary every 10 iterations
             if iteration % 10 == 0:
-                print_summary_stats()
-            
-            time.sleep(5)  # Generate every 5 seconds
+                writer.flush()
+                print_summary_stats(args.output, stats)
             
     except KeyboardInterrupt:
+        writer.close()
         print("\n\nSimulation stopped by user.")
-        print_summary_stats()
-        print("Data saved to energy_data.csv")
+        print_summary_stats(args.output, stats)
+        print(f"Data saved to {args.output}")
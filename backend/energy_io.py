@@ -0,0 +1,270 @@
+"""
+Buffered, streaming storage for energy readings.
+
+ReadingWriter keeps its output file open, buffers readings in memory and
+flushes them in batches according to a row/time flush policy, with optional
+fsync and size/time based file rotation. Two formats are supported:
+
+    csv  machine,energy,timestamp,hour  (with header, same as before)
+    bin  8-byte magic followed by fixed-size little-endian records
+
+read_readings() reads any of these back (including rotated files and the
+legacy headerless 3-column CSV) into a DataFrame for model.py;
+iter_reading_chunks() streams them in typed chunks for out-of-core training.
+"""
+import glob
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+CSV_HEADER = "machine,energy,timestamp,hour\n"
+
+BIN_MAGIC = b"ENERGY1\n"
+# Timestamps are naive UTC datetime64[ns] values, like the CSV strings
+READING_DTYPE = np.dtype([("timestamp", "<i8"), ("energy", "<f4"), ("machine", "S24")])
+
+FSYNC_POLICIES = ("never", "flush", "rotate")
+
+# Longest machine name a bin record holds
+MACHINE_NAME_BYTES = READING_DTYPE["machine"].itemsize
+
+
+def storable_machine_name(name):
+    """Whether a name round-trips through both formats: 1-24 ASCII characters, no CSV separators"""
+    return 0 < len(name) <= MACHINE_NAME_BYTES and name.isascii() and not any(c in name for c in ",\r\n")
+
+
+def utc_now():
+    """The current time as the naive UTC datetime readings are stored with"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def infer_format(path):
+    return "bin" if path.endswith(".bin") else "csv"
+
+
+def readings_to_columns(readings):
+    """Reading dicts -> (machines, energies, timestamps) arrays"""
+    return (
+        np.array([r["machine"] for r in readings], dtype=object),
+        np.array([r["energy"] for r in readings], dtype=np.float64),
+        np.array([r["timestamp"] for r in readings], dtype="datetime64[ns]"),
+    )
+
+
+class ReadingWriter:
+    """Buffered writer for readings, given as dicts or as parallel column arrays"""
+
+    def __init__(self, path, fmt=None, flush_rows=1000, flush_interval=5.0, fsync="never",
+                 rotate_bytes=None, rotate_interval=None, on_flush=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+        self.path = path
+        self.fmt = fmt or infer_format(path)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.rotate_bytes = rotate_bytes
+        self.rotate_interval = rotate_interval
+        # on_flush(machines, energies, timestamps) runs after each batch has been written to the file
+        self.on_flush = on_flush
+        self._chunks = []
+        self._buffered = 0
+        self._file = None
+        self._opened_at = None
+        self._last_flush = time.monotonic()
+        self.rows_written = 0
+        self.flushes = 0
+        self.rotations = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _open(self):
+        self._file = open(self.path, "ab")
+        self._opened_at = time.monotonic()
+        # New (or empty) files start with the header / magic
+        if self._file.tell() == 0:
+            self._file.write(CSV_HEADER.encode() if self.fmt == "csv" else BIN_MAGIC)
+
+    def write(self, reading):
+        """Buffer one reading, flushing if the policy says so"""
+        self.write_many([reading])
+
+    def write_many(self, readings):
+        if readings:
+            self.write_columns(*readings_to_columns(readings))
+
+    def write_columns(self, machines, energies, timestamps):
+        """Buffer a batch of readings given as parallel arrays"""
+        self._chunks.append((
+            np.asarray(machines, dtype=object),
+            np.asarray(energies, dtype=np.float64),
+            np.asarray(timestamps, dtype="datetime64[ns]"),
+        ))
+        self._buffered += len(self._chunks[-1][0])
+        if self._buffered >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def consume(self, batches):
+        """Drain an iterable (e.g. a generator) of (machines, energies, timestamps) batches into the file"""
+        for batch in batches:
+            self.write_columns(*batch)
+        self.flush()
+
+    def _encode(self, machines, energies, timestamps):
+        if self.fmt == "csv":
+            # Batches share few distinct timestamps, so format each one once
+            unique, inverse = np.unique(timestamps, return_inverse=True)
+            hours = unique.astype("datetime64[h]").astype(np.int64) % 24
+            suffixes = [
+                f",{str(stamp).replace('T', ' ')},{hour}\n"
+                for stamp, hour in zip(unique.astype("datetime64[us]"), hours.tolist())
+            ]
+            lines = [
+                f"{machine},{energy}{suffixes[i]}"
+                for machine, energy, i in zip(machines, energies.tolist(), inverse.tolist())
+            ]
+            return "".join(lines).encode()
+        records = np.empty(len(machines), dtype=READING_DTYPE)
+        records["timestamp"] = timestamps.astype(np.int64)
+        records["energy"] = energies
+        records["machine"] = machines.astype("S24")
+        return records.tobytes()
+
+    def flush(self):
+        """Write buffered readings in one call; fsync and rotate per the policy"""
+        self._last_flush = time.monotonic()
+        if not self._buffered:
+            return
+        columns = tuple(np.concatenate(column) for column in zip(*self._chunks))
+        self._chunks = []
+        self._buffered = 0
+
+        if self._file is None:
+            self._open()
+        self._file.write(self._encode(*columns))
+        self._file.flush()
+        if self.fsync == "flush":
+            os.fsync(self._file.fileno())
+        self.rows_written += len(columns[0])
+        self.flushes += 1
+        if self.on_flush is not None:
+            self.on_flush(*columns)
+
+        if (self.rotate_bytes and self._file.tell() >= self.rotate_bytes) or \
+           (self.rotate_interval and time.monotonic() - self._opened_at >= self.rotate_interval):
+            self.rotate()
+
+    def rotate(self):
+        """Close the active file and move it aside as <stem>-<timestamp><suffix>"""
+        if self._file is None:
+            return
+        self._close_file()
+        stem, suffix = os.path.splitext(self.path)
+        rotated = f"{stem}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}{suffix}"
+        os.replace(self.path, rotated)
+        self.rotations += 1
+
+    def _close_file(self):
+        self._file.flush()
+        if self.fsync in ("flush", "rotate"):
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._close_file()
+
+
+def reading_files(path):
+    """The active file plus its rotated siblings, oldest first"""
+    stem, suffix = os.path.splitext(path)
+    files = sorted(glob.glob(f"{glob.escape(stem)}-*{suffix}"))
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_bin(path):
+    """Read a binary reading file, ignoring a partially written trailing record"""
+    with open(path, "rb") as f:
+        if f.read(len(BIN_MAGIC)) != BIN_MAGIC:
+            raise ValueError(f"{path} is not an energy reading file")
+        count = (os.path.getsize(path) - len(BIN_MAGIC)) // READING_DTYPE.itemsize
+        return np.fromfile(f, dtype=READING_DTYPE, count=count)
+
+
+def read_readings(path="energy_data.csv"):
+    """Load readings from path (and rotated siblings) as machine/energy/timestamp columns"""
+    import pandas as pd
+
+    frames = []
+    for file_path in reading_files(path):
+        if infer_format(file_path) == "bin":
+            records = read_bin(file_path)
+            frames.append(pd.DataFrame({
+                "machine": records["machine"].astype(str),
+                "energy": records["energy"].astype(np.float64),
+                "timestamp": records["timestamp"].astype("datetime64[ns]"),
+            }))
+        else:
+            # Handles both the headered 4-column format and the legacy headerless 3-column one
+            df = pd.read_csv(file_path, header=None, names=["machine", "energy", "timestamp", "hour"], dtype=str)
+            df = df[df["machine"] != "machine"]
+            frames.append(pd.DataFrame({
+                "machine": df["machine"].values,
+                "energy": df["energy"].astype(np.float64).values,
+                "timestamp": pd.to_datetime(df["timestamp"]).values,
+            }))
+
+    if not frames:
+        raise FileNotFoundError(path)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _csv_has_header(path):
+    with open(path) as f:
+        return f.readline().startswith("machine,")
+
+
+def iter_reading_chunks(path="energy_data.csv", chunk_rows=1_000_000):
+    """Yield readings in chunks of at most chunk_rows as typed DataFrames
+    (machine: category, energy: float32, timestamp: datetime64[ns])"""
+    import pandas as pd
+
+    for file_path in reading_files(path):
+        if infer_format(file_path) == "bin":
+            records = np.memmap(file_path, dtype=READING_DTYPE, mode="r", offset=len(BIN_MAGIC),
+                                shape=((os.path.getsize(file_path) - len(BIN_MAGIC)) // READING_DTYPE.itemsize,))
+            for start in range(0, len(records), chunk_rows):
+                chunk = records[start:start + chunk_rows]
+                names, codes = np.unique(chunk["machine"], return_inverse=True)
+                yield pd.DataFrame({
+                    "machine": pd.Categorical.from_codes(codes, categories=names.astype(str)),
+                    "energy": chunk["energy"].astype(np.float32),
+                    "timestamp": chunk["timestamp"].astype("datetime64[ns]"),
+                })
+            continue
+
+        if _csv_has_header(file_path):
+            options = {"header": 0, "usecols": ["machine", "energy", "timestamp"]}
+        else:
+            # Legacy headerless files may also have 4-column rows appended to them
+            options = {"header": None, "names": ["machine", "energy", "timestamp", "hour"]}
+        reader = pd.read_csv(file_path, chunksize=chunk_rows,
+                             dtype={"machine": "category", "energy": np.float32, "timestamp": str, "hour": np.float32},
+                             **options)
+        for df in reader:
+            yield pd.DataFrame({
+                "machine": df["machine"],
+                "energy": df["energy"],
+                "timestamp": pd.to_datetime(df["timestamp"], format="ISO8601"),
+            })
@@ -0,0 +1,136 @@
+"""
+Feature encoding shared by training and serving.
+
+FeatureEncoder turns raw (machine, hour, day, ...) values straight into a
+preallocated float64 matrix with a fixed column order: the numeric columns
+first, then one-hot machine columns named like pd.get_dummies() would name
+them. The encoder is saved next to the model artifact as JSON
+(energy_predictor.pkl -> energy_predictor.encoder.json) so the server always
+encodes requests exactly the way the model was trained.
+"""
+import json
+import os
+
+import numpy as np
+
+ENCODER_VERSION = 1
+
+DEFAULT_MACHINES = ["Machine_A", "Machine_B", "Machine_C"]
+DEFAULT_NUMERIC = ["hour", "day"]
+# create_model.py's 5-feature model (energy_predictor_full.pkl): every machine gets a column
+FULL_MODEL_NUMERIC = ["hour", "day", "temperature", "humidity"]
+
+
+def encoder_path(artifact_path):
+    """Sidecar location: model.pkl -> model.encoder.json, compiled dir -> dir/encoder.json"""
+    if os.path.isdir(artifact_path):
+        return os.path.join(artifact_path, "encoder.json")
+    return f"{os.path.splitext(artifact_path)[0]}.encoder.json"
+
+
+def hours_and_days(timestamps):
+    """Hour of day and day of month for datetime64 values"""
+    timestamps = np.asarray(timestamps, dtype="datetime64[ns]")
+    hours = timestamps.astype("datetime64[h]").astype(np.int64) % 24
+    dates = timestamps.astype("datetime64[D]")
+    days = (dates - dates.astype("datetime64[M]")).astype(np.int64) + 1
+    return hours, days
+
+
+class FeatureEncoder:
+    """Numeric columns followed by machine one-hot columns, in a fixed order"""
+
+    def __init__(self, machines=DEFAULT_MACHINES, numeric=DEFAULT_NUMERIC, drop_first=True):
+        # With drop_first the first machine is the reference category (all zeros),
+        # which is also how machines the model has never seen are encoded
+        self.machines = sorted(machines)
+        self.numeric = list(numeric)
+        self.drop_first = drop_first
+        self._encoded = np.array(self.machines[1:] if drop_first else self.machines)
+
+    @property
+    def columns(self):
+        return self.numeric + [f"machine_{name}" for name in self._encoded]
+
+    @property
+    def n_features(self):
+        return len(self.numeric) + len(self._encoded)
+
+    def encode(self, machines, out=None, **numeric):
+        """Encode parallel columns: encode(machines, hour=..., day=...) -> (n, n_features) matrix
+
+        Pass `out` (at least n rows) to fill a reusable buffer instead of allocating.
+        """
+        missing = set(self.numeric) - set(numeric)
+        if missing:
+            raise ValueError(f"Missing feature columns: {sorted(missing)}")
+        machines = np.asarray(machines, dtype=str)
+        n = len(machines)
+        X = np.empty((n, self.n_features), dtype=np.float64) if out is None else out[:n]
+        for i, name in enumerate(self.numeric):
+            X[:, i] = numeric[name]
+
+        dummies = X[:, len(self.numeric):]
+        dummies[:] = 0.0
+        if len(self._encoded):
+            positions = np.searchsorted(self._encoded, machines)
+            positions[positions == len(self._encoded)] = 0
+            known = self._encoded[positions] == machines
+            dummies[np.flatnonzero(known), positions[known]] = 1.0
+        return X
+
+    def encode_readings(self, machines, timestamps, out=None):
+        """Raw readings (machine, timestamp) -> matrix, deriving hour and day"""
+        hours, days = hours_and_days(timestamps)
+        return self.encode(machines, out=out, hour=hours, day=days)
+
+    def to_dict(self):
+        return {
+            "encoder_version": ENCODER_VERSION,
+            "machines": self.machines,
+            "numeric": self.numeric,
+            "drop_first": self.drop_first,
+            "columns": self.columns,
+        }
+
+    def save(self, path):
+        """Atomically write the encoder as JSON"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            state = json.load(f)
+        if state.get("encoder_version") != ENCODER_VERSION:
+            raise ValueError(f"Unsupported feature encoder version: {state.get('encoder_version')}")
+        encoder = cls(state["machines"], state["numeric"], state["drop_first"])
+        if encoder.columns != state["columns"]:
+            raise ValueError(f"Feature encoder at {path} is inconsistent with its column list")
+        return encoder
+
+
+def load_encoder(artifact_path, default=None):
+    """The encoder saved with a model artifact. Artifacts from before the encoder
+    existed get `default`, i.e. the (hour, day, Machine_B, Machine_C) layout."""
+    path = encoder_path(artifact_path)
+    if not os.path.exists(path):
+        return default or FeatureEncoder()
+    return FeatureEncoder.load(path)
+
+
+def accept_arrays(model, encoder):
+    """Let an sklearn model fitted on a DataFrame predict straight from encoder matrices.
+
+    The feature names it recorded must be the encoder's columns; they are then
+    dropped from this in-memory model, so predict() takes the float matrix as
+    is instead of a DataFrame (and does not warn about the missing names).
+    """
+    names = getattr(model, "feature_names_in_", None)
+    if names is not None:
+        if list(names) != encoder.columns:
+            raise ValueError(f"Model was fitted on {list(names)}, encoder produces {encoder.columns}")
+        del model.feature_names_in_
+    return model
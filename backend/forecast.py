@@ -0,0 +1,92 @@
+"""
+Multi-horizon forecasts shared per UTC hour.
+
+ForecastCache computes the full MAX_HORIZON x machines forecast once per
+(hour bucket, model version) with a single batched prediction; every caller
+within that hour gets a slice of the same arrays. app_original calls get()
+just after the top of each hour so no request pays for the rebuild.
+"""
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from energy_io import utc_now
+from feature_encoder import hours_and_days
+
+MAX_HORIZON = 168
+
+
+def hour_bucket(now=None):
+    """Start of the hour containing `now` (naive UTC, like the stored readings)"""
+    return (now or utc_now()).replace(minute=0, second=0, microsecond=0)
+
+
+def seconds_to_next_hour(now=None):
+    now = now or utc_now()
+    return (hour_bucket(now) + timedelta(hours=1) - now).total_seconds()
+
+
+class Forecast:
+    """Predictions for machines x hours starting at `start`"""
+
+    def __init__(self, start, machines, predictions, version, seconds):
+        self.start = start
+        self.machines = list(machines)
+        # (machines, hours)
+        self.predictions = predictions
+        self.version = version
+        self.compute_seconds = seconds
+        self.timestamps = np.datetime64(start, "h") + np.arange(predictions.shape[1])
+
+
+class ForecastCache:
+    """One Forecast per hour bucket and model version, built at most once"""
+
+    def __init__(self, max_horizon=MAX_HORIZON):
+        self.max_horizon = max_horizon
+        self._current = None
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.hits = 0
+
+    def get(self, machines, version, predict, now=None):
+        """The forecast for the current hour bucket, building it with
+        predict(machines, hours, days) if needed"""
+        start = hour_bucket(now)
+        current = self._current
+        if self._fresh(current, start, machines, version):
+            self.hits += 1
+            return current
+        with self._lock:
+            # Another caller may have built it while we waited
+            current = self._current
+            if self._fresh(current, start, machines, version):
+                self.hits += 1
+                return current
+            self._current = self._build(start, machines, version, predict)
+            return self._current
+
+    @staticmethod
+    def _fresh(current, start, machines, version):
+        return current is not None and current.start == start and current.version == version and \
+            current.machines == list(machines)
+
+    def _build(self, start, machines, version, predict):
+        began = datetime.now()
+        hours, days = hours_and_days(np.datetime64(start, "h") + np.arange(self.max_horizon))
+        # Machine-major feature rows for the whole horizon, predicted in one call
+        rows_machines = np.repeat(np.asarray(machines), self.max_horizon)
+        predictions = np.asarray(predict(rows_machines, np.tile(hours, len(machines)), np.tile(days, len(machines))))
+        self.builds += 1
+        seconds = (datetime.now() - began).total_seconds()
+        return Forecast(start, machines, predictions.reshape(len(machines), self.max_horizon), version, seconds)
+
+    def stats(self):
+        current = self._current
+        return {
+            "builds": self.builds,
+            "hits": self.hits,
+            "bucket": current.start.isoformat() if current else None,
+            "compute_seconds": round(current.compute_seconds, 4) if current else None,
+        }
@@ -0,0 +1,295 @@
+"""
+Time-partitioned history of energy readings with precomputed rollups.
+
+Layout under the store directory:
+
+    machines.json            machine name -> id (append-only list)
+    partitions.json          per-day row count / sortedness of the raw files
+    raw/YYYY-MM-DD.bin       fixed 16-byte records (timestamp, machine id, energy)
+    hourly/YYYY-MM-DD.npy    (24, machines) count/sum/min/max rollups
+    daily/YYYY-MM.npy        (31, machines) count/sum/min/max rollups
+
+Raw partitions are append-only and read through np.memmap; a range query only
+opens the partitions (or rollup files) overlapping the requested range, and
+within a time-ordered partition finds its bounds with a binary search. Rows
+from partitions that received late readings are sorted at query time, so raw
+results are always in timestamp order.
+
+Usage:
+    python history_store.py [energy_data.csv] [history]   # import an existing log
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+RAW_DTYPE = np.dtype([("timestamp", "<i8"), ("machine", "<i4"), ("energy", "<f4")])
+ROLLUP_DTYPE = np.dtype([("count", "<i8"), ("sum", "<f8"), ("min", "<f4"), ("max", "<f4")])
+
+HOUR_NS = 3600 * 10 ** 9
+DAY_NS = 24 * HOUR_NS
+RESOLUTIONS = ("raw", "hour", "day")
+
+
+def _day_name(day):
+    return str(np.datetime64(int(day), "D"))
+
+
+def _empty_rollup(shape):
+    rollup = np.zeros(shape, dtype=ROLLUP_DTYPE)
+    rollup["min"] = np.inf
+    rollup["max"] = -np.inf
+    return rollup
+
+
+class HistoryStore:
+    """Append-only, day-partitioned reading history (single writer, many readers)"""
+
+    def __init__(self, path):
+        self.path = path
+        for sub in ("raw", "hourly", "daily"):
+            os.makedirs(os.path.join(path, sub), exist_ok=True)
+        self._meta_mtimes = {}
+        self.machines = []
+        self.index = {}
+        self.partitions = {}
+        self.refresh()
+
+    # -- metadata -------------------------------------------------------------
+
+    def _read_json(self, name, default):
+        file_path = os.path.join(self.path, name)
+        try:
+            mtime = os.path.getmtime(file_path)
+        except FileNotFoundError:
+            return default, False
+        if self._meta_mtimes.get(name) == mtime:
+            return default, False
+        self._meta_mtimes[name] = mtime
+        with open(file_path) as f:
+            return json.load(f), True
+
+    def _write_json(self, name, state):
+        file_path = os.path.join(self.path, name)
+        with open(f"{file_path}.tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(f"{file_path}.tmp", file_path)
+        self._meta_mtimes[name] = os.path.getmtime(file_path)
+
+    def refresh(self):
+        """Pick up metadata written by another process (cheap when nothing changed)"""
+        machines, changed = self._read_json("machines.json", self.machines)
+        if changed:
+            self.machines = machines
+            self.index = {name: i for i, name in enumerate(machines)}
+        partitions, _ = self._read_json("partitions.json", self.partitions)
+        self.partitions = partitions
+
+    def _machine_ids(self, machines):
+        names, inverse = np.unique(np.asarray(machines, dtype=str), return_inverse=True)
+        new = [name for name in names.tolist() if name not in self.index]
+        if new:
+            for name in new:
+                self.index[name] = len(self.machines)
+                self.machines.append(name)
+            self._write_json("machines.json", self.machines)
+        return np.array([self.index[name] for name in names.tolist()], dtype=np.int32)[inverse]
+
+    # -- writes ---------------------------------------------------------------
+
+    def append(self, machines, energies, timestamps):
+        """Append a batch of readings and fold it into the hourly and daily rollups"""
+        if len(machines) == 0:
+            return
+        ids = self._machine_ids(machines)
+        energies = np.asarray(energies, dtype=np.float32)
+        timestamps = np.asarray(timestamps, dtype="datetime64[ns]").astype(np.int64)
+
+        days = timestamps // DAY_NS
+        # Stable sort keeps each day's readings in arrival order
+        order = np.argsort(days, kind="stable")
+        days, ids, energies, timestamps = days[order], ids[order], energies[order], timestamps[order]
+        bounds = np.flatnonzero(np.diff(days)) + 1
+        for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(days)]):
+            self._append_day(int(days[start]), ids[start:end], energies[start:end], timestamps[start:end])
+        self._write_json("partitions.json", self.partitions)
+
+    def _append_day(self, day, ids, energies, timestamps):
+        name = _day_name(day)
+        records = np.empty(len(ids), dtype=RAW_DTYPE)
+        records["timestamp"] = timestamps
+        records["machine"] = ids
+        records["energy"] = energies
+        with open(os.path.join(self.path, "raw", f"{name}.bin"), "ab") as f:
+            f.write(records.tobytes())
+
+        partition = self.partitions.setdefault(name, {"rows": 0, "sorted": True, "last": None})
+        in_order = bool(np.all(timestamps[1:] >= timestamps[:-1]))
+        if partition["last"] is not None and timestamps[0] < partition["last"]:
+            in_order = False
+        partition["sorted"] = partition["sorted"] and in_order
+        partition["last"] = max(int(timestamps.max()), partition["last"] or int(timestamps.max()))
+        partition["rows"] += len(ids)
+
+        hours = (timestamps % DAY_NS) // HOUR_NS
+        self._update_rollup(os.path.join(self.path, "hourly", f"{name}.npy"), 24, hours, ids, energies)
+        date = np.datetime64(day, "D")
+        day_of_month = int((date - date.astype("datetime64[M]")).astype(np.int64))
+        self._update_rollup(
+            os.path.join(self.path, "daily", f"{str(date.astype('datetime64[M]'))}.npy"),
+            31, np.full(len(ids), day_of_month), ids, energies,
+        )
+
+    def _update_rollup(self, file_path, slots, rows, ids, energies):
+        """Merge readings into a (slots, machines) rollup file, in place when it is big enough"""
+        needed = len(self.machines)
+        if os.path.exists(file_path):
+            rollup = np.load(file_path, mmap_mode="r+")
+            if rollup.shape[1] < needed:
+                # Grow with headroom so new machines rarely force a rewrite
+                grown = _empty_rollup((slots, max(needed, 2 * rollup.shape[1])))
+                grown[:, :rollup.shape[1]] = rollup
+                del rollup
+                rollup = self._rewrite(file_path, grown)
+        else:
+            rollup = self._rewrite(file_path, _empty_rollup((slots, max(needed, 8))))
+
+        flat = rollup.reshape(-1)
+        keys = rows * rollup.shape[1] + ids
+        touched, inverse = np.unique(keys, return_inverse=True)
+        flat["count"][touched] += np.bincount(inverse)
+        flat["sum"][touched] += np.bincount(inverse, weights=energies)
+        low = np.full(len(touched), np.inf, dtype=np.float32)
+        high = np.full(len(touched), -np.inf, dtype=np.float32)
+        np.minimum.at(low, inverse, energies)
+        np.maximum.at(high, inverse, energies)
+        flat["min"][touched] = np.minimum(flat["min"][touched], low)
+        flat["max"][touched] = np.maximum(flat["max"][touched], high)
+        rollup.flush()
+
+    @staticmethod
+    def _rewrite(file_path, array):
+        np.save(f"{file_path}.tmp.npy", array)
+        os.replace(f"{file_path}.tmp.npy", file_path)
+        return np.load(file_path, mmap_mode="r+")
+
+    # -- reads ----------------------------------------------------------------
+
+    def _days(self, start_ns, end_ns):
+        return np.arange(start_ns // DAY_NS, (end_ns - 1) // DAY_NS + 1)
+
+    def query(self, start, end, machine=None, resolution="hour"):
+        """Readings in [start, end) as columns; rollup resolutions return count/mean/min/max per bucket.
+
+        Without a machine the rollups are fleet totals and raw rows include the machine name.
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"resolution must be one of {RESOLUTIONS}")
+        self.refresh()
+        start_ns = int(np.datetime64(start, "ns").astype(np.int64))
+        end_ns = int(np.datetime64(end, "ns").astype(np.int64))
+        machine_id = None
+        if machine is not None:
+            if machine not in self.index:
+                raise KeyError(machine)
+            machine_id = self.index[machine]
+        if end_ns <= start_ns:
+            return self._empty(resolution, machine)
+
+        if resolution == "raw":
+            return self._query_raw(start_ns, end_ns, machine_id)
+        if resolution == "hour":
+            files = [(os.path.join(self.path, "hourly", f"{_day_name(day)}.npy"), int(day) * DAY_NS, HOUR_NS)
+                     for day in self._days(start_ns, end_ns)]
+        else:
+            months = np.unique(self._days(start_ns, end_ns).astype("datetime64[D]").astype("datetime64[M]"))
+            files = [(os.path.join(self.path, "daily", f"{month}.npy"),
+                      int(month.astype("datetime64[D]").astype(np.int64)) * DAY_NS, DAY_NS)
+                     for month in months]
+        return self._query_rollup(files, start_ns, end_ns, machine_id)
+
+    def _empty(self, resolution, machine):
+        if resolution == "raw":
+            columns = ["timestamp", "energy"] + ([] if machine is not None else ["machine"])
+        else:
+            columns = ["timestamp", "count", "mean", "min", "max"]
+        return {name: [] for name in columns}
+
+    def _query_raw(self, start_ns, end_ns, machine_id):
+        parts = []
+        for day in self._days(start_ns, end_ns):
+            name = _day_name(day)
+            partition = self.partitions.get(name)
+            if partition is None:
+                continue
+            records = np.memmap(os.path.join(self.path, "raw", f"{name}.bin"), dtype=RAW_DTYPE, mode="r",
+                                shape=(partition["rows"],))
+            if partition["sorted"]:
+                lo, hi = np.searchsorted(records["timestamp"], [start_ns, end_ns])
+                records = records[lo:hi]
+            else:
+                stamps = records["timestamp"]
+                records = records[(stamps >= start_ns) & (stamps < end_ns)]
+                # Late readings were appended out of order; stable keeps arrival order for equal times
+                records = records[np.argsort(records["timestamp"], kind="stable")]
+            if machine_id is not None:
+                records = records[records["machine"] == machine_id]
+            parts.append(np.array(records))
+        records = np.concatenate(parts) if parts else np.empty(0, dtype=RAW_DTYPE)
+        result = {
+            "timestamp": records["timestamp"].astype("datetime64[ns]"),
+            "energy": records["energy"].astype(np.float64),
+        }
+        if machine_id is None:
+            result["machine"] = np.array(self.machines, dtype=object)[records["machine"]] if len(records) else []
+        return result
+
+    def _query_rollup(self, files, start_ns, end_ns, machine_id):
+        stamps, counts, sums, lows, highs = [], [], [], [], []
+        for file_path, origin_ns, step_ns in files:
+            if not os.path.exists(file_path):
+                continue
+            rollup = np.load(file_path, mmap_mode="r")
+            bucket_starts = origin_ns + np.arange(rollup.shape[0], dtype=np.int64) * step_ns
+            # Buckets that overlap [start, end)
+            selected = (bucket_starts + step_ns > start_ns) & (bucket_starts < end_ns)
+            rows = rollup[selected]
+            if machine_id is not None:
+                if machine_id >= rows.shape[1]:
+                    continue
+                rows = rows[:, machine_id]
+                count, total, low, high = rows["count"], rows["sum"], rows["min"], rows["max"]
+            else:
+                count, total = rows["count"].sum(axis=1), rows["sum"].sum(axis=1)
+                low, high = rows["min"].min(axis=1), rows["max"].max(axis=1)
+            present = count > 0
+            stamps.append(bucket_starts[selected][present])
+            counts.append(count[present])
+            sums.append(total[present])
+            lows.append(low[present])
+            highs.append(high[present])
+        if not stamps:
+            return self._empty("hour", machine_id)
+        count = np.concatenate(counts)
+        return {
+            "timestamp": np.concatenate(stamps).astype("datetime64[ns]"),
+            "count": count,
+            "mean": np.concatenate(sums) / count,
+            "min": np.concatenate(lows).astype(np.float64),
+            "max": np.concatenate(highs).astype(np.float64),
+        }
+
+
+if __name__ == "__main__":
+    from energy_io import iter_reading_chunks
+
+    data_path = sys.argv[1] if len(sys.argv) > 1 else "energy_data.csv"
+    store_path = sys.argv[2] if len(sys.argv) > 2 else "history"
+
+    store = HistoryStore(store_path)
+    rows = 0
+    for chunk in iter_reading_chunks(data_path):
+        store.append(chunk["machine"].astype(str).values, chunk["energy"].values, chunk["timestamp"].values)
+        rows += len(chunk)
+    print(f"Imported {rows} readings from {data_path} into {store_path}/")
@@ -0,0 +1,124 @@
+"""
+Asyncio client that ships reading batches to the backend's POST /readings.
+
+Producers put (machines, energies, timestamps) batches on a bounded queue;
+when the backend falls behind the queue fills up and the producer waits
+(backpressure). A few workers share one keep-alive httpx connection pool,
+merge whatever is queued into requests of up to `batch_rows` readings and
+retry with exponential backoff. POST /readings is not idempotent, so only
+failures where the backend cannot have stored the batch are retried:
+connection errors, 429 and 503. Other errors drop the batch.
+"""
+import asyncio
+import random
+
+import numpy as np
+
+RETRY_STATUS = {429, 503}
+
+
+def readings_payload(machines, energies, timestamps):
+    """Column arrays -> the JSON body POST /readings expects"""
+    return {
+        "machine": np.asarray(machines).astype(str).tolist(),
+        "energy": np.asarray(energies, dtype=np.float64).tolist(),
+        "timestamp": np.datetime_as_string(np.asarray(timestamps, dtype="datetime64[ns]"), unit="us").tolist(),
+    }
+
+
+class IngestClient:
+    """Bounded queue + pooled HTTP workers in front of POST /readings"""
+
+    def __init__(self, base_url, concurrency=4, queue_size=16, batch_rows=5000, retries=5, timeout=10.0):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.batch_rows = batch_rows
+        self.retries = retries
+        self.timeout = timeout
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self._client = None
+        self._workers = []
+        self.rows_sent = 0
+        self.requests = 0
+        self.retried = 0
+        self.rows_dropped = 0
+
+    async def __aenter__(self):
+        import httpx
+
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        self._client = httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=self.timeout)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        return self
+
+    async def __aexit__(self, *exc):
+        if exc[0] is None:
+            await self.queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        await self._client.aclose()
+
+    async def put(self, machines, energies, timestamps):
+        """Queue a batch, waiting while the queue is full; large batches are split"""
+        for start in range(0, len(machines), self.batch_rows):
+            end = start + self.batch_rows
+            await self.queue.put((machines[start:end], energies[start:end], timestamps[start:end]))
+
+    async def _worker(self):
+        while True:
+            batches = [await self.queue.get()]
+            # Coalesce whatever else is already waiting into the same request
+            rows = len(batches[0][0])
+            while rows < self.batch_rows and not self.queue.empty():
+                batches.append(self.queue.get_nowait())
+                rows += len(batches[-1][0])
+            try:
+                columns = [np.concatenate(column) for column in zip(*batches)]
+                await self._send(readings_payload(*columns), rows)
+            except Exception as exc:
+                # One bad batch must not take the sender down with it
+                self.rows_dropped += rows
+                print(f"Failed to send {rows} readings: {exc!r}")
+            finally:
+                for _ in batches:
+                    self.queue.task_done()
+
+    async def _send(self, payload, rows):
+        import httpx
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self._client.post("/readings", json=payload)
+                if response.status_code not in RETRY_STATUS:
+                    self.requests += 1
+                    if response.is_success:
+                        self.rows_sent += rows
+                    else:
+                        # Validation errors won't succeed on retry
+                        self.rows_dropped += rows
+                        print(f"Backend rejected {rows} readings: {response.status_code} {response.text[:200]}")
+                    return
+                error = f"HTTP {response.status_code}"
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as exc:
+                # The request never reached the backend
+                error = repr(exc)
+            except httpx.TransportError as exc:
+                # It may have been stored before the connection broke; resending could duplicate it
+                self.rows_dropped += rows
+                print(f"Not retrying {rows} readings after {exc!r}")
+                return
+            if attempt < self.retries:
+                self.retried += 1
+                await asyncio.sleep(min(10.0, 0.25 * 2 ** attempt) * random.uniform(0.5, 1.0))
+        self.rows_dropped += rows
+        print(f"Giving up on {rows} readings after {self.retries + 1} attempts: {error}")
+
+    def stats(self):
+        return {
+            "rows_sent": self.rows_sent,
+            "requests": self.requests,
+            "retried": self.retried,
+            "rows_dropped": self.rows_dropped,
+            "queued": self.queue.qsize(),
+        }
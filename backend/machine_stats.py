@@ -0,0 +1,134 @@
+"""
+Incremental per-machine energy statistics.
+
+FleetStats keeps count, mean, variance (Welford / Chan's parallel update, so
+whole batches are merged at once), min, max and first/last timestamp for
+every machine in flat NumPy arrays. It is persisted to a small JSON sidecar
+next to the data file so restarts resume without rescanning the history.
+"""
+import json
+import os
+
+import numpy as np
+
+
+def stats_path(data_path):
+    """Sidecar location for a data file: energy_data.csv -> energy_data.stats.json"""
+    return f"{os.path.splitext(data_path)[0]}.stats.json"
+
+
+def to_ns(timestamps):
+    """datetime objects / datetime64 values -> int64 nanoseconds (wall clock)"""
+    return np.asarray(timestamps, dtype="datetime64[ns]").astype(np.int64)
+
+
+class FleetStats:
+    """Running per-machine aggregates, updated batch-wise"""
+
+    FIELDS = ("count", "mean", "m2", "min", "max", "first_ns", "last_ns")
+
+    def __init__(self):
+        self.index = {}
+        self.machines = []
+        self.count = np.zeros(0, dtype=np.int64)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self.min = np.zeros(0)
+        self.max = np.zeros(0)
+        self.first_ns = np.zeros(0, dtype=np.int64)
+        self.last_ns = np.zeros(0, dtype=np.int64)
+
+    def _indices(self, machines):
+        """Map machine names to array slots, adding slots for new machines"""
+        new = [m for m in dict.fromkeys(machines) if m not in self.index]
+        if new:
+            for name in new:
+                self.index[name] = len(self.machines)
+                self.machines.append(name)
+            grow = len(new)
+            self.count = np.concatenate([self.count, np.zeros(grow, dtype=np.int64)])
+            self.mean = np.concatenate([self.mean, np.zeros(grow)])
+            self.m2 = np.concatenate([self.m2, np.zeros(grow)])
+            self.min = np.concatenate([self.min, np.full(grow, np.inf)])
+            self.max = np.concatenate([self.max, np.full(grow, -np.inf)])
+            self.first_ns = np.concatenate([self.first_ns, np.zeros(grow, dtype=np.int64)])
+            self.last_ns = np.concatenate([self.last_ns, np.zeros(grow, dtype=np.int64)])
+        return np.fromiter((self.index[m] for m in machines), dtype=np.int64, count=len(machines))
+
+    def update(self, machines, energies, timestamps):
+        """Merge a batch of readings into the running aggregates"""
+        if len(machines) == 0:
+            return
+        slots = self._indices(machines)
+        energies = np.asarray(energies, dtype=np.float64)
+        timestamps = to_ns(timestamps)
+
+        # Per-machine aggregates of this batch
+        touched, inverse = np.unique(slots, return_inverse=True)
+        n_b = np.bincount(inverse).astype(np.float64)
+        mean_b = np.bincount(inverse, energies) / n_b
+        m2_b = np.bincount(inverse, (energies - mean_b[inverse]) ** 2)
+        min_b = np.full(len(touched), np.inf)
+        max_b = np.full(len(touched), -np.inf)
+        np.minimum.at(min_b, inverse, energies)
+        np.maximum.at(max_b, inverse, energies)
+        first_b = np.full(len(touched), np.iinfo(np.int64).max)
+        last_b = np.full(len(touched), np.iinfo(np.int64).min)
+        np.minimum.at(first_b, inverse, timestamps)
+        np.maximum.at(last_b, inverse, timestamps)
+
+        # Chan et al. merge of (count, mean, M2) pairs
+        n_a = self.count[touched].astype(np.float64)
+        n = n_a + n_b
+        delta = mean_b - self.mean[touched]
+        self.mean[touched] += delta * n_b / n
+        self.m2[touched] += m2_b + delta ** 2 * n_a * n_b / n
+        self.count[touched] += n_b.astype(np.int64)
+        self.min[touched] = np.minimum(self.min[touched], min_b)
+        self.max[touched] = np.maximum(self.max[touched], max_b)
+        self.first_ns[touched] = np.where(n_a == 0, first_b, np.minimum(self.first_ns[touched], first_b))
+        self.last_ns[touched] = np.maximum(self.last_ns[touched], last_b)
+
+    def machine_summary(self, machine):
+        i = self.index[machine]
+        count = int(self.count[i])
+        variance = float(self.m2[i] / (count - 1)) if count > 1 else 0.0
+        return {
+            "count": count,
+            "mean": float(self.mean[i]),
+            "variance": variance,
+            "std": variance ** 0.5,
+            "min": float(self.min[i]),
+            "max": float(self.max[i]),
+            "first_timestamp": str(np.datetime64(int(self.first_ns[i]), "ns")),
+            "last_timestamp": str(np.datetime64(int(self.last_ns[i]), "ns")),
+        }
+
+    def summary(self):
+        return {machine: self.machine_summary(machine) for machine in self.machines}
+
+    @property
+    def total_count(self):
+        return int(self.count.sum())
+
+    def save(self, path):
+        """Atomically write the aggregates to a JSON sidecar"""
+        state = {"machines": self.machines}
+        for field in self.FIELDS:
+            state[field] = getattr(self, field).tolist()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            state = json.load(f)
+        stats = cls()
+        stats.machines = list(state["machines"])
+        stats.index = {name: i for i, name in enumerate(stats.machines)}
+        for field in cls.FIELDS:
+            dtype = np.int64 if field in ("count", "first_ns", "last_ns") else np.float64
+            setattr(stats, field, np.array(state[field], dtype=dtype))
+        return stats
@@ -0,0 +1,160 @@
+"""
+Prometheus metrics for the FastAPI apps.
+
+instrument(app) adds a pure ASGI middleware that records a latency histogram
+per route template plus an in-flight gauge, and serves everything at
+GET /metrics. Server-Sent Events responses leave the in-flight gauge as
+soon as their headers go out, so long-lived streams do not look like queued
+requests. stage("encoding") etc. time the parts of a prediction;
+rows_predicted(n) counts predicted rows (rate() gives rows per second).
+
+With several uvicorn workers set PROMETHEUS_MULTIPROC_DIR (start.sh does)
+so /metrics aggregates every worker instead of whichever one answered.
+prometheus_client is optional: without it every call here is a no-op and
+/metrics is not registered.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import prometheus_client
+except ImportError:  # ultra-simple deployments only ship fastapi/uvicorn
+    prometheus_client = None
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# Latency buckets (seconds) for whole requests and for prediction stages
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = prometheus_client.Histogram(
+        "http_request_duration_seconds", "Request latency by route template",
+        ["method", "route", "status"], buckets=REQUEST_BUCKETS,
+    )
+    IN_FLIGHT = prometheus_client.Gauge(
+        "http_requests_in_flight", "Requests being handled (excluding open event streams)",
+        multiprocess_mode="livesum",
+    )
+    STAGE_LATENCY = prometheus_client.Histogram(
+        "prediction_stage_duration_seconds", "Time spent per prediction stage",
+        ["stage"], buckets=STAGE_BUCKETS,
+    )
+    ROWS_PREDICTED = prometheus_client.Counter(
+        "prediction_rows_total", "Rows predicted, by where the answer came from", ["source"],
+    )
+    MODEL_LOAD_SECONDS = prometheus_client.Gauge(
+        "model_load_seconds", "Load plus warm-up time of the active model version",
+        multiprocess_mode="livemax",
+    )
+    MODEL_INFO = prometheus_client.Gauge(
+        "model_info", "1 for the active model version, 0 for versions it replaced", ["version"],
+        multiprocess_mode="livemax",
+    )
+    STARTUP_PHASE = prometheus_client.Gauge(
+        "startup_phase_seconds", "Cold-start time per phase (phase=\"total\" is time to ready)", ["phase"],
+        multiprocess_mode="livemax",
+    )
+
+# Scraping and probes are not traffic: keep them out of the latency histogram
+UNTRACKED_PATHS = {"/metrics", "/live", "/ready"}
+
+_model = {"version": None}
+
+
+@contextmanager
+def stage(name):
+    """Time a block into prediction_stage_duration_seconds{stage=name}"""
+    if prometheus_client is None:
+        yield
+        return
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(name).observe(time.perf_counter() - began)
+
+
+def rows_predicted(count, source="model"):
+    if prometheus_client is not None and count:
+        ROWS_PREDICTED.labels(source).inc(count)
+
+
+def set_model(version, load_seconds):
+    """Publish the active model version and how long it took to become ready"""
+    if prometheus_client is None:
+        return
+    # Zero the old series rather than removing it: multiprocess files keep removed samples
+    if _model["version"] is not None and _model["version"] != version:
+        MODEL_INFO.labels(_model["version"]).set(0)
+    _model["version"] = version
+    MODEL_INFO.labels(version).set(1)
+    MODEL_LOAD_SECONDS.set(load_seconds)
+
+
+def startup_phase(name, seconds):
+    if prometheus_client is not None:
+        STARTUP_PHASE.labels(name).set(seconds)
+
+
+class MetricsMiddleware:
+    """Per-route latency and in-flight requests, without buffering the response"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in UNTRACKED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        began = time.perf_counter()
+        IN_FLIGHT.inc()
+        state = {"status": 500, "streaming": False, "counted": True}
+
+        def leave():
+            if state["counted"]:
+                IN_FLIGHT.dec()
+                state["counted"] = False
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                headers = dict(message.get("headers") or [])
+                if headers.get(b"content-type", b"").startswith(b"text/event-stream"):
+                    state["streaming"] = True
+                    leave()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            leave()
+            if not state["streaming"]:
+                route = scope.get("route")
+                REQUEST_LATENCY.labels(
+                    scope["method"], getattr(route, "path", "unmatched"), str(state["status"]),
+                ).observe(time.perf_counter() - began)
+
+
+def metrics_response():
+    from fastapi import Response
+
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return Response(prometheus_client.generate_latest(registry), media_type=prometheus_client.CONTENT_TYPE_LATEST)
+
+
+def instrument(app):
+    """Add the metrics middleware and GET /metrics to a FastAPI app"""
+    if prometheus_client is None:
+        print("Warning: prometheus_client not installed; /metrics disabled")
+        return
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics_response, methods=["GET"], include_in_schema=False)
@@ -0,0 +1,125 @@
+"""
+Asyncio micro-batching for single-row prediction requests.
+
+Concurrent requests are collected for up to `window_ms` (or until
+`max_batch_size` are waiting), evaluated with one batched call in an
+executor, and the results are fanned back out to the waiting requests.
+Each request names a group (app_original passes the model version it
+resolved on arrival) and only requests of the same group share a batch.
+"""
+import asyncio
+import threading
+
+
+class MicroBatcher:
+    """Coalesce concurrent submit() calls into batched predict_batch() calls"""
+
+    def __init__(self, predict_batch, max_batch_size=64, window_ms=2.0, executor=None):
+        # predict_batch(group, items) must return one result per item, in order
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.window = window_ms / 1000.0
+        self.executor = executor
+        self._pending = []
+        self._wakeup = None
+        self._full = None
+        self._task = None
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_batch_seen = 0
+        self.size_histogram = {}
+
+    def start(self):
+        """Start the batching loop on the running event loop"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._full = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, item, group=None):
+        """Queue one item and wait for its result; items are only batched with items of the same group"""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((group, item, future))
+        self._wakeup.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            # Give other requests a short window to join this batch
+            if len(self._pending) < self.max_batch_size and self.window > 0:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+
+            # The oldest request's group goes first; other groups wait for the next pass
+            group = self._pending[0][0]
+            batch, rest = [], []
+            for entry in self._pending:
+                (batch if entry[0] == group and len(batch) < self.max_batch_size else rest).append(entry)
+            self._pending = rest
+            if not self._pending:
+                self._wakeup.clear()
+            if len(self._pending) < self.max_batch_size:
+                self._full.clear()
+
+            # Requests whose clients went away no longer need a result
+            batch = [(item, future) for _, item, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.predict_batch, group, [item for item, _ in batch]
+                )
+            except Exception as exc:
+                self._record(len(batch), failed=True)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            self._record(len(batch))
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _record(self, size, failed=False):
+        with self._stats_lock:
+            self.requests += size
+            self.batches += 1
+            self.errors += int(failed)
+            self.max_batch_seen = max(self.max_batch_seen, size)
+            # Power-of-two buckets: 1, 2, 4, ...
+            bucket = 1 << (size - 1).bit_length()
+            self.size_histogram[bucket] = self.size_histogram.get(bucket, 0) + 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "window_ms": self.window * 1000.0,
+                "requests": self.requests,
+                "batches": self.batches,
+                "errors": self.errors,
+                "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "max_batch_seen": self.max_batch_seen,
+                "batch_size_histogram": {f"<={bucket}": count for bucket, count in sorted(self.size_histogram.items())},
+                "queued": len(self._pending),
+            }
@@ -1,26 +1,167 @@
+"""
+Train energy_predictor.pkl from the simulator's readings.
+
+    python model.py                              # load everything into memory (small logs)
+    python model.py --mode sample --sample-rate 0.01
+    python model.py --mode aggregate             # nightly retrain on full history
+
+The sample and aggregate modes stream the data in typed chunks, so memory
+is bounded by the chunk size plus the training set rather than the log size.
+Aggregate mode reduces the history to mean energy per (machine, hour, day)
+and fits with the row counts as sample weights.
+"""
+import argparse
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import joblib
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
-import joblib
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import train_test_split
+
+from energy_io import iter_reading_chunks, read_readings
+from feature_encoder import FeatureEncoder, encoder_path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+HOURS = 24
+DAYS = 31
+
+
+@contextmanager
+def stage(name):
+    """Report wall time, peak traced allocation and process max RSS for a stage"""
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    line = f"{name:10} {elapsed:8.2f}s  peak {peak:9.1f} MiB"
+    if resource is not None:
+        # ru_maxrss is KiB on Linux
+        line += f"  max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:9.1f} MiB"
+    print(line)
+
+
+def load_full(path):
+    """Original in-memory path: every reading becomes a training row"""
+    df = read_readings(path)
+    encoder = FeatureEncoder(df["machine"].unique())
+    X = encoder.encode_readings(df["machine"].values, df["timestamp"].values)
+    return encoder, X, df["energy"].values, None
+
+
+def load_sample(path, chunk_rows, sample_rate, seed):
+    """Bernoulli-sample each chunk as it streams past"""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for chunk in iter_reading_chunks(path, chunk_rows):
+        keep = rng.random(len(chunk)) < sample_rate
+        chunk = chunk[keep]
+        parts.append(pd.DataFrame({
+            "machine": chunk["machine"].astype(str).values,
+            "hour": chunk["timestamp"].dt.hour.astype(np.int8).values,
+            "day": chunk["timestamp"].dt.day.astype(np.int8).values,
+            "energy": chunk["energy"].values,
+        }))
+    if not parts:
+        raise FileNotFoundError(path)
+    df = pd.concat(parts, ignore_index=True)
+    encoder = FeatureEncoder(df["machine"].unique())
+    X = encoder.encode(df["machine"].values, hour=df["hour"].values, day=df["day"].values)
+    return encoder, X, df["energy"].values, None
+
+
+def load_aggregate(path, chunk_rows):
+    """Stream per-(machine, hour, day) energy sums and counts into flat arrays"""
+    index = {}
+    sums = np.zeros(0)
+    counts = np.zeros(0, dtype=np.int64)
+    for chunk in iter_reading_chunks(path, chunk_rows):
+        categories = chunk["machine"].cat.categories
+        for name in categories:
+            index.setdefault(name, len(index))
+        if len(index) * HOURS * DAYS > len(sums):
+            grow = len(index) * HOURS * DAYS - len(sums)
+            sums = np.concatenate([sums, np.zeros(grow)])
+            counts = np.concatenate([counts, np.zeros(grow, dtype=np.int64)])
+
+        slots = np.array([index[name] for name in categories])[chunk["machine"].cat.codes.values]
+        keys = (slots * HOURS + chunk["timestamp"].dt.hour.values) * DAYS + chunk["timestamp"].dt.day.values - 1
+        sums += np.bincount(keys, weights=chunk["energy"].values, minlength=len(sums))
+        counts += np.bincount(keys, minlength=len(counts))
+    if not index:
+        raise FileNotFoundError(path)
+
+    keys = np.flatnonzero(counts)
+    slots, rest = np.divmod(keys, HOURS * DAYS)
+    hours, days = np.divmod(rest, DAYS)
+    names = np.array(list(index), dtype=object)
+    encoder = FeatureEncoder(names)
+    X = encoder.encode(names[slots], hour=hours, day=days + 1)
+    return encoder, X, sums[keys] / counts[keys], counts[keys]
+
+
+def save_model(model, encoder, path):
+    """Write via a temp file so a hot-reloading server never sees a partial pickle.
+    The encoder goes first: the server reloads when the pickle changes."""
+    encoder.save(encoder_path(path))
+    tmp_path = f"{path}.tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the energy prediction model")
+    parser.add_argument("--data", default="energy_data.csv", help="Reading file written by data_simulator.py (CSV or .bin)")
+    parser.add_argument("--output", default="energy_predictor.pkl")
+    parser.add_argument("--mode", choices=["full", "sample", "aggregate"], default="full")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="Rows per streamed chunk")
+    parser.add_argument("--sample-rate", type=float, default=0.1, help="Fraction of readings kept in sample mode")
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Training processes (-1 = all cores)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+
+    with stage("load"):
+        if args.mode == "aggregate":
+            encoder, X, y, weights = load_aggregate(args.data, args.chunk_rows)
+        elif args.mode == "sample":
+            encoder, X, y, weights = load_sample(args.data, args.chunk_rows, args.sample_rate, args.seed)
+        else:
+            encoder, X, y, weights = load_full(args.data)
+    print(f"Training rows: {len(X)} ({args.mode} mode), features: {encoder.columns}")
 
-# Load simulated CSV data
-df = pd.read_csv("energy_data.csv", names=["machine", "energy", "timestamp"])
-df['timestamp'] = pd.to_datetime(df['timestamp'])
-df['hour'] = df['timestamp'].dt.hour
-df['day'] = df['timestamp'].dt.day
+    with stage("split"):
+        if weights is None:
+            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=args.seed)
+            w_train = w_test = None
+        else:
+            X_train, X_test, y_train, y_test, w_train, w_test = train_test_split(
+                X, y, weights, test_size=0.2, random_state=args.seed)
 
-# Encode machine names
-df = pd.get_dummies(df, columns=['machine'], drop_first=True)
+    # Tree building allocates outside the Python heap tracemalloc sees; max RSS covers it
+    with stage("fit"):
+        model = RandomForestRegressor(n_estimators=args.n_estimators, n_jobs=args.n_jobs, random_state=args.seed)
+        model.fit(X_train, y_train, sample_weight=w_train)
 
-X = df.drop(["energy", "timestamp"], axis=1)
-y = df["energy"]
+    with stage("evaluate"):
+        mae = mean_absolute_error(y_test, model.predict(X_test), sample_weight=w_test)
+    print(f"Holdout MAE: {mae:.2f} kWh" + (" (on per-group means)" if weights is not None else ""))
 
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    with stage("save"):
+        save_model(model, encoder, args.output)
+    print("Model trained and saved!")
 
-# Train model
-model = RandomForestRegressor(n_estimators=100)
-model.fit(X_train, y_train)
 
-# Save model
-joblib.dump(model, "energy_predictor.pkl")
-print("Model trained and saved!")
+if __name__ == "__main__":
+    main()
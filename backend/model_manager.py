@@ -0,0 +1,187 @@
+"""
+Hot-reloadable holder for the served model.
+
+The manager polls the model artifact, loads and validates a new version in a
+background thread, warms it and then swaps it in with a single reference
+assignment. Request handlers grab `manager.current` once, so requests that are
+already running finish on the version they started with.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+from prediction_grid import model_fingerprint
+
+
+class ModelVersion:
+    """A loaded predictor plus everything derived from it; not mutated once active"""
+
+    def __init__(self, predictor, version, path, loaded_at, load_seconds):
+        self.predictor = predictor
+        self.version = version
+        self.path = path
+        self.loaded_at = loaded_at
+        self.load_seconds = load_seconds
+        self.warm_seconds = 0.0
+        # Seconds per stage: model_load, encoder_load, warm, grid
+        self.timings = {}
+        self.encoder = None
+        self.grid = None
+        # Per-tree (compiled) view of an sklearn forest, built on first use for quantiles
+        self.forest = None
+
+
+class ModelManager:
+    """Loads, validates and atomically swaps model versions"""
+
+    def __init__(self, path, load, load_encoder=None, prepare=None, warm=None, poll_interval=0.0):
+        # load(path) -> predictor
+        # load_encoder(path) -> the feature encoder saved with the artifact
+        # warm(candidate) runs a smoke batch and raises if the model is unusable
+        # prepare(candidate) -> precomputed grid (or None), built before the swap
+        self.path = path
+        self.load = load
+        self.load_encoder = load_encoder
+        self.prepare = prepare
+        self.warm = warm
+        self.poll_interval = poll_interval
+        self.current = None
+        self._listeners = []
+        self._reload_lock = threading.Lock()
+        self._signature = None
+        self._pending_signature = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_checked = None
+
+    def on_swap(self, callback):
+        """Register callback(new_version, previous_version), called after each swap"""
+        self._listeners.append(callback)
+
+    def artifact_signature(self):
+        """Cheap change detector: (name, size, mtime) of the artifact file(s), or None if missing"""
+        try:
+            if os.path.isdir(self.path):
+                names = sorted(os.listdir(self.path))
+                stats = [(name, os.stat(os.path.join(self.path, name))) for name in names]
+            else:
+                stats = [(self.path, os.stat(self.path))]
+        except FileNotFoundError:
+            return None
+        return tuple((name, st.st_size, st.st_mtime_ns) for name, st in stats)
+
+    def reload(self, force=False):
+        """Load the artifact and swap it in; returns False if it is unchanged. Raises on failure."""
+        with self._reload_lock:
+            try:
+                loaded = self._load_candidate(force)
+            except Exception as exc:
+                self.failures += 1
+                self.last_error = repr(exc)
+                raise
+            if loaded is None:
+                return False
+            candidate, signature = loaded
+
+            previous = self.current
+            self.current = candidate
+            self._signature = signature
+            self.reloads += 1
+            self.last_error = None
+
+        breakdown = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in candidate.timings.items())
+        print(f"Model {candidate.version} active ({breakdown})")
+        for callback in self._listeners:
+            callback(candidate, previous)
+        return True
+
+    def _load_candidate(self, force):
+        """(warmed candidate, artifact signature), or None if the artifact is unchanged"""
+        signature = self.artifact_signature()
+        if signature is None:
+            raise FileNotFoundError(self.path)
+        version = model_fingerprint(self.path)
+        if not force and self.current is not None and version == self.current.version:
+            self._signature = signature
+            return None
+
+        timings = {}
+        start = time.perf_counter()
+        candidate = ModelVersion(self.load(self.path), version, self.path, datetime.now(), 0.0)
+        timings["model_load"] = time.perf_counter() - start
+        if self.load_encoder is not None:
+            start = time.perf_counter()
+            candidate.encoder = self.load_encoder(self.path)
+            timings["encoder_load"] = time.perf_counter() - start
+        if self.warm is not None:
+            start = time.perf_counter()
+            self.warm(candidate)
+            timings["warm"] = time.perf_counter() - start
+        if self.prepare is not None:
+            start = time.perf_counter()
+            candidate.grid = self.prepare(candidate)
+            timings["grid"] = time.perf_counter() - start
+        candidate.timings = timings
+        candidate.load_seconds = timings["model_load"] + timings.get("encoder_load", 0.0)
+        candidate.warm_seconds = timings.get("warm", 0.0) + timings.get("grid", 0.0)
+        return candidate, signature
+
+    def check(self):
+        """One poll step: reload once the artifact has changed and stopped changing"""
+        self.last_checked = datetime.now()
+        signature = self.artifact_signature()
+        if signature is None or signature == self._signature:
+            self._pending_signature = None
+            return False
+        # Wait for one more unchanged poll so a half-written artifact is never loaded
+        if signature != self._pending_signature:
+            self._pending_signature = signature
+            return False
+        self._pending_signature = None
+        try:
+            return self.reload()
+        except Exception as exc:
+            # reload() has counted the failure. Don't retry the same broken artifact until it changes again
+            self._signature = signature
+            print(f"Warning: model reload from {self.path} failed: {exc!r}")
+            return False
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            self.check()
+
+    def start(self):
+        """Start polling the artifact in a daemon thread"""
+        if self.poll_interval > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._poll, name="model-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def status(self):
+        active = self.current
+        return {
+            "loaded": active is not None,
+            "version": active.version if active else None,
+            "path": self.path,
+            "loaded_at": active.loaded_at.isoformat() if active else None,
+            "load_seconds": round(active.load_seconds, 4) if active else None,
+            "warm_seconds": round(active.warm_seconds, 4) if active else None,
+            "timings": {name: round(seconds, 4) for name, seconds in active.timings.items()} if active else None,
+            "features": active.encoder.columns if active and active.encoder else None,
+            "grid": active is not None and active.grid is not None,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "poll_interval": self.poll_interval,
+            "last_checked": self.last_checked.isoformat() if self.last_checked else None,
+        }
@@ -0,0 +1,127 @@
+"""
+Dense prediction tensor over the discrete feature space served by app_original.py.
+
+The deployed model only sees its encoder's machines x 24 hours x 31 days, so
+every possible prediction is evaluated once and stored as a (machine, hour,
+day) .npy tensor. The tensor is memory-mapped at startup and rebuilt whenever
+the model artifact or the machine list it was built for changes; machines
+outside the grid are left to the model.
+
+Usage:
+    python prediction_grid.py [energy_predictor.pkl] [energy_grid.npy]
+"""
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+GRID_HOURS = 24
+GRID_DAYS = 31
+
+
+def model_fingerprint(path):
+    """Content hash of a model artifact (a file or a directory of files)"""
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, name) for name in os.listdir(path))
+    else:
+        files = [path]
+    for file_path in files:
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+class PredictionGrid:
+    """A (machine, hour, day) tensor plus the machine names along its first axis"""
+
+    def __init__(self, values, machines):
+        self.values = values
+        self.machines = list(machines)
+        names = np.array(self.machines)
+        self._order = np.argsort(names)
+        self._sorted = names[self._order]
+
+    def machine_index(self, machines):
+        """Grid rows for machine names; -1 for machines the grid was not built for"""
+        machines = np.asarray(machines)
+        if not len(self._sorted):
+            return np.full(machines.shape, -1)
+        position = np.minimum(np.searchsorted(self._sorted, machines), len(self._sorted) - 1)
+        return np.where(self._sorted[position] == machines, self._order[position], -1)
+
+
+def build_grid(predict_rows, machines):
+    """Evaluate predict_rows(machines, hours, days) over the whole grid in one call"""
+    names, hours, days = np.meshgrid(
+        np.array(machines), np.arange(GRID_HOURS), np.arange(1, GRID_DAYS + 1), indexing="ij"
+    )
+    predictions = predict_rows(names.ravel(), hours.ravel(), days.ravel())
+    return np.asarray(predictions, dtype=np.float64).reshape(len(machines), GRID_HOURS, GRID_DAYS)
+
+
+def save_grid(grid, path, fingerprint, machines):
+    """Atomically write the tensor and a sidecar recording which model and machines built it"""
+    tmp_path = f"{path}.tmp.{os.getpid()}.npy"
+    np.save(tmp_path, grid)
+    os.replace(tmp_path, path)
+    with open(f"{path}.json.tmp", "w") as f:
+        json.dump({"model_fingerprint": fingerprint, "shape": list(grid.shape), "machines": list(machines)}, f)
+    os.replace(f"{path}.json.tmp", f"{path}.json")
+
+
+def load_grid(path, fingerprint, machines):
+    """Memory-map the tensor if it was built from the given model and machines, else return None"""
+    try:
+        with open(f"{path}.json") as f:
+            meta = json.load(f)
+        if meta.get("model_fingerprint") != fingerprint or meta.get("machines") != list(machines):
+            return None
+        values = np.load(path, mmap_mode="r")
+    except (FileNotFoundError, ValueError):
+        return None
+    if values.shape != (len(machines), GRID_HOURS, GRID_DAYS):
+        return None
+    return PredictionGrid(values, machines)
+
+
+def load_or_build_grid(path, fingerprint, predict_rows, machines):
+    """Return the memory-mapped grid for this model and machine list, rebuilding it if stale"""
+    grid = load_grid(path, fingerprint, machines)
+    if grid is None:
+        print(f"Building prediction grid {path} for model {fingerprint} ({len(machines)} machines)...")
+        save_grid(build_grid(predict_rows, machines), path, fingerprint, machines)
+        grid = PredictionGrid(np.load(path, mmap_mode="r"), machines)
+    return grid
+
+
+def grid_lookup(grid, machines, hours, days):
+    """Vectorized lookup; returns (predictions, in_grid) where out-of-grid rows are NaN"""
+    hours = np.asarray(hours)
+    days = np.asarray(days)
+    rows = grid.machine_index(machines)
+    in_grid = (rows >= 0) & (hours >= 0) & (hours < GRID_HOURS) & (days >= 1) & (days <= GRID_DAYS)
+    predictions = np.full(len(hours), np.nan)
+    predictions[in_grid] = grid.values[rows[in_grid], hours[in_grid], days[in_grid] - 1]
+    return predictions, in_grid
+
+
+if __name__ == "__main__":
+    import joblib
+
+    from feature_encoder import accept_arrays, load_encoder
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else "energy_predictor.pkl"
+    grid_path = sys.argv[2] if len(sys.argv) > 2 else "energy_grid.npy"
+
+    encoder = load_encoder(model_path)
+    model = accept_arrays(joblib.load(model_path), encoder)
+
+    def predict_rows(machines, hours, days):
+        return model.predict(encoder.encode(machines, hour=hours, day=days))
+
+    save_grid(build_grid(predict_rows, encoder.machines), grid_path, model_fingerprint(model_path), encoder.machines)
+    print(f"Prediction grid saved to {grid_path}")
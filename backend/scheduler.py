@@ -0,0 +1,321 @@
+"""
+Energy-aware job scheduling on top of the per-machine hourly forecast.
+
+The cost surface is the model's predicted energy per machine and hour
+(optionally times a tariff). Running a job of `duration` hours on machine m
+from hour s costs the sum of that surface over [s, s + duration), which for
+every (m, s) at once is a difference of prefix sums. Jobs are grouped by
+duration so each group's (jobs, machines, starts) cost table is one array.
+
+objective="cost" gives every job its cheapest feasible slot in one vectorized
+pass; objective="peak" places jobs one at a time, largest first, where they
+raise the local load the least. Either way a repair pass then moves jobs out
+of hours that break the peak cap or machine capacity, always to a slot that
+fits, choosing the move that adds the least cost. Each move strictly reduces
+the total overload, so repair terminates.
+"""
+import time
+
+import numpy as np
+
+OBJECTIVES = ("cost", "peak")
+
+# Upper bound on cells in one (jobs, machines, starts) cost table
+TABLE_CELLS = 4_000_000
+TOLERANCE = 1e-9
+
+
+def window_sums(values, duration):
+    """Sums of values[..., s:s + duration] for every start s along the last axis"""
+    prefix = np.concatenate([np.zeros(values.shape[:-1] + (1,)), np.cumsum(values, axis=-1)], axis=-1)
+    return prefix[..., duration:] - prefix[..., :-duration]
+
+
+class Schedule:
+    """Solver output; machine/start are -1 for jobs that had no feasible slot"""
+
+    def __init__(self, machine, start, cost, energy, load, baseline_cost, feasible, moves, seconds):
+        self.machine = machine
+        self.start = start
+        self.cost = cost
+        self.energy = energy
+        # Scheduled load per hour across the fleet
+        self.load = load
+        self.baseline_cost = baseline_cost
+        self.feasible = feasible
+        self.moves = moves
+        self.seconds = seconds
+
+    @property
+    def scheduled(self):
+        return self.machine >= 0
+
+
+class Scheduler:
+    """Assign start hours and machines to jobs over a (machines, hours) forecast"""
+
+    def __init__(self, predictions, tariff=None, peak_cap=None, machine_capacity=None):
+        self.predictions = np.asarray(predictions, dtype=np.float64)
+        self.n_machines, self.horizon = self.predictions.shape
+        self.tariff = np.ones(self.horizon) if tariff is None else np.broadcast_to(
+            np.asarray(tariff, dtype=np.float64), (self.horizon,))
+        self.price = self.predictions * self.tariff
+        self.peak_cap = None if peak_cap is None else np.broadcast_to(
+            np.asarray(peak_cap, dtype=np.float64), (self.horizon,)).copy()
+        # Jobs one machine can run in the same hour (None = unlimited)
+        self.machine_capacity = machine_capacity
+        self._window_cost = {}
+        self._window_energy = {}
+
+    def window_cost(self, duration):
+        if duration not in self._window_cost:
+            self._window_cost[duration] = window_sums(self.price, duration)
+        return self._window_cost[duration]
+
+    def window_energy(self, duration):
+        if duration not in self._window_energy:
+            self._window_energy[duration] = window_sums(self.predictions, duration)
+        return self._window_energy[duration]
+
+    # -- initial placement ----------------------------------------------------
+
+    def _cheapest(self, duration, eligible, release, deadline, load):
+        """Cheapest slot per job, ignoring caps, plus the as-soon-as-possible baseline cost"""
+        n = len(duration)
+        machine = np.full(n, -1, dtype=np.int64)
+        start = np.full(n, -1, dtype=np.int64)
+        baseline = np.full(n, np.nan)
+        for d in np.unique(duration).tolist():
+            if d > self.horizon:
+                continue
+            group = np.flatnonzero(duration == d)
+            costs = self.window_cost(d)
+            starts = np.arange(costs.shape[1])
+            chunk = max(1, TABLE_CELLS // costs.size)
+            for begin in range(0, len(group), chunk):
+                rows = group[begin:begin + chunk]
+                in_window = (starts >= release[rows, None]) & (starts + d <= deadline[rows, None])
+                allowed = eligible[rows, :, None] & in_window[:, None, :]
+                table = np.where(allowed, costs[None, :, :] * load[rows, None, None], np.inf)
+                flat = table.reshape(len(rows), -1)
+                best = flat.argmin(axis=1)
+                found = np.isfinite(flat[np.arange(len(rows)), best])
+                machine[rows[found]] = best[found] // costs.shape[1]
+                start[rows[found]] = best[found] % costs.shape[1]
+                # Baseline: start at the release hour on the cheapest eligible machine
+                first = np.minimum(release[rows], costs.shape[1] - 1)
+                at_release = table[np.arange(len(rows)), :, first].min(axis=1)
+                baseline[rows] = np.where(np.isfinite(at_release), at_release, np.nan)
+        return machine, start, baseline
+
+    def _flattest(self, duration, eligible, release, deadline, load, state):
+        """Largest jobs first, each where it raises the local peak the least (ties: cheapest)"""
+        constrained = self.peak_cap is not None or self.machine_capacity is not None
+        fleet = state.fleet_load
+        ineligible = ~eligible
+        has_machine = eligible.any(axis=1).tolist()
+        restricted = ineligible.any(axis=1).tolist()
+        for j in np.argsort(-(duration * load), kind="stable").tolist():
+            d = int(duration[j])
+            lo, hi = int(release[j]), min(int(deadline[j]), self.horizon)
+            n_starts = hi - lo - d + 1
+            if n_starts <= 0 or not has_machine[j]:
+                continue
+            # Window max of the fleet load with this job added, per machine and start
+            with_job = fleet[lo:hi] + load[j] * self.predictions[:, lo:hi]
+            peak = with_job[:, :n_starts] if d == 1 else np.maximum(with_job[:, :n_starts], with_job[:, 1:1 + n_starts])
+            for offset in range(2, d):
+                np.maximum(peak, with_job[:, offset:offset + n_starts], out=peak)
+            if restricted[j]:
+                peak[ineligible[j]] = np.inf
+            m, s = self._lowest_peak(peak, d, lo)
+            if constrained and not self._fits(m, s, d, load[j], state):
+                # Flattest slot breaks a constraint: retry among the slots that fit, if any
+                fits = self._slots(np.array([j]), d, load, state)[0][:, lo:lo + n_starts]
+                if fits[eligible[j]].any():
+                    peak[~fits] = np.inf
+                    m, s = self._lowest_peak(peak, d, lo)
+            state.machine[j], state.start[j] = m, s
+            state.add(m, s, d, load[j])
+
+    def _lowest_peak(self, peak, duration, first):
+        """(machine, start) with the lowest window peak, cheapest among ties"""
+        lowest = peak <= peak.min() * (1 + TOLERANCE)
+        costs = np.where(lowest, self.window_cost(duration)[:, first:first + peak.shape[1]], np.inf)
+        m, s = divmod(int(costs.argmin()), peak.shape[1])
+        return m, first + s
+
+    # -- constraints ----------------------------------------------------------
+
+    def _slots(self, rows, duration, load, state):
+        """(jobs, machines, starts) mask of slots where each job fits under the cap and capacity.
+
+        Checked against the current load including the job's own placement, which only
+        ever rejects slots, so a move into one of these never creates a new overload.
+        """
+        bad = np.zeros((len(rows), self.n_machines, self.horizon), dtype=bool)
+        if self.peak_cap is not None:
+            headroom = self.peak_cap * (1 + TOLERANCE) - state.fleet_load
+            bad |= load[rows, None, None] * self.predictions[None, :, :] > headroom[None, None, :]
+        if self.machine_capacity is not None:
+            bad |= (state.running >= self.machine_capacity)[None, :, :]
+        return window_sums(bad.astype(np.float32), duration) < 0.5
+
+    def _fits(self, m, s, duration, load, state):
+        """Whether one job still fits in slot (m, s)"""
+        hours = slice(s, s + duration)
+        if self.peak_cap is not None:
+            after = state.fleet_load[hours] + load * self.predictions[m, hours]
+            if np.any(after > self.peak_cap[hours] * (1 + TOLERANCE)):
+                return False
+        if self.machine_capacity is not None and np.any(state.running[m, hours] >= self.machine_capacity):
+            return False
+        return True
+
+    def _repair(self, duration, eligible, release, deadline, load, state, max_moves):
+        """Move jobs out of overloaded hours until every constraint holds; returns (feasible, moves)"""
+        moves = 0
+        while moves < max_moves:
+            hour, machine = state.worst_violation()
+            if hour is None:
+                return True, moves
+            active = (state.machine >= 0) & (state.start <= hour) & (hour < state.start + duration)
+            if machine is not None:
+                active &= state.machine == machine
+            candidates = np.flatnonzero(active)
+
+            # Cheapest slot that fits for every job running in the overloaded hour, one table per duration
+            deltas, jobs, targets, starts = [], [], [], []
+            for d in np.unique(duration[candidates]).tolist():
+                rows = candidates[duration[candidates] == d]
+                costs = self.window_cost(d)
+                first = np.arange(costs.shape[1])
+                in_window = (first >= release[rows, None]) & (first + d <= deadline[rows, None])
+                allowed = eligible[rows, :, None] & in_window[:, None, :] & self._slots(rows, d, load, state)
+                table = np.where(allowed, costs[None, :, :] * load[rows, None, None], np.inf).reshape(len(rows), -1)
+                best = table.argmin(axis=1)
+                value = table[np.arange(len(rows)), best]
+                found = np.isfinite(value)
+                current = costs[state.machine[rows], state.start[rows]] * load[rows]
+                deltas.append((value - current)[found])
+                jobs.append(rows[found])
+                targets.append(best[found] // costs.shape[1])
+                starts.append(best[found] % costs.shape[1])
+            deltas = np.concatenate(deltas)
+            if deltas.size == 0:
+                return False, moves
+
+            # Apply the cheapest moves until this hour is no longer overloaded
+            jobs, targets, starts = np.concatenate(jobs), np.concatenate(targets), np.concatenate(starts)
+            applied = 0
+            for k in np.argsort(deltas, kind="stable").tolist():
+                j, m, s = int(jobs[k]), int(targets[k]), int(starts[k])
+                d = int(duration[j])
+                if not self._fits(m, s, d, load[j], state):
+                    continue
+                state.remove(state.machine[j], state.start[j], d, load[j])
+                state.machine[j], state.start[j] = m, s
+                state.add(m, s, d, load[j])
+                applied += 1
+                moves += 1
+                if state.resolved(hour, machine) or moves >= max_moves:
+                    break
+            if applied == 0:
+                return False, moves
+        return state.worst_violation()[0] is None, moves
+
+    # -- entry point ----------------------------------------------------------
+
+    def solve(self, duration, eligible, release=None, deadline=None, load=None, objective="cost", max_moves=None):
+        """Schedule jobs given as columns: duration (hours), eligible (jobs, machines) mask,
+        release / deadline hour offsets into the horizon and a per-job load factor"""
+        if objective not in OBJECTIVES:
+            raise ValueError(f"objective must be one of {OBJECTIVES}")
+        began = time.perf_counter()
+        duration = np.asarray(duration, dtype=np.int64)
+        n = len(duration)
+        eligible = np.asarray(eligible, dtype=bool).reshape(n, self.n_machines)
+        release = np.zeros(n, dtype=np.int64) if release is None else np.asarray(release, dtype=np.int64)
+        deadline = np.full(n, self.horizon, dtype=np.int64) if deadline is None else np.minimum(
+            np.asarray(deadline, dtype=np.int64), self.horizon)
+        load = np.ones(n) if load is None else np.asarray(load, dtype=np.float64)
+
+        cheapest, cheapest_start, baseline = self._cheapest(duration, eligible, release, deadline, load)
+        if objective == "peak":
+            state = LoadState(self, duration, np.full(n, -1), np.full(n, -1))
+            self._flattest(duration, eligible, release, deadline, load, state)
+        else:
+            state = LoadState(self, duration, cheapest, cheapest_start)
+            state.build(load)
+
+        feasible, moves = True, 0
+        if self.peak_cap is not None or self.machine_capacity is not None:
+            feasible, moves = self._repair(duration, eligible, release, deadline, load, state,
+                                           max_moves if max_moves is not None else 20 * n + 100)
+
+        scheduled = state.machine >= 0
+        cost = np.full(n, np.nan)
+        energy = np.full(n, np.nan)
+        for d in np.unique(duration[scheduled]).tolist():
+            rows = np.flatnonzero(scheduled & (duration == d))
+            cost[rows] = self.window_cost(d)[state.machine[rows], state.start[rows]] * load[rows]
+            energy[rows] = self.window_energy(d)[state.machine[rows], state.start[rows]] * load[rows]
+        return Schedule(state.machine, state.start, cost, energy, state.fleet_load.copy(), baseline,
+                        feasible and bool(scheduled.all()), moves, time.perf_counter() - began)
+
+
+class LoadState:
+    """Current assignment plus the per-hour fleet load and per-machine running-job counts"""
+
+    def __init__(self, scheduler, duration, machine, start):
+        self.scheduler = scheduler
+        self.duration = duration
+        self.machine = np.array(machine, dtype=np.int64)
+        self.start = np.array(start, dtype=np.int64)
+        self.fleet_load = np.zeros(scheduler.horizon)
+        self.running = np.zeros((scheduler.n_machines, scheduler.horizon), dtype=np.int64)
+
+    def build(self, load):
+        """Recompute the load profile for the whole assignment with difference arrays"""
+        placed = self.machine >= 0
+        m, s, d = self.machine[placed], self.start[placed], self.duration[placed]
+        width = self.scheduler.horizon + 1
+        weight = np.zeros((self.scheduler.n_machines, width))
+        count = np.zeros((self.scheduler.n_machines, width), dtype=np.int64)
+        np.add.at(weight, (m, s), load[placed])
+        np.add.at(weight, (m, s + d), -load[placed])
+        np.add.at(count, (m, s), 1)
+        np.add.at(count, (m, s + d), -1)
+        weight = np.cumsum(weight, axis=1)[:, :-1]
+        self.running = np.cumsum(count, axis=1)[:, :-1]
+        self.fleet_load = (weight * self.scheduler.predictions).sum(axis=0)
+
+    def add(self, machine, start, duration, load, sign=1):
+        hours = slice(start, start + duration)
+        self.fleet_load[hours] += sign * load * self.scheduler.predictions[machine, hours]
+        self.running[machine, hours] += sign
+
+    def remove(self, machine, start, duration, load):
+        self.add(machine, start, duration, load, sign=-1)
+
+    def resolved(self, hour, machine):
+        """Whether the overload found by worst_violation() at this hour is gone"""
+        scheduler = self.scheduler
+        if machine is not None:
+            return self.running[machine, hour] <= scheduler.machine_capacity
+        return self.fleet_load[hour] <= scheduler.peak_cap[hour] * (1 + TOLERANCE)
+
+    def worst_violation(self):
+        """(hour, machine) of the largest overload: machine is None for the fleet peak cap"""
+        scheduler = self.scheduler
+        if scheduler.peak_cap is not None:
+            over = self.fleet_load - scheduler.peak_cap * (1 + TOLERANCE)
+            hour = int(over.argmax())
+            if over[hour] > 0:
+                return hour, None
+        if scheduler.machine_capacity is not None:
+            over = self.running - scheduler.machine_capacity
+            machine, hour = np.unravel_index(over.argmax(), over.shape)
+            if over[machine, hour] > 0:
+                return int(hour), int(machine)
+        return None, None
@@ -9,9 +9,60 @@ export PORT=${PORT:-8000}
 # Set default host
 export HOST=${HOST:-0.0.0.0}
 
+# Application to serve (app:app, app_original:app, app_precomputed:app, ...)
+export APP_MODULE=${APP_MODULE:-app:app}
+
+# Usable cores: nproc, capped by the container's cgroup CPU quota
+detect_cpus() {
+    local cpus quota period
+    cpus=$(nproc 2>/dev/null || echo 1)
+    if [ -f /sys/fs/cgroup/cpu.max ]; then
+        read -r quota period < /sys/fs/cgroup/cpu.max
+    elif [ -f /sys/fs/cgroup/cpu/cpu.cfs_quota_us ]; then
+        quota=$(cat /sys/fs/cgroup/cpu/cpu.cfs_quota_us)
+        period=$(cat /sys/fs/cgroup/cpu/cpu.cfs_period_us)
+    fi
+    if [ -n "$quota" ] && [ "$quota" != "max" ] && [ "$quota" -gt 0 ]; then
+        quota=$(( (quota + period - 1) / period ))
+        [ "$quota" -lt "$cpus" ] && cpus=$quota
+    fi
+    echo "$cpus"
+}
+
+# One worker per usable core unless overridden
+export WORKERS=${WORKERS:-${WEB_CONCURRENCY:-$(detect_cpus)}}
+
+# Workers share Prometheus metrics through files in PROMETHEUS_MULTIPROC_DIR; start it empty
+if [ "$WORKERS" -gt 1 ]; then
+    export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus-multiproc}
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 # Print environment info
 echo "Python version: $(python --version)"
-echo "Starting server on $HOST:$PORT"
+echo "Starting $APP_MODULE on $HOST:$PORT with $WORKERS worker(s)"
+
+if [ "$APP_MODULE" = "app_original:app" ]; then
+    # sklearn is the faster default at large batches; MODEL_FORMAT=compiled serves the
+    # memory-mapped forest instead (no sklearn import, one shared copy across workers)
+    export MODEL_PATH=${MODEL_PATH:-energy_predictor.pkl}
+    export MODEL_FORMAT=${MODEL_FORMAT:-sklearn}
+    export COMPILED_MODEL_PATH=${COMPILED_MODEL_PATH:-energy_predictor_forest}
+
+    if [ "$MODEL_FORMAT" = "compiled" ] && [ -f "$MODEL_PATH" ] && \
+       [ "$MODEL_PATH" -nt "$COMPILED_MODEL_PATH/meta.json" ]; then
+        echo "Compiling $MODEL_PATH to $COMPILED_MODEL_PATH..."
+        python compiled_forest.py "$MODEL_PATH" "$COMPILED_MODEL_PATH" || exit 1
+    fi
+
+    # With several workers, warm the on-disk artifacts (prediction grid, caches) once in a
+    # throwaway process so the workers don't all rebuild them. Nothing is shared in memory:
+    # uvicorn starts fresh worker processes that load the model themselves.
+    if [ "$WORKERS" -gt 1 ]; then
+        python -c "import app_original; app_original.load_startup_model()" || exit 1
+    fi
+fi
 
 # Start the FastAPI application
-exec uvicorn app:app --host $HOST --port $PORT --workers 1
\ No newline at end of file
+exec uvicorn "$APP_MODULE" --host "$HOST" --port "$PORT" --workers "$WORKERS"
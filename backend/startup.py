@@ -0,0 +1,81 @@
+"""
+Startup phases and readiness probes for the FastAPI apps.
+
+StartupProfile times the named phases of a cold start (imports, loading the
+model and its encoder, warm-up, pre-warm inference) and logs the breakdown
+once the app is ready. add_probes(app, profile) registers two probes:
+
+    GET /live   200 as soon as the event loop answers (restart only if this fails)
+    GET /ready  503 until profile.mark_ready(), then 200 (route traffic only after this)
+
+Both bodies carry the phase breakdown, so a slow start can be read straight
+from the pod.
+"""
+import time
+from contextlib import contextmanager
+
+from fastapi.responses import JSONResponse
+
+try:
+    from metrics import startup_phase
+except ImportError:  # imported as backend.startup from the repo root
+    from .metrics import startup_phase
+
+
+class StartupProfile:
+    """Wall-clock breakdown of one process's start, plus the flag behind /ready"""
+
+    def __init__(self, started=None):
+        # perf_counter() at the start of the app module's imports
+        self.started = time.perf_counter() if started is None else started
+        self.phases = {}
+        self.ready = False
+        self.ready_seconds = None
+        self.error = None
+
+    @contextmanager
+    def phase(self, name):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - began)
+
+    def record(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        startup_phase(name, self.phases[name])
+
+    def mark_ready(self):
+        self.ready_seconds = time.perf_counter() - self.started
+        self.ready = True
+        self.error = None
+        startup_phase("total", self.ready_seconds)
+        breakdown = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+        print(f"Ready after {self.ready_seconds:.2f}s" + (f" ({breakdown})" if breakdown else ""))
+
+    def fail(self, error):
+        """Keep /ready at 503 and say why"""
+        self.error = error
+        print(f"Warning: not ready: {error}")
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "seconds": round(self.ready_seconds if self.ready else time.perf_counter() - self.started, 4),
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            "error": self.error,
+        }
+
+
+def add_probes(app, profile):
+    """Register GET /live and GET /ready for profile"""
+
+    # async so the probes answer on the event loop even when the threadpool is saturated
+    async def live():
+        return {"status": "alive", "startup": profile.status()}
+
+    async def ready():
+        return JSONResponse(profile.status(), status_code=200 if profile.ready else 503)
+
+    app.add_api_route("/live", live, methods=["GET"])
+    app.add_api_route("/ready", ready, methods=["GET"])
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend modules are imported flat, the way uvicorn loads them from backend/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
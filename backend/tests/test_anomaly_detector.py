@@ -0,0 +1,56 @@
+import numpy as np
+
+from anomaly_detector import AnomalyDetector
+
+
+def batches(seed, count=12, size=40):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2024-05-01T00:00", "ns")
+    for b in range(count):
+        machines = rng.choice(["Machine_A", "Machine_B", "Machine_C"], size=size)
+        energies = rng.normal(150, 10, size=size)
+        energies[rng.random(size) < 0.05] *= 3  # spikes
+        timestamps = start + (b * size + np.arange(size)).astype("timedelta64[m]")
+        yield machines, energies, timestamps
+
+
+def test_workers_sharing_a_state_file_match_one_detector(tmp_path):
+    path = str(tmp_path / "energy_data.anomaly.json")
+    workers = [AnomalyDetector(warmup=5, path=path), AnomalyDetector(warmup=5, path=path)]
+    single = AnomalyDetector(warmup=5)
+
+    for i, batch in enumerate(batches(seed=0)):
+        shared_alerts = workers[i % 2].score(*batch)
+        assert shared_alerts == single.score(*batch)
+
+    expected = single.recent(limit=0)
+    assert expected, "the spikes should raise alerts"
+    for worker in workers + [AnomalyDetector(path=path)]:
+        assert worker.recent(limit=0) == expected
+        assert worker.stats()["readings_scored"] == single.stats()["readings_scored"]
+        assert worker.machine_state("Machine_B") == single.machine_state("Machine_B")
+    assert workers[0].machine_state("Machine_Z") is None
+
+
+def test_alert_log_is_compacted(tmp_path):
+    path = str(tmp_path / "state.json")
+    writer = AnomalyDetector(residual_threshold=0.1, max_alerts=5, path=path)
+    reader = AnomalyDetector(max_alerts=5, path=path)
+    stamps = np.datetime64("2024-05-01T00:00", "ns") + np.arange(4).astype("timedelta64[m]")
+    for _ in range(8):
+        # Every reading is 50% over its prediction
+        writer.score(["Machine_A"] * 4, [150.0] * 4, stamps, predictions=[100.0] * 4)
+        assert reader.recent(limit=0) == writer.recent(limit=0)
+
+    with open(writer.alerts_path) as f:
+        assert len(f.read().splitlines()) <= 2 * 5 + 4
+    assert [a["id"] for a in reader.recent(limit=0)] == list(range(28, 33))
+
+
+def test_in_memory_detector_without_path():
+    detector = AnomalyDetector(warmup=0, z_threshold=3)
+    stamps = np.datetime64("2024-05-01T00:00", "ns") + np.arange(30).astype("timedelta64[m]")
+    energies = np.r_[np.full(29, 100.0) + np.sin(np.arange(29)), 400.0]
+    alerts = detector.score(["Machine_A"] * 30, energies, stamps)
+    assert [alert["reasons"] for alert in alerts][-1] == ["z_score"]
+    assert alerts[-1]["timestamp"] == "2024-05-01T00:29:00"
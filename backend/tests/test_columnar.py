@@ -0,0 +1,130 @@
+import json
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+import columnar
+
+MACHINES = ["Machine_A", "Machine_B", "Machine_C"]
+
+
+def status(fn, *args):
+    with pytest.raises(HTTPException) as info:
+        fn(*args)
+    return info.value.status_code
+
+
+def test_json_columns_and_rows_layouts_agree():
+    columns = {"machine": ["Machine_B", "Machine_A"] * 10, "hour": list(range(20)), "day": [3.0] * 20}
+    machines, hours, days, _ = columnar.read_rows(json.dumps(columns).encode(), "application/json", MACHINES, 100)
+    assert machines.tolist() == columns["machine"]
+    assert hours.dtype == np.int64 and hours.tolist() == columns["hour"]
+    assert days.dtype == np.int64 and days.tolist() == [3] * 20
+
+    rows = {"rows": [list(row) for row in zip(*columns.values())]}
+    from_rows = columnar.read_rows(json.dumps(rows).encode(), "application/json; charset=utf-8", MACHINES, 100)
+    for expected, actual in zip((machines, hours, days), from_rows):
+        np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("document", [
+    {"machine": ["Machine_A", "Machine_B"], "hour": [1], "day": [1, 2]},
+    {"machine": ["Machine_A"], "hour": [1, 2], "day": [1, 2]},
+    {"machine": ["Machine_A", "Machine_B"], "hour": [1, 2], "day": [1]},
+])
+def test_mismatched_column_lengths_are_rejected(document):
+    assert status(columnar.row_columns, document) == 422
+
+
+@pytest.mark.parametrize("document", [
+    {"machine": ["Machine_A"], "hour": ["8"], "day": [1]},
+    {"machine": ["Machine_A"], "hour": [True], "day": [1]},
+    {"machine": ["Machine_A"], "hour": [None], "day": [1]},
+    {"machine": ["Machine_A"], "hour": [8.5], "day": [1]},
+    {"machine": ["Machine_A"], "hour": [1e30], "day": [1]},
+    {"machine": ["Machine_A"], "hour": [8], "day": [2 ** 64 - 1]},
+    {"machine": ["Machine_A"], "hour": [[8]], "day": [1]},
+    {"machine": ["Machine_A"], "hour": 8, "day": [1]},
+    {"machine": [1], "hour": [8], "day": [1]},
+    {"machine": [["Machine_A"]], "hour": [8], "day": [1]},
+    {"machine": ["Machine_A"], "hour": [8]},
+    {"machine": ["Machine_A"], "hour": [8], "day": [1], "rows": [["Machine_A", 8, 1]]},
+    {"rows": [["Machine_A", 8]]},
+    {"rows": "Machine_A,8,1"},
+])
+def test_bad_columns_are_rejected(document):
+    assert status(columnar.row_columns, document) == 422
+
+
+@pytest.mark.parametrize("document", [
+    {"machine": ["Machine_A", "Machine_Z"], "hour": [8, 8], "day": [1, 1]},
+    {"rows": [["Machine_A", 8, 1], ["machine_a", 8, 1]]},
+    {"machine": ["Machine_A"], "hour": [24], "day": [1]},
+    {"machine": ["Machine_A"], "hour": [-1], "day": [1]},
+    {"machine": ["Machine_A"], "hour": [8], "day": [0]},
+    {"machine": ["Machine_A"], "hour": [8], "day": [32.0]},
+])
+def test_unknown_machines_and_out_of_range_times_are_rejected(document):
+    assert status(columnar.read_rows, json.dumps(document).encode(), "application/json", MACHINES, 10) == 422
+    if columnar.msgpack is not None:
+        assert status(columnar.read_rows, columnar.msgpack.packb(document), columnar.MSGPACK, MACHINES, 10) == 422
+
+
+def test_float_column_rejects_non_numbers():
+    assert columnar.float_column([1, 2.5], "energy").tolist() == [1.0, 2.5]
+    for values in (["1.0"], [None], [[1.0]], "1.0"):
+        assert status(columnar.float_column, values, "energy") == 422
+
+
+def test_raw_body_round_trip_and_errors():
+    index, hours, days = np.array([2, 0, 1]), np.array([0, 12, 23]), np.array([1, 15, 31])
+    body = np.stack([index, hours, days]).astype(columnar.RAW_REQUEST_DTYPE).tobytes()
+    machines, out_hours, out_days, document = columnar.read_rows(body, columnar.RAW, MACHINES, 10)
+    assert document is None
+    assert machines.tolist() == ["Machine_C", "Machine_A", "Machine_B"]
+    assert out_hours.tolist() == hours.tolist() and out_days.tolist() == days.tolist()
+
+    assert status(columnar.read_rows, body[:-4], columnar.RAW, MACHINES, 10) == 422
+    bad_index = np.stack([[3, 0], [0, 0], [1, 1]]).astype(columnar.RAW_REQUEST_DTYPE).tobytes()
+    assert status(columnar.read_rows, bad_index, columnar.RAW, MACHINES, 10) == 422
+    bad_hour = np.stack([[0], [24], [1]]).astype(columnar.RAW_REQUEST_DTYPE).tobytes()
+    assert status(columnar.read_rows, bad_hour, columnar.RAW, MACHINES, 10) == 422
+    assert status(columnar.read_rows, body, columnar.RAW, MACHINES, 2) == 413
+
+
+def test_body_errors():
+    assert status(columnar.read_rows, b"{not json", "application/json", MACHINES, 10) == 400
+    assert status(columnar.read_rows, b"[1, 2]", "application/json", MACHINES, 10) == 422
+    assert status(columnar.read_rows, b"machine=A", "text/csv", MACHINES, 10) == 415
+    big = {"machine": ["Machine_A"] * 11, "hour": [1] * 11, "day": [1] * 11}
+    assert status(columnar.read_rows, json.dumps(big).encode(), "application/json", MACHINES, 10) == 413
+
+
+@pytest.mark.skipif(columnar.msgpack is None, reason="msgpack not installed")
+def test_msgpack_body_and_response():
+    document = {"machine": ["Machine_A", "Machine_C"], "hour": [1, 2], "day": [3, 4]}
+    machines, hours, days, _ = columnar.read_rows(columnar.msgpack.packb(document), "application/x-msgpack", MACHINES, 10)
+    assert machines.tolist() == document["machine"] and hours.tolist() == [1, 2] and days.tolist() == [3, 4]
+
+    values = np.array([1.5, 2.25])
+    response = columnar.encode_response(columnar.MSGPACK, {"predicted_energy": values}, {"predicted_energy": values})
+    assert columnar.msgpack.unpackb(response.body) == {"predicted_energy": [1.5, 2.25]}
+
+
+def test_negotiate_and_raw_response():
+    assert columnar.negotiate(None) == columnar.JSON
+    assert columnar.negotiate("text/html, application/octet-stream;q=0.9") == columnar.RAW
+    assert columnar.negotiate("*/*") == columnar.JSON
+
+    mean, low = np.array([1.0, 2.0]), np.array([0.5, 1.5])
+    response = columnar.encode_response(columnar.RAW, {}, {"predicted_energy": mean, "q05": low})
+    assert response.headers["X-Columns"] == "predicted_energy,q05"
+    assert response.headers["X-Row-Count"] == "2"
+    np.testing.assert_array_equal(np.frombuffer(response.body, dtype=columnar.RAW_RESPONSE_DTYPE).reshape(2, -1),
+                                  np.stack([mean, low]))
+
+
+def test_json_response_writes_numpy():
+    response = columnar.FastJSONResponse({"values": np.array([1.5, 2.0]), "names": np.array(["a", "b"]), "n": np.int64(2)})
+    assert json.loads(response.body) == {"values": [1.5, 2.0], "names": ["a", "b"], "n": 2}
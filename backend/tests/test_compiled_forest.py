@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from compiled_forest import CompiledForest, compile_forest, parity_sample
+
+ensemble = pytest.importorskip("sklearn.ensemble")
+
+
+@pytest.fixture(scope="module")
+def model():
+    X = parity_sample(5, rows=400, seed=1)
+    y = 100 + 3 * X[:, 0] - 0.5 * X[:, 1] + 20 * X[:, 2] + np.random.default_rng(1).normal(0, 2, len(X))
+    return ensemble.RandomForestRegressor(n_estimators=8, max_depth=6, random_state=0).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def sample():
+    return parity_sample(5, rows=300, seed=2)
+
+
+def test_predict_matches_sklearn(model, sample):
+    forest = compile_forest(model)
+    assert forest.n_estimators == 8
+    np.testing.assert_allclose(forest.predict(sample), model.predict(sample), rtol=0, atol=1e-9)
+
+
+def test_per_tree_and_quantiles_match_estimators(model, sample):
+    forest = compile_forest(model)
+    per_tree = np.stack([tree.predict(sample) for tree in model.estimators_])
+    np.testing.assert_allclose(forest.predict_per_tree(sample), per_tree, rtol=0, atol=1e-9)
+    mean, bands = forest.predict_quantiles(sample, [0.1, 0.9])
+    np.testing.assert_allclose(mean, model.predict(sample), rtol=0, atol=1e-9)
+    np.testing.assert_allclose(bands, np.quantile(per_tree, [0.1, 0.9], axis=0), rtol=0, atol=1e-9)
+
+
+def test_estimator_quantiles_match_compiled(model, monkeypatch):
+    import compiled_forest
+
+    monkeypatch.setattr(compiled_forest, "ESTIMATOR_CHUNK_ROWS", 128)
+    X = parity_sample(5, rows=1000, seed=4)
+    quantiles = [0.0, 0.05, 0.5, 0.95, 1.0]
+    expected = compile_forest(model).predict_quantiles(X, quantiles)
+    for actual, wanted in zip(compiled_forest.estimator_quantiles(model, X, quantiles), expected):
+        np.testing.assert_allclose(actual, wanted, rtol=0, atol=1e-9)
+
+
+def test_chunked_batches_match(model, monkeypatch):
+    import compiled_forest
+
+    monkeypatch.setattr(compiled_forest, "CHUNK_ROWS", 64)
+    X = parity_sample(5, rows=1000, seed=3)
+    np.testing.assert_allclose(compile_forest(model).predict(X), model.predict(X), rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("mmap_mode", [None, "r"])
+def test_saved_forest_matches_sklearn(model, sample, tmp_path, mmap_mode):
+    compile_forest(model).save(tmp_path / "forest")
+    forest = CompiledForest.load(tmp_path / "forest", mmap_mode=mmap_mode)
+    if mmap_mode:
+        assert isinstance(forest.feature, np.memmap)
+        assert isinstance(forest.children, np.memmap)
+    np.testing.assert_allclose(forest.predict(sample), model.predict(sample), rtol=0, atol=1e-9)
+
+
+def test_load_rejects_inconsistent_arrays(model, tmp_path):
+    compile_forest(model).save(tmp_path / "forest")
+    np.save(tmp_path / "forest" / "value.npy", np.zeros(3))
+    with pytest.raises(ValueError, match="inconsistent"):
+        CompiledForest.load(tmp_path / "forest", mmap_mode="r")
+
+
+def test_rejects_wrong_feature_count(model):
+    with pytest.raises(ValueError, match="feature matrix"):
+        compile_forest(model).predict(np.zeros((2, 4)))
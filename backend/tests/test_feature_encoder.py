@@ -0,0 +1,40 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from feature_encoder import FeatureEncoder, accept_arrays
+
+pd = pytest.importorskip("pandas")
+ensemble = pytest.importorskip("sklearn.ensemble")
+
+
+def test_encode_matches_get_dummies():
+    encoder = FeatureEncoder(["Machine_C", "Machine_A", "Machine_B"])
+    machines = ["Machine_B", "Machine_A", "Machine_C", "Machine_Z"]
+    X = encoder.encode(machines, hour=[1, 2, 3, 4], day=[5, 6, 7, 8])
+    frame = pd.get_dummies(pd.DataFrame({"hour": [1, 2, 3, 4], "day": [5, 6, 7, 8], "machine": machines[:3] + ["Machine_A"]}),
+                           columns=["machine"], drop_first=True).astype(float)
+    assert list(frame.columns) == encoder.columns
+    np.testing.assert_array_equal(X, frame.to_numpy())
+
+
+def test_accept_arrays_predicts_from_matrices_without_warnings():
+    encoder = FeatureEncoder()
+    rng = np.random.default_rng(0)
+    X = encoder.encode(rng.choice(encoder.machines, 200), hour=rng.integers(0, 24, 200), day=rng.integers(1, 32, 200))
+    y = X @ np.array([2.0, 0.5, 30.0, 60.0])
+    model = ensemble.RandomForestRegressor(n_estimators=5, random_state=0).fit(pd.DataFrame(X, columns=encoder.columns), y)
+    expected = model.predict(pd.DataFrame(X, columns=encoder.columns))
+
+    accept_arrays(model, encoder)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        np.testing.assert_array_equal(model.predict(X), expected)
+
+
+def test_accept_arrays_rejects_other_columns():
+    model = ensemble.RandomForestRegressor(n_estimators=2, random_state=0)
+    model.fit(pd.DataFrame(np.zeros((4, 4)), columns=["day", "hour", "machine_Machine_B", "machine_Machine_C"]), np.arange(4))
+    with pytest.raises(ValueError, match="fitted on"):
+        accept_arrays(model, FeatureEncoder())
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from history_store import HistoryStore
+
+START = np.datetime64("2024-03-30T20:00", "ns")
+
+
+def readings(n, seed, span_hours=60):
+    """Readings spread over a few days (across a month boundary), in random order"""
+    rng = np.random.default_rng(seed)
+    machines = rng.choice(["Machine_A", "Machine_B", "Machine_C"], size=n)
+    energies = np.round(rng.uniform(50, 400, size=n), 2).astype(np.float32).astype(np.float64)
+    timestamps = START + rng.integers(0, span_hours * 3600, size=n).astype("timedelta64[s]")
+    return machines, energies, timestamps
+
+
+def append_in_batches(store, machines, energies, timestamps, size):
+    for start in range(0, len(machines), size):
+        store.append(machines[start:start + size], energies[start:start + size], timestamps[start:start + size])
+
+
+def test_raw_query_is_time_ordered_for_out_of_order_partitions(tmp_path):
+    machines, energies, timestamps = readings(500, seed=1)
+    store = HistoryStore(str(tmp_path))
+    append_in_batches(store, machines, energies, timestamps, 37)
+    assert not all(partition["sorted"] for partition in store.partitions.values())
+
+    start, end = START + np.timedelta64(5, "h"), START + np.timedelta64(50, "h")
+    result = store.query(start, end, resolution="raw")
+    selected = (timestamps >= start) & (timestamps < end)
+    order = np.argsort(timestamps[selected], kind="stable")
+    np.testing.assert_array_equal(result["timestamp"], timestamps[selected][order])
+    np.testing.assert_array_equal(result["energy"], energies[selected][order])
+    np.testing.assert_array_equal(result["machine"], machines[selected][order])
+
+    # A reopened store (another process) reads the same rows
+    single = HistoryStore(str(tmp_path)).query(start, end, machine="Machine_B", resolution="raw")
+    mask = selected & (machines == "Machine_B")
+    np.testing.assert_array_equal(single["timestamp"], np.sort(timestamps[mask]))
+
+
+def test_sorted_appends_use_binary_search_bounds(tmp_path):
+    machines, energies, timestamps = readings(300, seed=2)
+    order = np.argsort(timestamps, kind="stable")
+    store = HistoryStore(str(tmp_path))
+    append_in_batches(store, machines[order], energies[order], timestamps[order], 50)
+    assert all(partition["sorted"] for partition in store.partitions.values())
+
+    start, end = START + np.timedelta64(1, "h"), START + np.timedelta64(30, "h")
+    result = store.query(start, end, resolution="raw")
+    selected = (timestamps[order] >= start) & (timestamps[order] < end)
+    np.testing.assert_array_equal(result["timestamp"], timestamps[order][selected])
+
+
+@pytest.mark.parametrize("resolution,unit", [("hour", "h"), ("day", "D")])
+@pytest.mark.parametrize("machine", [None, "Machine_C"])
+def test_rollups_match_raw_aggregates(tmp_path, resolution, unit, machine):
+    machines, energies, timestamps = readings(800, seed=3)
+    store = HistoryStore(str(tmp_path))
+    append_in_batches(store, machines, energies, timestamps, 101)
+
+    start, end = START, START + np.timedelta64(3, "D")
+    result = store.query(start, end, machine=machine, resolution=resolution)
+    mask = np.ones(len(machines), dtype=bool) if machine is None else machines == machine
+    buckets = timestamps[mask].astype(f"datetime64[{unit}]")
+    expected = np.unique(buckets)
+    np.testing.assert_array_equal(result["timestamp"], expected.astype("datetime64[ns]"))
+    for i, bucket in enumerate(expected):
+        values = energies[mask][buckets == bucket]
+        assert result["count"][i] == len(values)
+        assert result["mean"][i] == pytest.approx(values.mean(), rel=1e-6)
+        assert result["min"][i] == pytest.approx(values.min(), rel=1e-6)
+        assert result["max"][i] == pytest.approx(values.max(), rel=1e-6)
+
+
+def test_empty_ranges_and_unknown_machines(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    assert len(store.query(START, START + np.timedelta64(1, "D"), resolution="raw")["timestamp"]) == 0
+    store.append(["Machine_A"], [100.0], [START])
+    assert store.query(START, START, resolution="hour") == {name: [] for name in ("timestamp", "count", "mean", "min", "max")}
+    with pytest.raises(KeyError):
+        store.query(START, START + np.timedelta64(1, "D"), machine="Machine_Z")
+    with pytest.raises(ValueError):
+        store.query(START, START + np.timedelta64(1, "D"), resolution="minute")
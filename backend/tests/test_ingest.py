@@ -0,0 +1,67 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+import app_original
+from energy_io import ReadingWriter, read_readings
+from history_store import HistoryStore
+
+
+def batch(machine="Machine_A", timestamp="2024-03-01T08:15:00"):
+    return {"machine": [machine], "energy": [12.5], "timestamp": [timestamp]}
+
+
+@pytest.mark.parametrize("document", [
+    batch(timestamp=""),
+    batch(timestamp="NaT"),
+    batch(timestamp="not a time"),
+    batch(machine=""),
+    batch(machine="A,B"),
+    batch(machine="Machine\nA"),
+    batch(machine="Machine\rA"),
+    batch(machine="M" * 25),
+    batch(machine="Maschine_Ä"),
+])
+def test_unstorable_readings_are_rejected(document):
+    with pytest.raises(HTTPException) as info:
+        app_original.validate_readings(document)
+    assert info.value.status_code == 422
+
+
+@pytest.mark.parametrize("fmt", ["csv", "bin"])
+def test_accepted_names_round_trip(tmp_path, fmt):
+    names = ["M" * 24, "Line 2/press-7", "Machine_A"]
+    document = {"machine": names, "energy": [1.0, 2.0, 3.0], "timestamp": ["2024-03-01T08:00:00"] * 3}
+    machines, energies, timestamps = app_original.validate_readings(document)
+    path = str(tmp_path / f"readings.{fmt}")
+    with ReadingWriter(path) as writer:
+        writer.write_columns(machines, energies, timestamps)
+    frame = read_readings(path)
+    assert frame["machine"].tolist() == names
+    assert not frame["timestamp"].isna().any()
+
+
+def test_ingest_and_history_agree_on_utc(tmp_path, monkeypatch):
+    # 10:30 at +02:00 is stored as 08:30 UTC, whatever the server's local zone
+    document = {"machine": ["Machine_A"], "energy": [7.0], "timestamp": ["2024-03-01T10:30:00+02:00"]}
+    machines, energies, timestamps = app_original.validate_readings(document)
+    assert timestamps[0] == np.datetime64("2024-03-01T08:30:00")
+    store = HistoryStore(str(tmp_path / "history"))
+    store.append(machines, energies, timestamps)
+    monkeypatch.setitem(app_original._history, "store", store)
+
+    def query(start, end):
+        response = app_original.get_history("Machine_A", datetime.fromisoformat(start), datetime.fromisoformat(end), "raw")
+        return json.loads(response.body)
+
+    # The same instant asked for in another zone, as UTC and as naive UTC
+    for start, end in [("2024-03-01T09:00:00+01:00", "2024-03-01T10:00:00+01:00"),
+                       ("2024-03-01T08:00:00+00:00", "2024-03-01T09:00:00+00:00"),
+                       ("2024-03-01T08:00:00", "2024-03-01T09:00:00")]:
+        result = query(start, end)
+        assert result["points"] == 1 and result["timestamp"] == ["2024-03-01T08:30:00.000000"]
+        assert result["from"] == "2024-03-01T08:00:00"
+    assert query("2024-03-01T10:00:00", "2024-03-01T11:00:00")["points"] == 0
@@ -0,0 +1,53 @@
+import asyncio
+
+import httpx
+import numpy as np
+
+from ingest_client import IngestClient
+
+
+def run_client(handler, batches):
+    """Push batches through an IngestClient whose requests go to handler; returns its stats"""
+    async def main():
+        client = IngestClient("http://backend", concurrency=1, retries=2)
+        async with client:
+            await client._client.aclose()
+            client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+            for batch in batches:
+                # One request per batch: wait for each before queueing the next
+                await client.put(*batch)
+                await client.queue.join()
+        return client.stats()
+    return asyncio.run(main())
+
+
+def batch(rows=3):
+    return np.array(["Machine_A"] * rows), np.ones(rows), np.full(rows, np.datetime64("2024-03-01T08:00"))
+
+
+def test_only_unstored_failures_are_retried(monkeypatch):
+    monkeypatch.setattr("ingest_client.random.uniform", lambda a, b: 0.0)
+    responses = iter([503, 429, 200, 500])
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(next(responses))
+
+    stats = run_client(handler, [batch(), batch()])
+    # 503 and 429 retry into a 200; the 500 may have been stored, so it is not resent
+    assert len(calls) == 4
+    assert stats["rows_sent"] == 3 and stats["rows_dropped"] == 3 and stats["retried"] == 2
+
+
+def test_worker_survives_a_failing_batch():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200)
+
+    bad = (np.array(["Machine_A"]), np.ones(1), np.array(["not a time"], dtype=object))
+    stats = run_client(handler, [bad, batch()])
+    assert len(calls) == 1
+    assert stats["rows_dropped"] == 1 and stats["rows_sent"] == 3
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from machine_stats import FleetStats
+
+
+def readings(n, seed):
+    rng = np.random.default_rng(seed)
+    machines = rng.choice(["Machine_A", "Machine_B", "Machine_C", "Machine_D"], size=n).tolist()
+    energies = rng.normal(150, 40, size=n)
+    timestamps = np.datetime64("2024-03-01T00:00") + rng.integers(0, 90 * 24 * 60, size=n).astype("timedelta64[m]")
+    return machines, energies, timestamps
+
+
+@pytest.mark.parametrize("batch_sizes", [[1000], [1, 2, 3, 994], [250] * 4, [7, 500, 1, 492]])
+def test_batched_merge_matches_numpy(batch_sizes):
+    machines, energies, timestamps = readings(sum(batch_sizes), seed=len(batch_sizes))
+    stats = FleetStats()
+    start = 0
+    for size in batch_sizes:
+        stats.update(machines[start:start + size], energies[start:start + size], timestamps[start:start + size])
+        start += size
+
+    names = np.array(machines)
+    assert stats.total_count == len(machines)
+    for machine, summary in stats.summary().items():
+        values = energies[names == machine]
+        times = timestamps[names == machine]
+        assert summary["count"] == len(values)
+        assert summary["mean"] == pytest.approx(np.mean(values), rel=1e-12)
+        assert summary["variance"] == pytest.approx(np.var(values, ddof=1), rel=1e-9)
+        assert summary["min"] == values.min() and summary["max"] == values.max()
+        assert summary["first_timestamp"].startswith(str(times.min()))
+        assert summary["last_timestamp"].startswith(str(times.max()))
+
+
+def test_single_reading_and_empty_batch():
+    stats = FleetStats()
+    stats.update([], [], [])
+    assert stats.total_count == 0
+    stats.update(["Machine_A"], [120.0], [np.datetime64("2024-03-01T08:00")])
+    summary = stats.machine_summary("Machine_A")
+    assert summary["count"] == 1 and summary["mean"] == 120.0 and summary["variance"] == 0.0
+
+
+def test_save_and_load_round_trip(tmp_path):
+    machines, energies, timestamps = readings(300, seed=7)
+    stats = FleetStats()
+    stats.update(machines, energies, timestamps)
+    stats.save(tmp_path / "stats.json")
+
+    loaded = FleetStats.load(tmp_path / "stats.json")
+    assert loaded.summary() == stats.summary()
+    more = readings(50, seed=8)
+    loaded.update(*more)
+    stats.update(*more)
+    assert loaded.summary() == stats.summary()
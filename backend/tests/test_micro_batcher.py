@@ -0,0 +1,50 @@
+import asyncio
+
+from micro_batcher import MicroBatcher
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_batches_only_mix_requests_of_one_group():
+    calls = []
+
+    def predict_batch(group, items):
+        calls.append((group, list(items)))
+        return [f"{group}:{item}" for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(predict_batch, max_batch_size=8, window_ms=20)
+        try:
+            return await asyncio.gather(*(batcher.submit(i, "v1" if i % 2 else "v2") for i in range(6)))
+        finally:
+            await batcher.stop()
+
+    assert run(scenario()) == ["v2:0", "v1:1", "v2:2", "v1:3", "v2:4", "v1:5"]
+    assert sorted(calls) == [("v1", [1, 3, 5]), ("v2", [0, 2, 4])]
+
+
+def test_max_batch_size_and_errors():
+    sizes = []
+
+    def predict_batch(group, items):
+        sizes.append(len(items))
+        if 99 in items:
+            raise ValueError("bad row")
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher(predict_batch, max_batch_size=4, window_ms=20)
+        try:
+            results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+            failed = await asyncio.gather(batcher.submit(99), return_exceptions=True)
+            return results, failed, batcher.stats()
+        finally:
+            await batcher.stop()
+
+    results, failed, stats = run(scenario())
+    assert results == list(range(10))
+    assert max(sizes[:-1]) == 4 and sum(sizes[:-1]) == 10
+    assert isinstance(failed[0], ValueError)
+    assert stats["requests"] == 11 and stats["errors"] == 1
@@ -0,0 +1,42 @@
+import pytest
+
+from model_manager import ModelManager
+
+
+def test_reload_records_failures(tmp_path):
+    artifact = tmp_path / "model.bin"
+    artifact.write_text("v1")
+    broken = {"load": False}
+
+    def load(path):
+        if broken["load"]:
+            raise ValueError("corrupt artifact")
+        return object()
+
+    manager = ModelManager(str(artifact), load=load)
+    assert manager.reload() is True
+    assert manager.reload() is False
+
+    broken["load"] = True
+    with pytest.raises(ValueError):
+        manager.reload(force=True)
+    assert manager.failures == 1
+    assert "corrupt artifact" in manager.last_error
+    assert manager.current is not None
+
+    # The watcher path counts the failure once, through reload()
+    artifact.write_text("v2")
+    assert manager.check() is False
+    assert manager.check() is False
+    assert manager.failures == 2
+
+    broken["load"] = False
+    assert manager.reload() is True
+    assert manager.last_error is None and manager.reloads == 2
+
+
+def test_missing_artifact_is_a_failure(tmp_path):
+    manager = ModelManager(str(tmp_path / "missing.pkl"), load=lambda path: object())
+    with pytest.raises(FileNotFoundError):
+        manager.reload()
+    assert manager.failures == 1
@@ -0,0 +1,20 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def import_from_repo_root(module):
+    """Import a module in a fresh interpreter the way `uvicorn backend.app:app` does from the repo root"""
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONPATH"}
+    return subprocess.run([sys.executable, "-c", f"import {module}"], cwd=REPO_ROOT, env=env,
+                          capture_output=True, text=True, timeout=60)
+
+
+@pytest.mark.parametrize("module", ["backend.startup", "backend.app", "backend.app_simple", "backend.app_precomputed"])
+def test_imports_from_repo_root(module):
+    result = import_from_repo_root(module)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+import app_precomputed
+
+
+@pytest.mark.skipif(app_precomputed.MODEL_TABLE is None, reason="prediction_table.npz not available")
+def test_scalar_interpolation_matches_vectorized():
+    rng = np.random.default_rng(0)
+    n = 500
+    machines = rng.integers(0, len(app_precomputed.MACHINE_INDEX), n)
+    # Past both ends of every axis (clamped), plus exact grid points
+    hours = np.concatenate([np.arange(24), rng.uniform(-3, 27, n - 24)])
+    days = rng.integers(0, 34, n)
+    temperatures = rng.uniform(0, 50, n)
+    humidities = rng.uniform(0, 110, n)
+
+    expected = app_precomputed.interpolate_predictions(machines, hours, days, temperatures, humidities)
+    actual = [app_precomputed.interpolate_one(int(m), h, int(d), t, u)
+              for m, h, d, t, u in zip(machines, hours, days, temperatures, humidities)]
+    np.testing.assert_allclose(actual, expected, rtol=1e-12)
+
+
+def test_unknown_machine_raises_key_error():
+    with pytest.raises(KeyError):
+        app_precomputed.estimate_energy("Machine_Z", 10, 5, 25.0, 60.0)
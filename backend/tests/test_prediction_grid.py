@@ -0,0 +1,49 @@
+import json
+
+import numpy as np
+
+from prediction_grid import GRID_DAYS, GRID_HOURS, grid_lookup, load_grid, load_or_build_grid
+
+MACHINES = ["Press_01", "Lathe_02", "Oven_03", "Mill_04"]
+
+
+def predict_rows(machines, hours, days):
+    # Distinct value per (machine, hour, day) so misplaced lookups show up
+    codes = np.array([MACHINES.index(name) if name in MACHINES else 9 for name in machines])
+    return codes * 1000 + np.asarray(hours) * 10 + np.asarray(days) * 0.01
+
+
+def test_grid_is_built_over_the_given_machines(tmp_path):
+    path = str(tmp_path / "grid.npy")
+    grid = load_or_build_grid(path, "abc", predict_rows, MACHINES)
+    assert grid.values.shape == (len(MACHINES), GRID_HOURS, GRID_DAYS)
+    with open(f"{path}.json") as f:
+        assert json.load(f)["machines"] == MACHINES
+
+    machines = np.array(["Oven_03", "Press_01", "Mill_04"])
+    hours, days = np.array([5, 0, 23]), np.array([1, 31, 17])
+    predictions, in_grid = grid_lookup(grid, machines, hours, days)
+    assert in_grid.all()
+    np.testing.assert_allclose(predictions, predict_rows(machines, hours, days))
+
+
+def test_unknown_machines_and_ranges_fall_outside(tmp_path):
+    grid = load_or_build_grid(str(tmp_path / "grid.npy"), "abc", predict_rows, MACHINES)
+    predictions, in_grid = grid_lookup(
+        grid, np.array(["Unknown", "Lathe_02", "Lathe_02", "Lathe_02"]), np.array([3, 24, 3, 3]), np.array([3, 3, 0, 32]),
+    )
+    assert not in_grid.any()
+    assert np.isnan(predictions).all()
+    assert grid.machine_index(["Mill_04", "Zzz", "Aaa"]).tolist() == [3, -1, -1]
+
+
+def test_grid_is_rebuilt_when_model_or_machines_change(tmp_path):
+    path = str(tmp_path / "grid.npy")
+    load_or_build_grid(path, "abc", predict_rows, MACHINES)
+    assert load_grid(path, "abc", MACHINES) is not None
+    assert load_grid(path, "other", MACHINES) is None
+    assert load_grid(path, "abc", MACHINES[:3]) is None
+
+    grid = load_or_build_grid(path, "abc", predict_rows, MACHINES[:3])
+    assert grid.values.shape[0] == 3
+    assert grid.machines == MACHINES[:3]
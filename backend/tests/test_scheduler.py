@@ -0,0 +1,125 @@
+import itertools
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+import app_original
+from scheduler import Scheduler, window_sums
+
+
+def surface(seed, machines=3, horizon=8):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(50, 300, size=(machines, horizon)), rng.uniform(0.5, 2.0, size=horizon)
+
+
+def slot_cost(price, m, s, d, load):
+    return load * price[m, s:s + d].sum()
+
+
+def test_window_sums_match_slices():
+    values = np.random.default_rng(0).normal(size=(3, 10))
+    for d in range(1, 11):
+        expected = np.array([[values[m, s:s + d].sum() for s in range(10 - d + 1)] for m in range(3)])
+        np.testing.assert_allclose(window_sums(values, d), expected)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_cost_objective_matches_brute_force(seed):
+    predictions, tariff = surface(seed)
+    rng = np.random.default_rng(100 + seed)
+    n = 12
+    duration = rng.integers(1, 5, n)
+    release = rng.integers(0, 3, n)
+    deadline = np.minimum(release + duration + rng.integers(0, 5, n), 8)
+    load = rng.uniform(0.5, 2.0, n)
+    eligible = rng.random((n, 3)) < 0.7
+    eligible[:, 0] |= ~eligible.any(axis=1)
+
+    schedule = Scheduler(predictions, tariff).solve(duration, eligible, release, deadline, load)
+    price = predictions * tariff
+    assert schedule.feasible
+    for j in range(n):
+        d = int(duration[j])
+        best = min(slot_cost(price, m, s, d, load[j])
+                   for m in np.flatnonzero(eligible[j]) for s in range(release[j], deadline[j] - d + 1))
+        assert schedule.cost[j] == pytest.approx(best)
+        m, s = schedule.machine[j], schedule.start[j]
+        assert eligible[j, m] and release[j] <= s and s + d <= deadline[j]
+        assert schedule.cost[j] == pytest.approx(slot_cost(price, m, s, d, load[j]))
+        assert schedule.energy[j] == pytest.approx(load[j] * predictions[m, s:s + d].sum())
+
+
+def brute_force(predictions, duration, peak_cap, capacity):
+    """Cheapest assignment meeting the peak cap and machine capacity, or None"""
+    machines, horizon = predictions.shape
+    options = [[(m, s) for m in range(machines) for s in range(horizon - d + 1)] for d in duration]
+    best = None
+    for assignment in itertools.product(*options):
+        fleet = np.zeros(horizon)
+        running = np.zeros((machines, horizon), dtype=int)
+        for (m, s), d in zip(assignment, duration):
+            fleet[s:s + d] += predictions[m, s:s + d]
+            running[m, s:s + d] += 1
+        if (fleet > peak_cap * (1 + 1e-9)).any() or (running > capacity).any():
+            continue
+        cost = sum(predictions[m, s:s + d].sum() for (m, s), d in zip(assignment, duration))
+        best = cost if best is None else min(best, cost)
+    return best
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("objective", ["cost", "peak"])
+def test_constrained_schedules_are_honest(seed, objective):
+    predictions, _ = surface(seed, machines=2, horizon=5)
+    duration = np.random.default_rng(seed).integers(1, 3, 3)
+    peak_cap = np.full(5, np.sort(predictions.ravel())[-3])
+    schedule = Scheduler(predictions, peak_cap=peak_cap, machine_capacity=1).solve(
+        duration, np.ones((3, 2), dtype=bool), objective=objective)
+    optimum = brute_force(predictions, duration, peak_cap, 1)
+
+    if optimum is None:
+        assert not schedule.feasible
+    if schedule.feasible:
+        assert schedule.scheduled.all()
+        assert (schedule.load <= peak_cap * (1 + 1e-9)).all()
+        running = np.zeros((2, 5), dtype=int)
+        for m, s, d in zip(schedule.machine, schedule.start, duration):
+            running[m, s:s + d] += 1
+        assert running.max() <= 1
+        assert schedule.cost.sum() >= optimum - 1e-6
+
+
+def test_jobs_without_a_slot_are_unscheduled():
+    predictions, _ = surface(0, machines=2, horizon=6)
+    eligible = np.array([[True, True], [False, False], [True, False]])
+    schedule = Scheduler(predictions).solve([7, 2, 2], eligible, release=[0, 0, 5], deadline=[6, 6, 6])
+    assert not schedule.feasible
+    assert schedule.machine.tolist() == [-1, -1, -1]
+    assert np.isnan(schedule.cost).all()
+    assert not schedule.load.any()
+
+
+def test_empty_job_list():
+    predictions, _ = surface(0)
+    schedule = Scheduler(predictions, peak_cap=100.0, machine_capacity=1).solve(
+        np.zeros(0, dtype=int), np.zeros((0, 3), dtype=bool))
+    assert schedule.feasible
+    assert len(schedule.machine) == 0 and schedule.moves == 0
+    assert not schedule.load.any()
+
+
+@pytest.mark.parametrize("fields", [
+    {"tariff": [-1.0] * 4},
+    {"tariff": [1.0, float("nan"), 1.0, 1.0]},
+    {"tariff": [1.0, 1.0, float("inf"), 1.0]},
+    {"peak_cap": 0.0},
+    {"peak_cap": -5.0},
+    {"peak_cap": float("inf")},
+    {"peak_cap": [100.0, 0.0, 100.0, 100.0]},
+])
+def test_invalid_tariff_and_peak_cap_are_rejected(fields):
+    request = app_original.ScheduleRequest(jobs=[{"duration": 1}], horizon=4, **fields)
+    with pytest.raises(HTTPException) as info:
+        app_original.schedule_columns(request)
+    assert info.value.status_code == 422
@@ -1,10 +1,45 @@
-import React, { useState } from "react";
+import React, { useEffect, useState } from "react";
+
+// Use environment variable for API URL, with fallback
+const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
 
 export default function Dashboard() {
   const [machine, setMachine] = useState("Machine_A");
   const [prediction, setPrediction] = useState(null);
   const [loading, setLoading] = useState(false);
   const [recommendation, setRecommendation] = useState("");
+  const [live, setLive] = useState(null);
+  const [liveConnected, setLiveConnected] = useState(false);
+  const [alerts, setAlerts] = useState([]);
+
+  // Subscribe to the backend's live stream: one event per tick with the latest
+  // readings and per-machine predictions, shared by every open dashboard
+  useEffect(() => {
+    const source = new EventSource(`${API_URL}/stream`);
+    source.addEventListener("tick", (event) => {
+      const data = JSON.parse(event.data);
+      setLive((previous) => {
+        // Keep the last known reading for machines that were quiet this tick
+        const readings = { ...(previous ? previous.readings : {}) };
+        data.readings.machine.forEach((name, i) => {
+          readings[name] = { energy: data.readings.energy[i], timestamp: data.readings.timestamp[i] };
+        });
+        return { timestamp: data.timestamp, predictions: data.predictions, readings };
+      });
+    });
+    // Anomalies are detected server-side for the whole fleet; keep the latest few
+    source.addEventListener("alert", (event) => {
+      const data = JSON.parse(event.data);
+      setAlerts((previous) => {
+        const seen = new Set(previous.map((alert) => alert.id));
+        return [...data.alerts.filter((alert) => !seen.has(alert.id)).reverse(), ...previous].slice(0, 5);
+      });
+    });
+    source.onopen = () => setLiveConnected(true);
+    // EventSource reconnects on its own; just reflect the state
+    source.onerror = () => setLiveConnected(false);
+    return () => source.close();
+  }, []);
 
   const handlePredict = async () => {
     setLoading(true);
@@ -13,12 +48,9 @@ export default function Dashboard() {
       const hour = date.getHours();
       const day = date.getDate();
 
-      // Use environment variable for API URL, with fallback
-      const apiUrl = process.env.REACT_APP_API_URL || 'http://localhost:8000';
-      
-      console.log('Attempting to connect to:', apiUrl);
+      console.log('Attempting to connect to:', API_URL);
       
-      const response = await fetch(`${apiUrl}/predict`, {
+      const response = await fetch(`${API_URL}/predict`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -46,7 +78,7 @@ export default function Dashboard() {
       }
     } catch (error) {
       console.error("Prediction failed:", error);
-      console.error("API URL was:", process.env.REACT_APP_API_URL || 'http://localhost:8000');
+      console.error("API URL was:", API_URL);
       
       if (error.message.includes('fetch')) {
         setRecommendation("⚠️ Backend not connected. Please deploy the backend first or check the API URL in environment variables.");
@@ -132,6 +164,65 @@ export default function Dashboard() {
         </div>
       )}
 
+      <div style={{ 
+        marginBottom: "20px", 
+        padding: "15px", 
+        border: "1px solid #ddd",
+        borderRadius: "8px"
+      }}>
+        <h3 style={{ margin: "0 0 10px 0", color: "#333" }}>
+          📡 Live {liveConnected ? "🟢" : "🔴"}
+          {live && <span style={{ fontSize: "12px", color: "#888", marginLeft: "10px" }}>updated {new Date(live.timestamp).toLocaleTimeString()}</span>}
+        </h3>
+        {live ? (
+          <table style={{ borderCollapse: "collapse", color: "#555" }}>
+            <thead>
+              <tr>
+                <th style={{ textAlign: "left", paddingRight: "20px" }}>Machine</th>
+                <th style={{ textAlign: "right", paddingRight: "20px" }}>Latest reading</th>
+                <th style={{ textAlign: "right" }}>Predicted</th>
+              </tr>
+            </thead>
+            <tbody>
+              {Object.keys({ ...live.predictions, ...live.readings }).slice(0, 20).map((name) => (
+                <tr key={name} style={{ fontWeight: name === machine ? "bold" : "normal" }}>
+                  <td style={{ paddingRight: "20px" }}>{name}</td>
+                  <td style={{ textAlign: "right", paddingRight: "20px" }}>
+                    {live.readings[name] ? `${live.readings[name].energy} kWh` : "–"}
+                  </td>
+                  <td style={{ textAlign: "right" }}>
+                    {live.predictions[name] !== undefined ? `${live.predictions[name]} kWh` : "–"}
+                  </td>
+                </tr>
+              ))}
+            </tbody>
+          </table>
+        ) : (
+          <p style={{ margin: 0, color: "#888" }}>Waiting for live data...</p>
+        )}
+      </div>
+
+      {alerts.length > 0 && (
+        <div style={{ 
+          marginBottom: "20px", 
+          padding: "15px", 
+          border: "2px solid #e53935", 
+          backgroundColor: "#ffebee",
+          borderRadius: "8px"
+        }}>
+          <h3 style={{ margin: "0 0 10px 0", color: "#c62828" }}>🚨 Anomalies</h3>
+          <ul style={{ margin: 0, color: "#555" }}>
+            {alerts.map((alert) => (
+              <li key={alert.id}>
+                {alert.timestamp} {alert.machine}: {alert.energy} kWh
+                {alert.reasons.includes("z_score") && ` (z = ${alert.z_score}, typical ${alert.expected} kWh)`}
+                {alert.reasons.includes("residual") && ` (${Math.round(alert.residual * 100)}% vs predicted ${alert.predicted} kWh)`}
+              </li>
+            ))}
+          </ul>
+        </div>
+      )}
+
       <div style={{ 
         marginTop: "30px", 
         padding: "15px", 
@@ -143,7 +234,7 @@ export default function Dashboard() {
         <ul style={{ margin: 0, color: "#666" }}>
           <li>Select a machine from the dropdown</li>
           <li>Click "Predict Energy" to get ML-powered predictions</li>
-          <li>View real-time energy consumption forecasts</li>
+          <li>View real-time readings and forecasts, pushed live from the backend</li>
           <li>Get optimization recommendations</li>
         </ul>
       </div>
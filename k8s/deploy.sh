@@ -101,6 +101,14 @@ deploy_to_kubernetes() {
     print_status "Deploying frontend..."
     kubectl apply -f k8s/frontend-deployment.yaml
     
+    # Custom metrics for the backend HPA (needs prometheus-adapter in the monitoring namespace)
+    if kubectl get namespace monitoring >/dev/null 2>&1; then
+        print_status "Applying prometheus-adapter rules..."
+        kubectl apply -f k8s/prometheus-adapter.yaml
+    else
+        print_warning "Namespace monitoring not found; backend HPA will fall back to CPU"
+    fi
+    
     # Apply HPA
     print_status "Applying Horizontal Pod Autoscalers..."
     kubectl apply -f k8s/hpa.yaml
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test of the backend variants, side by side.
+
+Starts each app (app.py, app_precomputed.py, app_simple.py, app_original.py)
+under uvicorn from backend/ in turn, drives it with `--concurrency` asyncio
+clients for `--duration` seconds using a weighted mix of /predict,
+/predict/batch and /predict/bulk requests, then stops it. Endpoints an app
+does not expose (per its /openapi.json) are left out of its mix.
+Prints throughput and p50/p95/p99 latency per endpoint for every app.
+
+Usage:
+    python load_test.py                                   # all four apps
+    python load_test.py --apps app_original app_simple --concurrency 64 --duration 20
+    python load_test.py --mix predict=1 --workers 4       # single-prediction traffic only
+    python load_test.py --url http://localhost:8000       # an already running server
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+APPS = ["app", "app_precomputed", "app_simple", "app_original"]
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+MACHINES = ["Machine_A", "Machine_B", "Machine_C"]
+
+# kind -> (method, path)
+ENDPOINTS = {
+    "predict": ("post", "/predict"),
+    "batch": ("get", "/predict/batch"),
+    "bulk": ("post", "/predict/bulk"),
+}
+
+
+def parse_mix(text):
+    """'predict=8,batch=1,bulk=1' -> {"predict": 8.0, ...}"""
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown request kind {kind!r} (choose from {', '.join(ENDPOINTS)})")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(p / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def request_body(kind, rng, bulk_rows):
+    if kind == "predict":
+        # temperature/humidity are required by app_simple/app_precomputed and ignored elsewhere
+        return {"machine": rng.choice(MACHINES), "hour": rng.randrange(24), "day": rng.randrange(1, 32),
+                "temperature": round(rng.uniform(15, 35), 1), "humidity": round(rng.uniform(30, 80), 1)}
+    if kind == "bulk":
+        return {"machine": [rng.choice(MACHINES) for _ in range(bulk_rows)],
+                "hour": [rng.randrange(24) for _ in range(bulk_rows)],
+                "day": [rng.randrange(1, 32) for _ in range(bulk_rows)]}
+    return None
+
+
+# -- server lifecycle ---------------------------------------------------------
+
+class Server:
+    """One uvicorn process serving backend/<module>.py"""
+
+    def __init__(self, module, port, workers, startup_timeout):
+        self.module = module
+        self.url = f"http://127.0.0.1:{port}"
+        self.port = port
+        self.workers = workers
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self.log = None
+
+    async def __aenter__(self):
+        import httpx
+
+        self.log = tempfile.TemporaryFile(mode="w+")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", f"{self.module}:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--workers", str(self.workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+        deadline = time.monotonic() + self.startup_timeout
+        async with httpx.AsyncClient(base_url=self.url, timeout=2.0) as client:
+            while time.monotonic() < deadline:
+                if self.process.poll() is not None:
+                    break
+                try:
+                    # /ready turns 200 only once the app has loaded (and warmed) its model
+                    if (await client.get("/ready")).status_code == 200:
+                        return self
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"{self.module} did not become ready:\n{self.tail()}")
+
+    async def __aexit__(self, *exc):
+        self.stop()
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+    def tail(self, lines=20):
+        self.log.seek(0)
+        return "".join(self.log.readlines()[-lines:])
+
+
+# -- load generation ----------------------------------------------------------
+
+async def supported_kinds(client, mix):
+    """Request kinds in the mix that the server's OpenAPI schema exposes"""
+    try:
+        paths = (await client.get("/openapi.json")).json().get("paths", {})
+    except Exception:
+        return dict(mix)
+    return {kind: weight for kind, weight in mix.items()
+            if ENDPOINTS[kind][1] in paths and ENDPOINTS[kind][0] in paths[ENDPOINTS[kind][1]]}
+
+
+async def run_load(url, mix, concurrency, duration, warmup, bulk_rows, seed):
+    """Closed-loop load: `concurrency` clients each send the next request as soon as the last returns"""
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+        mix = await supported_kinds(client, mix)
+        if not mix:
+            return {}
+        kinds, weights = list(mix), list(mix.values())
+        latencies = {kind: [] for kind in kinds}
+        errors = {kind: 0 for kind in kinds}
+        started = time.monotonic()
+        measure_from = started + warmup
+        stop_at = measure_from + duration
+
+        async def client_loop(worker):
+            rng = random.Random(seed + worker)
+            while True:
+                now = time.monotonic()
+                if now >= stop_at:
+                    return
+                kind = rng.choices(kinds, weights)[0]
+                method, path = ENDPOINTS[kind]
+                body = request_body(kind, rng, bulk_rows)
+                began = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                elapsed = time.perf_counter() - began
+                # Only count requests that started after the warm-up
+                if now >= measure_from:
+                    if ok:
+                        latencies[kind].append(elapsed)
+                    else:
+                        errors[kind] += 1
+
+        await asyncio.gather(*(client_loop(worker) for worker in range(concurrency)))
+        elapsed = time.monotonic() - measure_from
+
+    results = {}
+    for kind in kinds:
+        values = sorted(latencies[kind])
+        results[kind] = {
+            "requests": len(values),
+            "errors": errors[kind],
+            "rps": len(values) / elapsed,
+            "p50_ms": _ms(percentile(values, 50)),
+            "p95_ms": _ms(percentile(values, 95)),
+            "p99_ms": _ms(percentile(values, 99)),
+        }
+    everything = sorted(value for values in latencies.values() for value in values)
+    results["all"] = {
+        "requests": len(everything),
+        "errors": sum(errors.values()),
+        "rps": len(everything) / elapsed,
+        "p50_ms": _ms(percentile(everything, 50)),
+        "p95_ms": _ms(percentile(everything, 95)),
+        "p99_ms": _ms(percentile(everything, 99)),
+    }
+    return results
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+# -- reporting ----------------------------------------------------------------
+
+def print_report(report, kinds):
+    names = list(report)
+    width = max(16, *(len(name) + 2 for name in names))
+    print()
+    print(f"{'endpoint':<10}{'metric':<14}" + "".join(f"{name:>{width}}" for name in names))
+    print("-" * (24 + width * len(names)))
+    for kind in kinds + ["all"]:
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms", "errors"):
+            cells = []
+            for name in names:
+                result = report[name]
+                if "error" in result:
+                    cells.append("failed")
+                elif kind not in result or result[kind]["requests"] + result[kind]["errors"] == 0:
+                    cells.append("n/a")
+                else:
+                    value = result[kind][metric]
+                    cells.append("-" if value is None else f"{value:,.1f}" if isinstance(value, float) else f"{value:,}")
+            label = kind if metric == "rps" else ""
+            print(f"{label:<10}{metric:<14}" + "".join(f"{cell:>{width}}" for cell in cells))
+    for name in names:
+        if "error" in report[name]:
+            print(f"\n{name} failed: {report[name]['error']}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", nargs="+", default=APPS, help="backend modules to start in turn")
+    parser.add_argument("--url", help="test this running server instead of starting the apps")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per app")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each run")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("predict=8,batch=1,bulk=1"),
+                        help="weighted request mix, e.g. predict=8,batch=1,bulk=1")
+    parser.add_argument("--bulk-rows", type=int, default=100, help="rows per /predict/bulk request")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers per app")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    targets = [(args.url, None)] if args.url else [(None, module) for module in args.apps]
+    report = {}
+    for url, module in targets:
+        name = url or module
+        print(f"Testing {name}: {args.concurrency} clients, {args.duration:g}s, mix {args.mix}")
+        try:
+            if url:
+                report[name] = await run_load(url, args.mix, args.concurrency, args.duration, args.warmup,
+                                              args.bulk_rows, args.seed)
+            else:
+                async with Server(module, args.port, args.workers, args.startup_timeout) as server:
+                    report[name] = await run_load(server.url, args.mix, args.concurrency, args.duration,
+                                                  args.warmup, args.bulk_rows, args.seed)
+        except Exception as exc:
+            report[name] = {"error": str(exc)}
+
+    print_report(report, list(args.mix))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": {key: value for key, value in vars(args).items() if key != "json"},
+                       "results": report}, f, indent=2)
+        print(f"\nReport written to {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())